@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import json
 import os
 from dotenv import load_dotenv
 
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # Third-party apps
     "rest_framework",
     "corsheaders",
@@ -58,6 +60,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "sales_agent.middleware.WarmUpMiddleware",  # Warms agent components on a worker's first request
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -168,3 +171,150 @@ REST_FRAMEWORK = {
         "rest_framework.parsers.JSONParser",
     ],
 }
+
+# Sales Agent Workflow Configuration
+# "sequential": classify_intent -> agent -> extract_enrichment -> update_understanding
+# "combined": analyze_turn (intent + enrichment in one LLM call) -> agent -> update_understanding
+SALES_AGENT_WORKFLOW_MODE = os.getenv("SALES_AGENT_WORKFLOW_MODE", "sequential")
+# Preload the workflow, knowledge index and OpenAI clients per worker (after fork or on first request).
+# Off by default so tests, runserver and management commands stay cheap; gunicorn.conf.py turns it on
+SALES_AGENT_WARMUP = os.getenv("SALES_AGENT_WARMUP", "False") == "True"
+
+# Knowledge Retrieval Configuration
+# "vector": pgvector L2 distance only; "hybrid": in-memory BM25 + vector merged with reciprocal rank fusion
+RAG_SEARCH_MODE = os.getenv("RAG_SEARCH_MODE", "vector")
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))  # Rank fusion damping constant
+RAG_HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", "10"))  # Candidates taken from each ranking
+RAG_LEXICAL_MAX_TERMS = int(os.getenv("RAG_LEXICAL_MAX_TERMS", "3"))  # Longest query answered lexically without an embedding
+RAG_KNOWLEDGE_INDEX_TTL = float(os.getenv("RAG_KNOWLEDGE_INDEX_TTL", "30"))  # Seconds between knowledge change checks
+RAG_STATIC_CATEGORY_MAX_ITEMS = int(os.getenv("RAG_STATIC_CATEGORY_MAX_ITEMS", "5"))  # Largest category included whole in prompts
+RAG_EMBEDDING_MODEL = os.getenv("RAG_EMBEDDING_MODEL", "text-embedding-3-small")
+# Shortened embeddings (text-embedding-3 models accept dimensions up to 1536); re-embed after changing
+# with manage.py reembed_knowledge
+RAG_EMBEDDING_DIMENSIONS = int(os.getenv("RAG_EMBEDDING_DIMENSIONS", "512"))
+# ANN index precision: "halfvec" (float16) or "binary" (1 bit per dimension); candidates are re-ranked
+# with the full-precision embedding
+RAG_VECTOR_STORAGE = os.getenv("RAG_VECTOR_STORAGE", "halfvec")
+RAG_RERANK_FACTOR = int(os.getenv("RAG_RERANK_FACTOR", "4"))  # ANN candidates per category = top_k * factor
+RAG_EXACT_SCAN_MAX_ITEMS = int(os.getenv("RAG_EXACT_SCAN_MAX_ITEMS", "5000"))  # Larger categories use their partial HNSW index
+RAG_HNSW_EF_SEARCH = int(os.getenv("RAG_HNSW_EF_SEARCH", "40"))  # HNSW candidate list size (raised to top_k if smaller)
+# Embedding snapshot (.npy written by seed_knowledge --snapshot-out) memory-mapped read-only by every worker,
+# so in-memory category vectors share one physical copy per host; empty loads vectors from the database
+RAG_EMBEDDING_SNAPSHOT = os.getenv("RAG_EMBEDDING_SNAPSHOT", "")
+# Knowledge change notifications (Postgres LISTEN/NOTIFY) invalidate every worker's knowledge caches
+KNOWLEDGE_NOTIFY_CHANNEL = os.getenv("KNOWLEDGE_NOTIFY_CHANNEL", "knowledge_changed")
+KNOWLEDGE_LISTENER_ENABLED = os.getenv("KNOWLEDGE_LISTENER_ENABLED", "True") == "True"
+KNOWLEDGE_LISTENER_POLL_SECONDS = float(os.getenv("KNOWLEDGE_LISTENER_POLL_SECONDS", "5"))  # Stop-flag check interval
+
+# Outbound LLM Governor (applies to all chat and embedding calls)
+LLM_MAX_CONCURRENCY_PER_PROCESS = int(os.getenv("LLM_MAX_CONCURRENCY_PER_PROCESS", "4"))
+LLM_MAX_CONCURRENCY_HOST = int(os.getenv("LLM_MAX_CONCURRENCY_HOST", "8"))  # Shared by all workers on a host, 0 disables
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))  # Host-wide, 0 disables
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))  # Host-wide prompt tokens, 0 disables
+LLM_GOVERNOR_STATE_DIR = os.getenv("LLM_GOVERNOR_STATE_DIR", "/tmp/acme-llm-governor")  # Slot and bucket files
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))  # Seconds a call may wait for a slot or rate budget
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))  # Consecutive failures before opening
+LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))  # Open duration before a probe
+
+# Chat Turn Deadlines and Hedging
+CHAT_TURN_BUDGET_SECONDS = float(os.getenv("CHAT_TURN_BUDGET_SECONDS", "25"))  # Whole-turn deadline carried in workflow state
+CHAT_ENRICHMENT_MIN_BUDGET_SECONDS = float(os.getenv("CHAT_ENRICHMENT_MIN_BUDGET_SECONDS", "4"))  # Skip enrichment below this
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "15"))  # Upper bound for a single LLM call
+LLM_CALL_POOL_SIZE = int(os.getenv("LLM_CALL_POOL_SIZE", "16"))  # Threads for deadline-bounded and hedged calls
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "False") == "True"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))  # Send a duplicate request past this latency
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))  # Observations needed before hedging a node
+
+# Per-node Model Configuration
+# Each node overlays "default". Override with LLM_NODE_CONFIG_JSON, e.g.
+# '{"pricing_agent": {"model": "gpt-4o", "temperature": 0.5}}'
+LLM_DEFAULT_MODEL = os.getenv("LLM_DEFAULT_MODEL", "gpt-4o-mini")
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "gpt-4.1-nano")
+_RESPONSE_AGENT_CONFIG = {"temperature": 0.7, "max_tokens": 300}
+LLM_NODE_CONFIG = {
+    "default": {
+        "model": LLM_DEFAULT_MODEL,
+        "fallback_model": LLM_FALLBACK_MODEL,
+        "temperature": 0.7,
+        "max_tokens": None,
+        "timeout": LLM_CALL_TIMEOUT,
+    },
+    # Label-only and JSON extraction nodes: deterministic, short, tight timeouts
+    "classify_intent": {"temperature": 0.0, "max_tokens": 10, "timeout": 5.0},
+    "analyze_turn": {"temperature": 0.0, "max_tokens": 1000, "timeout": 10.0},
+    "extract_enrichment": {"temperature": 0.0, "max_tokens": 1000, "timeout": 10.0},
+    # Customer-facing agents: 2-3 sentence answers
+    "pricing_agent": _RESPONSE_AGENT_CONFIG,
+    "tour_scheduling_agent": _RESPONSE_AGENT_CONFIG,
+    "amenities_agent": _RESPONSE_AGENT_CONFIG,
+    "financing_agent": _RESPONSE_AGENT_CONFIG,
+    "general_info_agent": _RESPONSE_AGENT_CONFIG,
+}
+for _node, _overrides in json.loads(os.getenv("LLM_NODE_CONFIG_JSON", "{}")).items():
+    LLM_NODE_CONFIG[_node] = {**LLM_NODE_CONFIG.get(_node, {}), **_overrides}
+
+# Latency-aware routing to the fallback model
+LLM_ROUTER_ENABLED = os.getenv("LLM_ROUTER_ENABLED", "False") == "True"
+LLM_ROUTER_LATENCY_THRESHOLD_MS = float(os.getenv("LLM_ROUTER_LATENCY_THRESHOLD_MS", "4000"))
+LLM_ROUTER_PERCENTILE = float(os.getenv("LLM_ROUTER_PERCENTILE", "50"))  # Rolling percentile compared to the threshold
+LLM_ROUTER_MIN_SAMPLES = int(os.getenv("LLM_ROUTER_MIN_SAMPLES", "10"))
+LLM_ROUTER_WINDOW_SECONDS = float(os.getenv("LLM_ROUTER_WINDOW_SECONDS", "60"))  # Latency samples older than this are dropped
+LLM_ROUTER_PROBE_RATE = float(os.getenv("LLM_ROUTER_PROBE_RATE", "0.05"))  # Share of calls kept on a slow primary
+
+# Degraded mode: answer from knowledge base templates without the LLM
+DEGRADED_MODE = os.getenv("DEGRADED_MODE", "auto")  # auto (latency/error signals), on, off
+DEGRADED_LATENCY_THRESHOLD_MS = float(os.getenv("DEGRADED_LATENCY_THRESHOLD_MS", "10000"))  # Median LLM latency
+DEGRADED_ERROR_RATE = float(os.getenv("DEGRADED_ERROR_RATE", "0.5"))  # Share of failed LLM calls
+DEGRADED_MIN_CALLS = int(os.getenv("DEGRADED_MIN_CALLS", "5"))  # Calls in the window before signals count
+DEGRADED_WINDOW_SECONDS = float(os.getenv("DEGRADED_WINDOW_SECONDS", "60"))
+DEGRADED_HOLD_SECONDS = float(os.getenv("DEGRADED_HOLD_SECONDS", "30"))  # Stay degraded at least this long
+DEGRADED_PROBE_RATE = float(os.getenv("DEGRADED_PROBE_RATE", "0.1"))  # Share of turns still sent to the LLM
+
+# Tours (community-local time)
+COMMUNITY_TIME_ZONE = os.getenv("COMMUNITY_TIME_ZONE", "America/Los_Angeles")
+TOUR_HOURS_START = os.getenv("TOUR_HOURS_START", "09:00")
+TOUR_HOURS_END = os.getenv("TOUR_HOURS_END", "18:00")
+COMMUNITY_SLUG = os.getenv("COMMUNITY_SLUG", "acme")  # TourSlot.community for this deployment
+TOUR_SLOT_MINUTES = int(os.getenv("TOUR_SLOT_MINUTES", "60"))  # Spacing between generated tour starts
+TOUR_SLOT_CAPACITY = int(os.getenv("TOUR_SLOT_CAPACITY", "2"))  # Parties per tour start
+TOUR_SLOT_HORIZON_DAYS = int(os.getenv("TOUR_SLOT_HORIZON_DAYS", "28"))  # How far ahead slots are offered
+TOUR_SLOT_OFFER_COUNT = int(os.getenv("TOUR_SLOT_OFFER_COUNT", "3"))  # Open slots suggested per reply
+
+# Exports (streamed with server-side cursors)
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))  # Rows fetched per cursor round trip
+
+# Analytics rollups (daily, community-local days)
+ANALYTICS_ROLLUP_LOOKBACK_DAYS = int(os.getenv("ANALYTICS_ROLLUP_LOOKBACK_DAYS", "2"))  # Trailing days recomputed per refresh
+ANALYTICS_REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "300"))  # Background refresh when older than this
+# Each worker runs a refresher thread (one refreshes at a time); disable when refresh_analytics runs from cron
+ANALYTICS_REFRESHER_ENABLED = os.getenv("ANALYTICS_REFRESHER_ENABLED", "True") == "True"
+ANALYTICS_DEFAULT_DAYS = int(os.getenv("ANALYTICS_DEFAULT_DAYS", "30"))  # Range returned by the analytics API
+
+# Transcript search (Postgres full-text search)
+TRANSCRIPT_SEARCH_CONFIG = os.getenv("TRANSCRIPT_SEARCH_CONFIG", "english")  # Text search configuration for stemming
+TRANSCRIPT_SEARCH_PAGE_SIZE = int(os.getenv("TRANSCRIPT_SEARCH_PAGE_SIZE", "20"))
+TRANSCRIPT_SEARCH_MAX_PAGE_SIZE = int(os.getenv("TRANSCRIPT_SEARCH_MAX_PAGE_SIZE", "100"))
+
+# Prospect typeahead (pg_trgm)
+PROSPECT_SEARCH_LIMIT = int(os.getenv("PROSPECT_SEARCH_LIMIT", "10"))
+PROSPECT_SEARCH_MAX_LIMIT = int(os.getenv("PROSPECT_SEARCH_MAX_LIMIT", "50"))
+
+# Offline evaluation (manage.py evaluate_conversations)
+# USD per million tokens by model; extend with LLM_PRICING_JSON, e.g. '{"gpt-4o": {"input": 2.5, "cached_input": 1.25, "output": 10}}'
+LLM_PRICING_PER_MILLION = {
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "gpt-4.1-nano": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    **json.loads(os.getenv("LLM_PRICING_JSON", "{}")),
+}
+
+# Record/replay cassette for LLM and embedding calls (development, CI, benchmarks)
+# passthrough: call OpenAI; record: reuse recorded responses, record new ones; replay: recorded responses only
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "passthrough")
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", str(BASE_DIR / "data" / "cassettes" / "llm.sqlite3"))
+# Community-local time the tour prompt sees while a cassette is active (the live clock and
+# slot inventory would change the prompt, and so the request hash, on every run)
+LLM_CASSETTE_CLOCK = os.getenv("LLM_CASSETTE_CLOCK", "2025-01-06T10:00")
@@ -14,3 +14,6 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_wsgi_application()
+
+# Heavy components are warmed per worker by the gunicorn post_worker_init hook
+# (gunicorn.conf.py) or on the first request by sales_agent.middleware.WarmUpMiddleware
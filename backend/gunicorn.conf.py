@@ -0,0 +1,26 @@
+"""
+Gunicorn configuration
+
+Used by the Docker image: gunicorn --config gunicorn.conf.py config.wsgi:application
+"""
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+
+# Chat workers warm up after fork unless explicitly disabled (settings default it to off)
+os.environ.setdefault("SALES_AGENT_WARMUP", "True")
+
+
+def post_worker_init(worker):
+    """Warm the workflow, knowledge index and HTTP clients before the worker accepts requests"""
+    from django.conf import settings
+
+    if not settings.SALES_AGENT_WARMUP:
+        return
+
+    from sales_agent.warmup import warm_up
+
+    timings = warm_up.run()
+    worker.log.info(f"Worker {worker.pid} warm-up (ms): {timings}")
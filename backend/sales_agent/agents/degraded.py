@@ -0,0 +1,251 @@
+"""
+Degraded response mode: answer from the knowledge base without calling the LLM
+
+When the provider is slow or failing (circuit open, rolling latency or error
+rate over threshold) the workflow classifies intent with keywords, retrieves
+with the in-memory lexical index and builds answers from CommunityKnowledge
+content and metadata using per-intent templates. Responses are marked
+degraded so the client and the admin dashboard can tell.
+"""
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from sales_agent.llm_governor import get_governor
+
+
+class DegradedModeController:
+    """
+    Decides whether new turns should skip the LLM
+
+    Signals, over a sliding window of recent LLM calls in this process:
+    - the governor's circuit breaker is open
+    - median latency above DEGRADED_LATENCY_THRESHOLD_MS
+    - failure ratio at or above DEGRADED_ERROR_RATE
+
+    Once active it stays on for DEGRADED_HOLD_SECONDS. While active, a share of
+    turns (DEGRADED_PROBE_RATE) still use the LLM so recovery is detected.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=500)  # (monotonic time, ok, latency seconds)
+        self.active_until = 0.0
+        self.reason: Optional[str] = None
+
+    def record_outcome(self, ok: bool, latency: float):
+        """Record the result of one LLM call"""
+        with self._lock:
+            self._outcomes.append((time.monotonic(), ok, latency))
+
+    def _recent(self) -> List[tuple]:
+        cutoff = time.monotonic() - settings.DEGRADED_WINDOW_SECONDS
+        with self._lock:
+            return [outcome for outcome in self._outcomes if outcome[0] >= cutoff]
+
+    def _trigger(self) -> Optional[str]:
+        """Return the reason the provider looks degraded, or None"""
+        if get_governor().breaker.is_open:
+            return "circuit_open"
+
+        recent = self._recent()
+        if len(recent) < settings.DEGRADED_MIN_CALLS:
+            return None
+
+        failures = sum(1 for _at, ok, _latency in recent if not ok)
+        if failures / len(recent) >= settings.DEGRADED_ERROR_RATE:
+            return "error_rate"
+
+        latencies = sorted(latency for _at, ok, latency in recent if ok)
+        if latencies and latencies[len(latencies) // 2] * 1000 > settings.DEGRADED_LATENCY_THRESHOLD_MS:
+            return "latency"
+
+        return None
+
+    def is_active(self) -> bool:
+        """Whether the next turn should be answered without the LLM"""
+        if settings.DEGRADED_MODE == "on":
+            self.reason = "forced"
+            return True
+        if settings.DEGRADED_MODE == "off":
+            return False
+
+        now = time.monotonic()
+        reason = self._trigger()
+        if reason:
+            self.active_until = now + settings.DEGRADED_HOLD_SECONDS
+            self.reason = reason
+
+        if now >= self.active_until:
+            self.reason = None
+            return False
+
+        # Let some traffic through to notice when the provider recovers
+        return random.random() >= settings.DEGRADED_PROBE_RATE
+
+    def snapshot(self) -> Dict:
+        """Current state for metrics endpoints"""
+        recent = self._recent()
+        return {
+            "mode": settings.DEGRADED_MODE,
+            "active": time.monotonic() < self.active_until or settings.DEGRADED_MODE == "on",
+            "reason": self.reason,
+            "recent_calls": len(recent),
+            "recent_failures": sum(1 for _at, ok, _latency in recent if not ok),
+        }
+
+
+degraded_mode = DegradedModeController()
+
+
+# Keyword intent classification, used instead of the LLM classifier (checked in order)
+INTENT_KEYWORDS = {
+    "tour_scheduling": r"\b(?:tours?|visit\w*|schedul\w*|come by|appointment)\b",
+    "financing": r"\b(?:medicaid|medicare|insurance|veterans?|va|hud|bridge loans?|pay for|financ\w*|afford\w*)\b",
+    "pricing": r"\$|\b(?:costs?|prices?|pricing|how much|fees?|rates?|monthly|expensive|budget)\b",
+    "amenities": (
+        r"\b(?:amenit\w*|pools?|gym|fitness|dining|meals?|food|activit\w*|pets?|dogs?|cats?|parking|cars?|"
+        r"smok\w*|services?|housekeeping|salon|garden\w*|yoga|diet\w*|kosher|vegetarian)\b"
+    ),
+}
+INTENT_PATTERNS = {intent: re.compile(pattern) for intent, pattern in INTENT_KEYWORDS.items()}
+
+EMAIL_PATTERN = re.compile(r"[^@\s]+@[^@\s]+\.[a-z]{2,}", re.IGNORECASE)
+PHONE_PATTERN = re.compile(r"(?:\+?1[\s.-]?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}")
+
+
+def keyword_intent(user_message: str) -> str:
+    """
+    Classify intent from keywords
+
+    Args:
+        user_message: The user's message
+
+    Returns:
+        Intent category (general_info when nothing matches)
+    """
+    message = user_message.lower()
+    if EMAIL_PATTERN.search(message) or PHONE_PATTERN.search(message):
+        return "tour_scheduling"
+    for intent, pattern in INTENT_PATTERNS.items():
+        if pattern.search(message):
+            return intent
+    return "general_info"
+
+
+def _sentence(text: str) -> str:
+    text = text.strip()
+    return text if text.endswith((".", "!", "?")) else f"{text}."
+
+
+def _clock(value: str) -> str:
+    """Format "18:00" as "6:00 PM" (returned unchanged if not HH:MM)"""
+    try:
+        return datetime.strptime(value, "%H:%M").strftime("%I:%M %p").lstrip("0")
+    except ValueError:
+        return value
+
+
+def _money(amount) -> str:
+    return f"${amount:,.0f}"
+
+
+def _join(items: List[str]) -> str:
+    items = [str(item) for item in items]
+    if len(items) <= 1:
+        return "".join(items)
+    return f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+def _pricing_answer(rag_context: List[Dict]) -> List[str]:
+    sentences = []
+    for item in rag_context:
+        metadata = item.get("metadata") or {}
+        if "independent_living_base" in metadata or "assisted_living_base" in metadata:
+            parts = []
+            if metadata.get("independent_living_base"):
+                parts.append(f"Independent Living starts at {_money(metadata['independent_living_base'])}/month")
+            if metadata.get("assisted_living_base"):
+                parts.append(f"Assisted Living starts at {_money(metadata['assisted_living_base'])}/month")
+            sentence = " and ".join(parts)
+            if metadata.get("entrance_fee"):
+                sentence += f", with a one-time entrance fee of {_money(metadata['entrance_fee'])}"
+            sentences.append(sentence + ".")
+        elif metadata.get("included_services"):
+            sentences.append(f"The monthly cost includes {_join(metadata['included_services'])}.")
+        else:
+            sentences.append(item["content"])
+    return sentences
+
+
+def _financing_answer(rag_context: List[Dict]) -> List[str]:
+    sentences = []
+    for item in rag_context:
+        metadata = item.get("metadata") or {}
+        if metadata.get("accepted") or metadata.get("not_accepted"):
+            if metadata.get("accepted"):
+                sentences.append(f"We work with {_join(metadata['accepted'])}.")
+            if metadata.get("not_accepted"):
+                sentences.append(f"We do not accept {_join(metadata['not_accepted']).lower()}.")
+        else:
+            sentences.append(item["content"])
+    return sentences
+
+
+def _tour_answer(rag_context: List[Dict]) -> List[str]:
+    for item in rag_context:
+        metadata = item.get("metadata") or {}
+        if metadata.get("tour_days"):
+            days = metadata["tour_days"]
+            day_range = f"{days[0]} through {days[-1]}" if len(days) > 1 else days[0]
+            hours = ""
+            if metadata.get("tour_hours_start") and metadata.get("tour_hours_end"):
+                hours = f", {_clock(metadata['tour_hours_start'])} to {_clock(metadata['tour_hours_end'])}"
+            return [f"Tours are available {day_range}{hours}."]
+    return [item["content"] for item in rag_context[:1]]
+
+
+def _facts_answer(rag_context: List[Dict]) -> List[str]:
+    return [item["content"] for item in rag_context[:2]]
+
+
+ANSWER_TEMPLATES = {
+    "pricing": (_pricing_answer, "Would you like to schedule a tour to see the community?"),
+    "financing": (_financing_answer, "Our team can walk you through the details on a tour."),
+    "tour_scheduling": (
+        _tour_answer,
+        "Please share a weekday and time that works for you, along with your name, email and phone number, "
+        "and our team will confirm your tour.",
+    ),
+    "amenities": (_facts_answer, "Would you like to see it in person on a tour?"),
+    "general_info": (_facts_answer, "Is there anything else I can help you with?"),
+}
+
+NO_FACTS_ANSWER = (
+    "I'm having trouble looking that up right now. "
+    "Our team would be happy to help - would you like to schedule a tour or leave your contact details?"
+)
+
+
+def degraded_answer(intent: str, rag_context: List[Dict]) -> str:
+    """
+    Build an answer from retrieved knowledge without an LLM
+
+    Args:
+        intent: Classified intent
+        rag_context: Retrieved knowledge items (content + metadata)
+
+    Returns:
+        Templated response text
+    """
+    build, closing = ANSWER_TEMPLATES.get(intent, ANSWER_TEMPLATES["general_info"])
+    sentences = build(rag_context) if rag_context else []
+    if not sentences:
+        return NO_FACTS_ANSWER
+    return " ".join([_sentence(sentence) for sentence in sentences] + [closing])
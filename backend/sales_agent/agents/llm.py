@@ -0,0 +1,487 @@
+"""
+LLM access for workflow nodes: client construction, invocation and usage accounting
+
+Each call is bounded by the chat turn's remaining budget (state["deadline"]),
+which also caps the provider request's timeout so abandoned attempts don't keep
+holding call threads or governor slots, and can optionally be hedged: if it runs past the node's observed p95 latency, a
+duplicate request is sent and whichever answers first wins.
+
+Model, temperature, max_tokens and timeout are configured per node
+(settings.LLM_NODE_CONFIG). The optional latency router moves a node to its
+fallback model while the primary model's rolling latency is over threshold.
+
+With settings.LLM_CASSETTE_MODE set to record or replay, responses come from
+the request-hash cassette (sales_agent.cassette). The governor wraps only the
+provider request inside the model, after LangChain's cache lookup, so recorded
+responses never take governor slots or tokens in either mode.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from django.conf import settings
+from langchain_core.messages import BaseMessage
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel, PrivateAttr
+
+from sales_agent.cassette import get_llm_cache
+from sales_agent.llm_governor import DeadlineExceeded, ProviderUnavailable, estimate_tokens, get_governor
+from sales_agent.agents.degraded import degraded_mode
+
+
+def node_llm_config(node: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Model settings for a workflow node: the "default" entry overlaid with the node's entry
+
+    Returns:
+        Dictionary with model, fallback_model, temperature, max_tokens and timeout
+    """
+    config = dict(settings.LLM_NODE_CONFIG["default"])
+    if node:
+        config.update(settings.LLM_NODE_CONFIG.get(node, {}))
+    return config
+
+
+class GovernedChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI whose provider requests run under the outbound governor
+
+    LangChain answers cache (cassette) hits before calling _generate, so only
+    requests that actually go to OpenAI are rate limited and retried. A copy
+    from governed() belongs to one attempt: the governor stops retrying when
+    the attempt expires and each retry's request timeout is what is left of it.
+    """
+    _estimated_tokens: int = PrivateAttr(default=0)
+    _expires: Optional[float] = PrivateAttr(default=None)
+
+    # Serialized (and traced) as ChatOpenAI so cassette keys don't depend on this wrapper
+    @classmethod
+    def lc_id(cls) -> List[str]:
+        return ChatOpenAI.lc_id()
+
+    def get_name(self, suffix: Optional[str] = None, *, name: Optional[str] = None) -> str:
+        return super().get_name(suffix, name=name or "ChatOpenAI")
+
+    def governed(self, estimated_tokens: int, expires: Optional[float]) -> "GovernedChatOpenAI":
+        """
+        A copy whose requests are governed with the prompt's token estimate
+
+        Args:
+            expires: time.monotonic() at which the attempt gives up (None: no limit)
+        """
+        llm = self.model_copy()
+        llm._estimated_tokens = estimated_tokens
+        llm._expires = expires
+        return llm
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        def request():
+            llm = self if self._expires is None else _with_request_timeout(self, self._expires)
+            return ChatOpenAI._generate(llm, messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        # The governor takes a wall-clock deadline
+        deadline = None if self._expires is None else time.time() + (self._expires - time.monotonic())
+        return get_governor().call(request, estimated_tokens=self._estimated_tokens, deadline=deadline)
+
+
+@lru_cache(maxsize=None)
+def _build_llm(model: str, temperature: float, max_tokens: Optional[int], timeout: float) -> GovernedChatOpenAI:
+    """Build one shared client per distinct configuration (reused so HTTP pools stay warm)"""
+    return GovernedChatOpenAI(
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        api_key=os.getenv("OPENAI_API_KEY"),
+        timeout=timeout,
+        max_retries=0,  # Retries are owned by the outbound governor
+        cache=get_llm_cache()
+    )
+
+
+# Initialize LLM
+def get_llm(node: Optional[str] = None, model: Optional[str] = None) -> ChatOpenAI:
+    """
+    Get the shared OpenAI LLM instance for a node
+
+    Args:
+        node: Workflow node name used to look up settings.LLM_NODE_CONFIG
+        model: Override the configured model (used by the latency router)
+    """
+    config = node_llm_config(node)
+    return _build_llm(model or config["model"], config["temperature"], config["max_tokens"], config["timeout"])
+
+
+class LatencyRouter:
+    """
+    Routes a node to its fallback model while the primary model is slow
+
+    The primary model's rolling latency for this node (calls from the last
+    LLM_ROUTER_WINDOW_SECONDS, failed calls counted at no less than their
+    timeout) is compared to LLM_ROUTER_LATENCY_THRESHOLD_MS.
+    While routed away, a small share of calls (LLM_ROUTER_PROBE_RATE) still go
+    to the primary; once the slow samples age out of the window the node goes
+    back to the primary and re-measures it.
+    """
+
+    def route(self, node: str) -> Dict[str, Any]:
+        """
+        Returns:
+            Decision with node, model, tier ("primary" or "fallback"), reason and observed latency
+        """
+        config = node_llm_config(node)
+        primary = config["model"]
+        fallback = config.get("fallback_model")
+        decision = {"node": node, "model": primary, "tier": "primary", "reason": "default", "observed_ms": None}
+
+        if not settings.LLM_ROUTER_ENABLED or not fallback or fallback == primary:
+            return decision
+
+        observed = model_latency_tracker(node, primary).percentile(
+            settings.LLM_ROUTER_PERCENTILE, min_samples=settings.LLM_ROUTER_MIN_SAMPLES
+        )
+        if observed is None:
+            decision["reason"] = "insufficient_samples"
+            return decision
+
+        decision["observed_ms"] = round(observed * 1000, 1)
+        if observed * 1000 <= settings.LLM_ROUTER_LATENCY_THRESHOLD_MS:
+            decision["reason"] = "within_threshold"
+            return decision
+
+        if random.random() < settings.LLM_ROUTER_PROBE_RATE:
+            decision["reason"] = "probe"
+            return decision
+
+        decision.update({"model": fallback, "tier": "fallback", "reason": "primary_slow"})
+        return decision
+
+
+latency_router = LatencyRouter()
+
+
+def select_llm(state: Optional[Dict], node: str) -> ChatOpenAI:
+    """
+    Pick the model for a node via the latency router and record the decision on the turn
+
+    Args:
+        state: Conversation state; the decision is appended to state["model_decisions"]
+        node: Workflow node name
+    """
+    decision = latency_router.route(node)
+    if state is not None:
+        state.setdefault("model_decisions", []).append(decision)
+    return get_llm(node, decision["model"])
+
+
+def remaining_budget(state: Optional[Dict]) -> Optional[float]:
+    """
+    Seconds left before the turn's deadline
+
+    Returns:
+        Remaining seconds (may be negative), or None if the state carries no deadline
+    """
+    deadline = (state or {}).get("deadline")
+    if not deadline:
+        return None
+    return deadline - time.time()
+
+
+class LatencyTracker:
+    """
+    Rolling window of successful call latencies for one node
+
+    Args:
+        window: Most recent samples kept
+        max_age: Also drop samples older than this many seconds (None keeps them)
+    """
+
+    def __init__(self, window: int = 200, max_age: Optional[float] = None):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self.max_age = max_age
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append((time.monotonic(), seconds))
+
+    def percentile(self, pct: float, min_samples: int = 1) -> Optional[float]:
+        """Latency at the given percentile, or None with fewer than min_samples observations"""
+        with self._lock:
+            if self.max_age is not None:
+                cutoff = time.monotonic() - self.max_age
+                while self._samples and self._samples[0][0] < cutoff:
+                    self._samples.popleft()
+            samples = sorted(seconds for _recorded, seconds in self._samples)
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(len(samples) * pct / 100))
+        return samples[index]
+
+
+_latency_trackers: Dict[str, LatencyTracker] = {}
+_latency_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(name: str, max_age: Optional[float] = None) -> LatencyTracker:
+    """Get the process-wide latency tracker for a node (max_age applies when it is created)"""
+    with _latency_trackers_lock:
+        if name not in _latency_trackers:
+            _latency_trackers[name] = LatencyTracker(max_age=max_age)
+        return _latency_trackers[name]
+
+
+def model_latency_tracker(node: str, model: str) -> LatencyTracker:
+    """Time-windowed latency of one model serving one node (read by the latency router)"""
+    return get_latency_tracker(f"model:{node}:{model}", max_age=settings.LLM_ROUTER_WINDOW_SECONDS)
+
+
+# Threads that run calls so they can be abandoned at the deadline or hedged
+_call_executor = ThreadPoolExecutor(max_workers=settings.LLM_CALL_POOL_SIZE, thread_name_prefix="llm-call")
+
+
+def _run_within_budget(state: Optional[Dict], node: str, fn: Callable[[float], Any], call_timeout: float) -> Any:
+    """
+    Run fn with a timeout from the turn budget, hedging it past the node's p95 latency
+
+    Args:
+        fn: Makes one attempt; receives the time.monotonic() at which the attempt
+            must give up, so the provider request can time out with the budget
+        call_timeout: The node's own per-call timeout
+
+    Raises:
+        DeadlineExceeded: If no attempt finishes within the budget
+    """
+    remaining = remaining_budget(state)
+    timeout = call_timeout if remaining is None else min(call_timeout, remaining)
+    if timeout <= 0:
+        raise DeadlineExceeded(f"No time budget left for {node}")
+
+    tracker = get_latency_tracker(node)
+    hedge_after = None
+    if settings.LLM_HEDGING_ENABLED:
+        hedge_after = tracker.percentile(settings.LLM_HEDGE_PERCENTILE, min_samples=settings.LLM_HEDGE_MIN_SAMPLES)
+
+    started = time.monotonic()
+    expires = started + timeout
+    pending = {_call_executor.submit(fn, expires)}
+    hedged = False
+    try:
+        while pending:
+            elapsed = time.monotonic() - started
+            if elapsed >= timeout:
+                break
+            wait_for = timeout - elapsed
+            if hedge_after is not None and not hedged:
+                wait_for = min(wait_for, max(0.0, hedge_after - elapsed))
+
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    tracker.record(time.monotonic() - started)
+                    return future.result()
+                if not pending:
+                    raise future.exception()
+
+            if not done and hedge_after is not None and not hedged:
+                # Slower than p95: race a duplicate request against the original
+                hedged = True
+                pending.add(_call_executor.submit(fn, expires))
+                if state is not None:
+                    state.setdefault("hedged_nodes", []).append(node)
+    finally:
+        # Attempts still queued for a thread never start; running ones end by
+        # `expires`: the governor retries only until then and each request's
+        # timeout is cut to the time left (see GovernedChatOpenAI)
+        for future in pending:
+            future.cancel()
+
+    raise DeadlineExceeded(f"{node} did not finish within {timeout:.1f}s", retry_after=1.0)
+
+
+def _with_request_timeout(llm: ChatOpenAI, expires: float) -> ChatOpenAI:
+    """
+    The model with its request timeout cut to the time left until `expires`
+
+    The copy shares the original client's HTTP connection pool.
+    """
+    timeout = max(0.1, expires - time.monotonic())
+    if llm.request_timeout is not None and timeout >= llm.request_timeout:
+        return llm
+    root_client = llm.root_client.with_options(timeout=timeout)
+    return llm.model_copy(update={"root_client": root_client, "client": root_client.chat.completions})
+
+
+def extract_usage(message: Any) -> Dict[str, int]:
+    """
+    Read token counts from an AIMessage, including provider-side cached prompt tokens
+
+    Args:
+        message: AIMessage returned by ChatOpenAI
+
+    Returns:
+        Dictionary with input_tokens, cached_tokens and output_tokens
+    """
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage:
+        details = usage.get("input_token_details") or {}
+        return {
+            "input_tokens": usage.get("input_tokens", 0),
+            "cached_tokens": details.get("cache_read", 0) or 0,
+            "output_tokens": usage.get("output_tokens", 0),
+        }
+
+    # Older langchain-openai versions only expose the raw OpenAI usage block
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    details = token_usage.get("prompt_tokens_details") or {}
+    return {
+        "input_tokens": token_usage.get("prompt_tokens", 0),
+        "cached_tokens": details.get("cached_tokens", 0) or 0,
+        "output_tokens": token_usage.get("completion_tokens", 0),
+    }
+
+
+class PromptUsageStats:
+    """
+    Process-wide token counters per prompt, used to verify prefix cache hit rates
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, prompt: str, usage: Dict[str, int], latency_ms: float):
+        with self._lock:
+            stats = self._stats.setdefault(prompt, {
+                "calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "latency_ms": 0.0,
+            })
+            stats["calls"] += 1
+            stats["input_tokens"] += usage["input_tokens"]
+            stats["cached_tokens"] += usage["cached_tokens"]
+            stats["output_tokens"] += usage["output_tokens"]
+            stats["latency_ms"] += latency_ms
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Totals per prompt plus cache hit ratio and mean latency"""
+        with self._lock:
+            result = {}
+            for prompt, stats in self._stats.items():
+                result[prompt] = {
+                    **stats,
+                    "cache_hit_ratio": (stats["cached_tokens"] / stats["input_tokens"]) if stats["input_tokens"] else 0.0,
+                    "avg_latency_ms": stats["latency_ms"] / stats["calls"],
+                }
+            return result
+
+
+prompt_usage_stats = PromptUsageStats()
+
+
+def _record_usage(state: Optional[Dict], node: str, llm: ChatOpenAI, message: Any, latency_ms: float):
+    """Record a response's usage on the turn state and in the process-wide stats"""
+    usage = extract_usage(message)
+    prompt_usage_stats.record(node, usage, latency_ms)
+    model_latency_tracker(node, llm.model_name).record(latency_ms / 1000)
+    if state is not None:
+        state.setdefault("llm_usage", []).append({
+            "node": node,
+            "model": llm.model_name,
+            **usage,
+            "latency_ms": round(latency_ms, 1),
+        })
+
+
+def _prompt_tokens(messages: List[BaseMessage]) -> int:
+    """Estimate prompt tokens for the governor's token rate limit"""
+    return sum(estimate_tokens(str(message.content)) for message in messages)
+
+
+def _invoke(state: Optional[Dict], node: str, llm: ChatOpenAI, fn: Callable[[ChatOpenAI], Any], messages: List[BaseMessage]) -> Any:
+    """
+    Run a request within the turn budget and feed the outcome to the degraded-mode controller
+
+    Args:
+        fn: Makes the request with the model it is given (governed until the
+            attempt expires, with request timeouts cut to fit)
+    """
+    estimated = _prompt_tokens(messages)
+
+    def attempt(expires: float) -> Any:
+        return fn(llm.governed(estimated, expires))
+
+    started = time.perf_counter()
+    try:
+        result = _run_within_budget(state, node, attempt, llm.request_timeout)
+    except ProviderUnavailable:
+        elapsed = time.perf_counter() - started
+        degraded_mode.record_outcome(False, elapsed)
+        # Failures count as at least as slow as the timeout, so the router also
+        # moves off a primary that times out or errors rather than only a slow one
+        model_latency_tracker(node, llm.model_name).record(max(elapsed, llm.request_timeout or 0.0))
+        raise
+    degraded_mode.record_outcome(True, time.perf_counter() - started)
+    return result
+
+
+def call_llm(state: Optional[Dict], node: str, llm: ChatOpenAI, messages: List[BaseMessage]) -> Any:
+    """
+    Invoke a chat model and record token usage for the node
+
+    Args:
+        state: Conversation state to append usage to (or None)
+        node: Workflow node / prompt name
+        llm: Chat model
+        messages: Rendered prompt messages
+
+    Returns:
+        AIMessage response
+
+    Raises:
+        ProviderUnavailable: If the governor rejects the call or retries are exhausted
+        DeadlineExceeded: If the call does not finish within the turn budget
+    """
+    started = time.perf_counter()
+    response = _invoke(state, node, llm, lambda model: model.invoke(messages), messages)
+    _record_usage(state, node, llm, response, (time.perf_counter() - started) * 1000)
+    return response
+
+
+def call_structured_llm(
+    state: Optional[Dict],
+    node: str,
+    llm: ChatOpenAI,
+    schema: Type[BaseModel],
+    messages: List[BaseMessage]
+) -> BaseModel:
+    """
+    Invoke a chat model with structured output and record token usage for the node
+
+    Args:
+        state: Conversation state to append usage to (or None)
+        node: Workflow node / prompt name
+        llm: Chat model
+        schema: Pydantic model describing the output
+        messages: Rendered prompt messages
+
+    Returns:
+        Parsed schema instance
+
+    Raises:
+        ProviderUnavailable: If the governor rejects the call or retries are exhausted
+        DeadlineExceeded: If the call does not finish within the turn budget
+        Exception: If the response could not be parsed into the schema
+    """
+    started = time.perf_counter()
+    result = _invoke(
+        state, node, llm,
+        lambda model: model.with_structured_output(schema, include_raw=True).invoke(messages),
+        messages
+    )
+    _record_usage(state, node, llm, result["raw"], (time.perf_counter() - started) * 1000)
+    if result.get("parsing_error"):
+        raise result["parsing_error"]
+    return result["parsed"]
@@ -0,0 +1,464 @@
+"""
+Tour booking state machine
+
+Collecting a tour time, name, email and phone is slot filling: each step
+validates one field with a deterministic parser and asks for the next one with
+a templated prompt. The booking is stored on the session
+(ConversationSession.tour_booking) and only free-form turns (questions,
+messages that don't fill the expected field) go to the LLM.
+
+Tour times come from the TourSlot inventory: requested times are matched to open
+slots, alternatives are offered from open slots, and the slot is taken when the
+booking is confirmed.
+
+Stages: awaiting_time -> awaiting_name -> awaiting_email -> awaiting_phone -> confirmed
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from sales_agent import tour_slots, tour_time
+
+
+STAGE_AWAITING_TIME = "awaiting_time"
+STAGE_AWAITING_NAME = "awaiting_name"
+STAGE_AWAITING_EMAIL = "awaiting_email"
+STAGE_AWAITING_PHONE = "awaiting_phone"
+STAGE_CONFIRMED = "confirmed"
+
+# Templated follow-up prompts
+BOOKING_PROMPTS = {
+    "ask_time_on_day": "On {day} we have openings at {choices}. Which time works best for you?",
+    "no_openings_on_day": "We don't have any open tours on {day}. The next openings are {choices}. Would one of those work?",
+    "unavailable": (
+        "{when} isn't available - tours run Monday through Friday, {hours}. "
+        "The closest open times are {choices}. Which works best for you?"
+    ),
+    "slot_taken": "I'm sorry, {when} was just booked. The closest open times are {choices}. Which works best for you?",
+    "no_slots": "We don't have any open tour times right now. Our team will reach out to find a time that works for you.",
+    "ask_name": "{when} works great! Could you please provide your full name?",
+    "ask_email": "Thank you, {first_name}! What's the best email address to reach you?",
+    "reask_email": "That email address doesn't look quite right. Could you double-check it for me?",
+    "ask_phone": "Got it. And what's the best phone number to reach you?",
+    "reask_phone": "I didn't catch a full phone number there. Could you share it with the area code?",
+    "confirmed": (
+        "You're all set, {first_name}! Your tour is scheduled for {when}. "
+        "We'll send a confirmation to {email}. Is there anything else I can help you with?"
+    ),
+    "rescheduled": "No problem, I've moved your tour to {when}. See you then!",
+}
+
+CONTACT_FIELDS = (
+    ("name", STAGE_AWAITING_NAME),
+    ("email", STAGE_AWAITING_EMAIL),
+    ("phone", STAGE_AWAITING_PHONE),
+)
+
+EMAIL_PATTERN = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+PHONE_PATTERN = re.compile(r"(?<!\d)(?:\+?1[\s.-]?)?\(?(\d{3})\)?[\s.-]?(\d{3})[\s.-]?(\d{4})(?!\d)")
+NAME_PREFIX_PATTERN = re.compile(
+    r"^\s*(?:(?:hi|hello|sure|yes|ok|okay)[,!.]?\s+)?(?:my name is|my name's|name is|name's|i am|i'm|im|this is|it's|it is)\s+",
+    re.IGNORECASE,
+)
+NAME_WORD_PATTERN = re.compile(r"^[A-Za-z][A-Za-z'.-]*$")
+RESCHEDULE_PATTERN = re.compile(r"\b(?:reschedul\w*|instead|change|move|moving|actually|different)\b", re.IGNORECASE)
+AFFIRMATIVE_PATTERN = re.compile(
+    r"^\s*(?:yes|yeah|yep|yup|sure|ok|okay|sounds good|that works|works for me|perfect|great)\b", re.IGNORECASE
+)
+
+# Messages that ask something rather than answer the booking prompt
+QUESTION_WORDS = {
+    "what", "how", "when", "where", "why", "who", "which", "do", "does", "did", "can", "could", "would",
+    "will", "should", "is", "are", "was", "were", "any", "much", "many",
+}
+# Words that mean a message is not a name: replies, fillers and community topics
+NOT_NAME_WORDS = QUESTION_WORDS | {
+    "yes", "no", "not", "ok", "okay", "sure", "thanks", "thank", "please", "hi", "hello", "hey", "just",
+    "the", "a", "an", "and", "or", "for", "in", "on", "at", "to", "of", "with", "about", "my", "me", "we",
+    "you", "your", "our", "it", "this", "that", "there", "looking", "interested", "wondering", "need",
+    "want", "asking", "tour", "visit", "time", "day", "today", "tomorrow", "morning", "afternoon",
+    "assisted", "independent", "memory", "skilled", "nursing", "respite", "care", "living", "senior",
+    "cost", "costs", "price", "prices", "pricing", "rate", "rates", "rent", "fee", "fees", "deposit",
+    "budget", "monthly", "afford", "medicaid", "medicare", "insurance", "va", "veterans", "financing",
+    "payment", "pets", "pet", "dog", "dogs", "cat", "cats", "allowed", "policy", "smoking", "parking",
+    "meal", "meals", "dining", "food", "menu", "kosher", "vegetarian", "diet", "amenities", "activities",
+    "pool", "gym", "fitness", "transportation", "laundry", "wifi", "apartment", "apartments", "room",
+    "rooms", "studio", "bedroom", "available", "availability", "openings", "hours", "info", "information",
+    "question", "questions", "help", "mom", "dad", "mother", "father", "parent", "parents", "wife",
+    "husband", "dementia", "alzheimers", "alzheimer's",
+}
+# Tour words that tie a message mentioning a day or time to the booking
+TOUR_INTENT_PATTERN = re.compile(
+    r"\b(?:tours?|visit\w*|come (?:by|in|over|see)|stop by|drop by|schedul\w*|reschedul\w*|book\w*|appointment)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class BookingTurn:
+    """Result of applying one user message to the booking"""
+    booking: Dict
+    reply: Optional[str] = None  # None: free-form turn, answer with the LLM
+    events: List[Dict] = field(default_factory=list)  # Enrichment events produced deterministically
+
+
+def is_question(message: str) -> bool:
+    """A message asking something ("Pets allowed?", "how much is it")"""
+    words = message.strip().split()
+    return "?" in message or (bool(words) and words[0].lower().strip(",.!") in QUESTION_WORDS)
+
+
+def parse_name(message: str) -> Optional[str]:
+    """
+    Extract a person's name from a short reply ("Eric Smith", "my name is eric")
+
+    Without a prefix ("my name is", "I'm") a question or a reply containing
+    question, filler or community words ("Assisted living cost") is not a name.
+    """
+    text, prefixed = NAME_PREFIX_PATTERN.subn("", message)
+    if not prefixed and is_question(message):
+        return None
+    words = text.strip().rstrip(".!").split()
+    if not 1 <= len(words) <= 4:
+        return None
+    if any(not NAME_WORD_PATTERN.match(word) or word.lower() in NOT_NAME_WORDS for word in words):
+        return None
+    return " ".join(word if not word.islower() else word.capitalize() for word in words)
+
+
+def parse_email(message: str) -> Optional[str]:
+    """Extract an email address"""
+    match = EMAIL_PATTERN.search(message)
+    return match.group(0).lower() if match else None
+
+
+def parse_phone(message: str) -> Optional[str]:
+    """Extract a US phone number, formatted as 555-123-4567"""
+    match = PHONE_PATTERN.search(message)
+    return "-".join(match.groups()) if match else None
+
+
+def _hours_text() -> str:
+    """e.g. "9:00 AM to 6:00 PM" """
+    start, end = tour_time.tour_hours()
+    return f"{start.strftime('%I:%M %p').lstrip('0')} to {end.strftime('%I:%M %p').lstrip('0')}"
+
+
+def _event(event_type: str, event_data: Dict, message: str) -> Dict:
+    return {"event_type": event_type, "event_data": event_data, "source_message": message, "confidence": 1.0}
+
+
+def _tour_scheduled_event(tour_at: datetime, message: str) -> Dict:
+    return _event(
+        "tour_scheduled",
+        {"date": tour_time.format_tour_date(tour_at), "time": tour_time.format_tour_time(tour_at)},
+        message,
+    )
+
+
+def requested_time(message: str, booking: Dict, now: datetime) -> Optional[Dict]:
+    """
+    Parse a requested tour time from a message
+
+    Returns:
+        {"date": date or None, "time": time or None}, or None if no date or time is mentioned.
+        A bare time applies to the date already requested in this booking.
+    """
+    tour_clock = tour_time.parse_time(message)
+    tour_date = tour_time.parse_date(message, now, at=tour_clock)
+    if tour_date is None and tour_clock is None:
+        return None
+    if tour_date is None and booking.get("requested_date"):
+        tour_date = datetime.fromisoformat(booking["requested_date"]).date()
+    return {"date": tour_date, "time": tour_clock}
+
+
+def _accepts_offer(booking: Dict, message: str) -> bool:
+    """A "yes" to the single time we offered"""
+    return len(booking.get("offered", [])) == 1 and bool(AFFIRMATIVE_PATTERN.search(message))
+
+
+def _offer(booking: Dict, slots: List, template: str, include_date: bool = True, **values) -> str:
+    """Remember the offered slots and render the reply listing them"""
+    booking["offered"] = [slot.start.isoformat() for slot in slots]
+    if not slots:
+        return BOOKING_PROMPTS["no_slots"]
+    choices = tour_slots.format_slot_choices(slots, include_date=include_date)
+    return BOOKING_PROMPTS[template].format(choices=choices, **values)
+
+
+def _choose(booking: Dict, slot) -> None:
+    booking["tour_at"] = slot.start.isoformat()
+    booking["slot_id"] = str(slot.slot_id)
+    for key in ("offered", "requested_date"):
+        booking.pop(key, None)
+
+
+def _set_time(booking: Dict, message: str, now: datetime) -> Optional[str]:
+    """
+    Match a requested time to an open slot
+
+    Sets booking["tour_at"] and booking["slot_id"] when the message picks an open slot.
+
+    Returns:
+        Templated reply offering open slots when the time is incomplete or unavailable, otherwise None
+    """
+    requested = requested_time(message, booking, now)
+    if requested is None:
+        if _accepts_offer(booking, message):
+            slot = tour_slots.find_open_slot(datetime.fromisoformat(booking["offered"][0]))
+            if slot:
+                _choose(booking, slot)
+                return None
+            return _offer(
+                booking, tour_slots.slots_near(now), "slot_taken",
+                when=tour_time.format_tour_datetime(datetime.fromisoformat(booking["offered"][0])),
+            )
+        return None
+
+    if requested["time"] is None:
+        # A day without a time: offer that day's openings
+        day = requested["date"]
+        slots = tour_slots.open_slots_on(day, limit=settings.TOUR_SLOT_OFFER_COUNT)
+        if slots:
+            booking["requested_date"] = day.isoformat()
+            return _offer(
+                booking, slots, "ask_time_on_day", include_date=False,
+                day=tour_time.format_tour_date(slots[0].start),
+            )
+        return _offer(
+            booking, tour_slots.slots_near(tour_time.combine(day, time())), "no_openings_on_day",
+            day=day.strftime("%A"),
+        )
+
+    if requested["date"] is None:
+        # A time without a day: the next day with an opening at that time
+        candidates = [tour_time.combine(now.date() + timedelta(days=offset), requested["time"]) for offset in range(14)]
+        slot = tour_slots.first_open_slot(candidates)
+        tour_at = candidates[0] if candidates[0] > now else candidates[1]
+    else:
+        tour_at = tour_time.combine(requested["date"], requested["time"])
+        slot = tour_slots.find_open_slot(tour_at) if tour_at > now else None
+
+    if slot is None:
+        return _offer(
+            booking, tour_slots.slots_near(max(tour_at, now)), "unavailable",
+            when=tour_time.format_tour_datetime(tour_at), hours=_hours_text(),
+        )
+
+    _choose(booking, slot)
+    return None
+
+
+def _next_stage(booking: Dict) -> Optional[str]:
+    """The stage collecting the first missing contact field, or None when all are known"""
+    for field_name, stage in CONTACT_FIELDS:
+        if not booking.get(field_name):
+            return stage
+    return None
+
+
+def _confirm(booking: Dict, message: str, events: List[Dict]) -> "BookingTurn":
+    """Take the chosen slot and confirm, or offer other slots if it filled up meanwhile"""
+    tour_at = datetime.fromisoformat(booking["tour_at"])
+    if not tour_slots.book_slot(booking["slot_id"]):
+        booking["stage"] = STAGE_AWAITING_TIME
+        booking.pop("tour_at", None)
+        booking.pop("slot_id", None)
+        reply = _offer(
+            booking, tour_slots.slots_near(tour_at), "slot_taken", when=tour_time.format_tour_datetime(tour_at)
+        )
+        return BookingTurn(booking, reply, events)
+
+    booking["stage"] = STAGE_CONFIRMED
+    reply = BOOKING_PROMPTS["confirmed"].format(
+        first_name=booking["name"].split()[0],
+        when=tour_time.format_tour_datetime(tour_at),
+        email=booking["email"],
+    )
+    return BookingTurn(booking, reply, events + [_tour_scheduled_event(tour_at, message)])
+
+
+def _reschedule(booking: Dict, message: str, now: datetime) -> "BookingTurn":
+    """Move a confirmed tour to a newly requested open slot"""
+    previous = {key: booking.get(key) for key in ("tour_at", "slot_id")}
+    reply = _set_time(booking, message, now)
+    if reply:
+        return BookingTurn(booking, reply)
+    if booking.get("slot_id") == previous["slot_id"]:
+        return BookingTurn(booking)
+
+    tour_at = datetime.fromisoformat(booking["tour_at"])
+    if not tour_slots.book_slot(booking["slot_id"]):
+        booking.update(previous)
+        return BookingTurn(booking, _offer(
+            booking, tour_slots.slots_near(tour_at), "slot_taken", when=tour_time.format_tour_datetime(tour_at)
+        ))
+    if previous["slot_id"]:
+        tour_slots.release_slot(previous["slot_id"])
+    return BookingTurn(
+        booking,
+        BOOKING_PROMPTS["rescheduled"].format(when=tour_time.format_tour_datetime(tour_at)),
+        [_tour_scheduled_event(tour_at, message)],
+    )
+
+
+def advance(booking: Optional[Dict], message: str, now: Optional[datetime] = None) -> BookingTurn:
+    """
+    Apply a user message to the tour booking
+
+    Args:
+        booking: Current booking state from the session ({} if none)
+        message: User message
+        now: Reference time (defaults to the community's current time)
+
+    Returns:
+        BookingTurn with the updated booking, a templated reply (None for free-form
+        turns the LLM should answer) and any enrichment events
+    """
+    booking = dict(booking or {})
+    now = now or tour_time.local_now()
+    stage = booking.get("stage") or STAGE_AWAITING_TIME
+    booking["stage"] = stage
+
+    if stage == STAGE_CONFIRMED:
+        if not (RESCHEDULE_PATTERN.search(message) or booking.get("offered")):
+            return BookingTurn(booking)
+        return _reschedule(booking, message, now)
+
+    if stage == STAGE_AWAITING_TIME:
+        reply = _set_time(booking, message, now)
+        if not reply and not booking.get("tour_at"):
+            # No usable time in the message: free-form turn (the LLM extracts enrichment)
+            return BookingTurn(booking)
+
+        # The first templated reply records the tour request (free-form turns leave it to the LLM)
+        events = []
+        if not booking.get("requested"):
+            booking["requested"] = True
+            events.append(_event("tour_requested", {}, message))
+        if reply:
+            return BookingTurn(booking, reply, events)
+
+        next_stage = _next_stage(booking)
+        if next_stage is None:
+            # Contact details were collected before the chosen slot filled up
+            return _confirm(booking, message, events)
+        booking["stage"] = next_stage
+        if next_stage == STAGE_AWAITING_NAME:
+            when = tour_time.format_tour_datetime(datetime.fromisoformat(booking["tour_at"]))
+            return BookingTurn(booking, BOOKING_PROMPTS["ask_name"].format(when=when), events)
+        if next_stage == STAGE_AWAITING_EMAIL:
+            return BookingTurn(booking, BOOKING_PROMPTS["ask_email"].format(first_name=booking["name"].split()[0]), events)
+        return BookingTurn(booking, BOOKING_PROMPTS["ask_phone"], events)
+
+    if stage == STAGE_AWAITING_NAME:
+        name = parse_name(message)
+        if not name:
+            return BookingTurn(booking)
+        booking["name"] = name
+        booking["stage"] = STAGE_AWAITING_EMAIL
+        return BookingTurn(
+            booking,
+            BOOKING_PROMPTS["ask_email"].format(first_name=name.split()[0]),
+            [_event("contact_shared", {"name": name}, message)],
+        )
+
+    if stage == STAGE_AWAITING_EMAIL:
+        email = parse_email(message)
+        if not email:
+            return BookingTurn(booking, BOOKING_PROMPTS["reask_email"] if "@" in message else None)
+        booking["email"] = email
+        booking["stage"] = STAGE_AWAITING_PHONE
+        return BookingTurn(booking, BOOKING_PROMPTS["ask_phone"], [_event("contact_shared", {"email": email}, message)])
+
+    if stage == STAGE_AWAITING_PHONE:
+        phone = parse_phone(message)
+        if not phone:
+            return BookingTurn(booking, BOOKING_PROMPTS["reask_phone"] if _digit_count(message) >= 5 else None)
+        booking["phone"] = phone
+        return _confirm(booking, message, [_event("contact_shared", {"phone": phone}, message)])
+
+    return BookingTurn(booking)
+
+
+def _digit_count(message: str) -> int:
+    return sum(character.isdigit() for character in message)
+
+
+def accepts(booking: Optional[Dict], message: str, now: Optional[datetime] = None) -> bool:
+    """
+    Whether an in-progress booking handles this message without the LLM
+
+    Only parses the message (no slot queries or bookings), so it is safe to call
+    from the intent classifier before the tour agent runs advance().
+    """
+    if not booking or not booking.get("stage"):
+        return False
+    stage = booking["stage"]
+    now = now or tour_time.local_now()
+
+    if stage == STAGE_AWAITING_NAME:
+        return parse_name(message) is not None
+    if stage == STAGE_AWAITING_EMAIL:
+        return parse_email(message) is not None or "@" in message
+    if stage == STAGE_AWAITING_PHONE:
+        return parse_phone(message) is not None or _digit_count(message) >= 5
+
+    if not _continues_booking(booking, message):
+        return False
+    return requested_time(message, booking, now) is not None or _accepts_offer(booking, message)
+
+
+def _continues_booking(booking: Dict, message: str) -> bool:
+    """
+    Whether a message about a day or time is aimed at the booking (awaiting_time and confirmed stages)
+
+    The stage outlives the tour conversation, so a message only continues it
+    when it mentions the tour, or answers times we just offered without asking
+    about something else ("price on Tuesday?" goes to the classifier).
+    """
+    if TOUR_INTENT_PATTERN.search(message):
+        return True
+    if is_question(message):
+        return False
+    if booking["stage"] == STAGE_CONFIRMED:
+        return bool(RESCHEDULE_PATTERN.search(message) or booking.get("offered"))
+    return bool(booking.get("offered") or booking.get("requested_date"))
+
+
+def expire_offer(booking: Optional[Dict]) -> Dict:
+    """
+    Forget offered times once a turn goes elsewhere
+
+    Called for messages accepts() rejected, so a later reply mentioning a day
+    is no longer read as picking one of them.
+    """
+    booking = dict(booking or {})
+    booking.pop("offered", None)
+    booking.pop("requested_date", None)
+    return booking
+
+
+def note_proposed_time(booking: Dict, agent_response: str, now: Optional[datetime] = None) -> Dict:
+    """
+    Remember an open slot the LLM suggested so a "yes" on the next turn books it
+
+    Args:
+        booking: Booking state (updated copy is returned)
+        agent_response: The assistant's free-form reply
+    """
+    booking = dict(booking)
+    if booking.get("stage") != STAGE_AWAITING_TIME:
+        return booking
+    now = now or tour_time.local_now()
+    tour_clock = tour_time.parse_time(agent_response)
+    tour_date = tour_time.parse_date(agent_response, now, at=tour_clock)
+    if tour_date and tour_clock:
+        slot = tour_slots.find_open_slot(tour_time.combine(tour_date, tour_clock))
+        if slot:
+            booking["offered"] = [slot.start.isoformat()]
+    return booking
@@ -2,11 +2,22 @@
 LangGraph workflow for multi-agent sales conversation system
 """
 import os
-from typing import TypedDict, List, Dict, Annotated, Optional
+import sys
+import time
+from datetime import datetime
+from typing import TypedDict, List, Dict, Annotated, Optional, Tuple
 from pydantic import BaseModel, Field
+from django.conf import settings
 from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
-from sales_agent.rag import retriever
+from sales_agent.rag import SEARCH_MODE_LEXICAL, retriever
+from sales_agent.static_context import StaticContext, get_category_context, get_static_query_context
+from sales_agent.llm_governor import ProviderUnavailable
+from sales_agent.agents.llm import select_llm, call_llm, call_structured_llm, remaining_budget
+from sales_agent.agents.degraded import degraded_answer, degraded_mode, keyword_intent
+from sales_agent.agents import tour_booking
+from sales_agent import cassette, tour_slots, tour_time
+from sales_agent.understanding import reduce_events
+from sales_agent.agents.prompts import render_prompt
 # TODO: Re-enable LangFuse observability with correct API
 # from langfuse import Langfuse
 # from langfuse.decorators import observe, langfuse_context
@@ -45,6 +56,18 @@ class EnrichmentEventList(BaseModel):
     events: List[EnrichmentEvent] = Field(default_factory=list, description="List of extracted enrichment events")
 
 
+class TurnAnalysis(BaseModel):
+    """Intent and enrichment events extracted from a single user turn"""
+    intent: str = Field(description="One of: pricing, tour_scheduling, amenities, financing, general_info")
+    enrichment: EnrichmentEventList = Field(default_factory=EnrichmentEventList, description="Enrichment events found in the user message")
+
+
+# Workflow modes
+WORKFLOW_MODE_SEQUENTIAL = "sequential"  # classify_intent -> agent -> extract_enrichment -> update_understanding
+WORKFLOW_MODE_COMBINED = "combined"  # analyze_turn -> agent -> update_understanding
+WORKFLOW_MODES = (WORKFLOW_MODE_SEQUENTIAL, WORKFLOW_MODE_COMBINED)
+
+
 # Conversation State Definition
 class ConversationState(TypedDict):
     """
@@ -58,6 +81,54 @@ class ConversationState(TypedDict):
     rag_context: List[Dict]
     enrichment_events: List[Dict]
     current_understanding: Dict[str, any]
+    llm_usage: List[Dict]  # Token counts (incl. cached prompt tokens) per LLM call
+    deadline: float  # Wall-clock time (time.time()) by which the turn must finish
+    skipped_nodes: List[str]  # Non-essential nodes skipped to meet the deadline
+    hedged_nodes: List[str]  # Nodes whose LLM call was hedged with a duplicate request
+    model_decisions: List[Dict]  # Model tier chosen for each LLM call (see LatencyRouter)
+    degraded: bool  # Answered from knowledge base templates without the LLM
+    tour_booking: Dict  # Tour booking state machine (see agents/tour_booking.py), persisted on the session
+    templated_response: bool  # Response came from the tour booking templates, no enrichment call needed
+
+
+def initial_state(
+    session_id: str,
+    user_message: str,
+    conversation_history: Optional[List[Dict]] = None,
+    current_understanding: Optional[Dict] = None,
+    intent: str = "",
+    budget_seconds: Optional[float] = None,
+    degraded: Optional[bool] = None,
+    tour_booking: Optional[Dict] = None
+) -> ConversationState:
+    """
+    Build the workflow input state for a single turn
+
+    Args:
+        budget_seconds: Time allowed for the whole turn (defaults to settings.CHAT_TURN_BUDGET_SECONDS)
+        degraded: Answer without the LLM (defaults to the degraded-mode controller's decision)
+        tour_booking: Tour booking state stored on the session
+    """
+    budget_seconds = budget_seconds if budget_seconds is not None else settings.CHAT_TURN_BUDGET_SECONDS
+    degraded = degraded if degraded is not None else degraded_mode.is_active()
+    return {
+        "session_id": session_id,
+        "user_message": user_message,
+        "conversation_history": conversation_history if conversation_history is not None else [],
+        "intent": intent,
+        "agent_response": "",
+        "rag_context": [],
+        "enrichment_events": [],
+        "current_understanding": current_understanding if current_understanding is not None else {},
+        "llm_usage": [],
+        "deadline": time.time() + budget_seconds,
+        "skipped_nodes": [],
+        "hedged_nodes": [],
+        "model_decisions": [],
+        "degraded": degraded,
+        "tour_booking": tour_booking if tour_booking is not None else {},
+        "templated_response": False,
+    }
 
 
 # TODO: Re-enable LangFuse initialization
@@ -68,14 +139,83 @@ class ConversationState(TypedDict):
 # )
 
 
-# Initialize LLM
-def get_llm():
-    """Get OpenAI LLM instance"""
-    return ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0.7,
-        api_key=os.getenv("OPENAI_API_KEY")
-    )
+def is_collecting_tour_contact(history: List[Dict]) -> bool:
+    """
+    Check whether the last assistant message asked for contact info during tour scheduling
+    """
+    last_assistant_msg = None
+    last_intent = None
+    for msg in reversed(history):
+        if msg.get("role") == "assistant":
+            last_assistant_msg = msg.get("content", "").lower()
+            last_intent = msg.get("intent")
+            break
+
+    # If we were in tour_scheduling and asking for contact info, stay in tour_scheduling
+    if last_intent == "tour_scheduling" and last_assistant_msg:
+        contact_keywords = ["name", "email", "phone", "contact", "reach you", "full name"]
+        return any(keyword in last_assistant_msg for keyword in contact_keywords)
+
+    return False
+
+
+def mark_degraded(state: ConversationState, node: str, error: Exception):
+    """Switch the rest of the turn to degraded mode after a provider failure"""
+    print(f"Provider unavailable in {node}, answering in degraded mode: {error}", file=sys.stderr)
+    state["degraded"] = True
+
+
+def retrieve(
+    state: ConversationState,
+    query: str,
+    category_filter: Optional[List[str]] = None,
+    top_k: int = 5
+) -> List[Dict]:
+    """
+    Search the knowledge base, using lexical search only when the turn is degraded
+
+    Falls back to lexical search (and degrades the turn) if the embeddings API is unavailable.
+    """
+    if not state.get("degraded"):
+        try:
+            return retriever.search(query, category_filter=category_filter, top_k=top_k, deadline=state.get("deadline"))
+        except ProviderUnavailable as e:
+            mark_degraded(state, "retrieve", e)
+    return retriever.search(query, category_filter=category_filter, top_k=top_k, mode=SEARCH_MODE_LEXICAL)
+
+
+def static_query_context(state: ConversationState, name: str) -> Optional[StaticContext]:
+    """
+    Get a precomputed fixed-query context, or None when the turn is degraded or the
+    embeddings API is unavailable to build it (the caller then retrieves lexically)
+    """
+    if state.get("degraded"):
+        return None
+    try:
+        return get_static_query_context(name, deadline=state.get("deadline"))
+    except ProviderUnavailable as e:
+        mark_degraded(state, "static_context", e)
+        return None
+
+
+def generate_response(state: ConversationState, node: str, render_messages) -> str:
+    """
+    Answer with the node's LLM, or from knowledge base templates when the turn is degraded
+
+    Args:
+        node: Agent node name (selects model config and prompt)
+        render_messages: Callable returning the rendered prompt messages
+
+    Returns:
+        Response text
+    """
+    if not state.get("degraded"):
+        try:
+            llm = select_llm(state, node)
+            return call_llm(state, node, llm, render_messages()).content
+        except ProviderUnavailable as e:
+            mark_degraded(state, node, e)
+    return degraded_answer(state.get("intent", "general_info"), state.get("rag_context", []))
 
 
 # Agent Node: Intent Classifier
@@ -83,51 +223,86 @@ def classify_intent_node(state: ConversationState) -> ConversationState:
     """
     Classify user intent to route to appropriate agent
     """
-    llm = get_llm()
     user_message = state["user_message"]
     history = state.get("conversation_history", [])[-30:]  # Last 30 messages for comprehensive context
 
+    # Deterministic check: an in-progress tour booking handles replies that fill its next field
+    if tour_booking.accepts(state.get("tour_booking"), user_message):
+        state["intent"] = "tour_scheduling"
+        return state
+    if state.get("tour_booking"):
+        state["tour_booking"] = tour_booking.expire_offer(state["tour_booking"])
+
     # Rule-based check: If last assistant message was asking for contact info during tour scheduling, keep the intent
-    if history:
-        last_assistant_msg = None
-        last_intent = None
-        for msg in reversed(history):
-            if msg.get("role") == "assistant":
-                last_assistant_msg = msg.get("content", "").lower()
-                last_intent = msg.get("intent")
-                break
-
-        # If we were in tour_scheduling and asking for contact info, stay in tour_scheduling
-        if last_intent == "tour_scheduling" and last_assistant_msg:
-            contact_keywords = ["name", "email", "phone", "contact", "reach you", "full name"]
-            if any(keyword in last_assistant_msg for keyword in contact_keywords):
-                # User is likely providing contact info, keep tour_scheduling intent
-                state["intent"] = "tour_scheduling"
-                return state
-
-    prompt = f"""You are an intent classifier for a senior living sales assistant.
-
-Classify the user's intent into ONE category:
-- pricing: Cost, fees, monthly rates, what's included in price
-- tour_scheduling: Schedule tour, visit, see the community, OR providing contact info (name/email/phone) during tour booking
-- amenities: Facilities, services, activities, dining, what's available
-- financing: Medicaid, insurance, payment options, financial assistance
-- general_info: Everything else (contact info, policies, room types, care types, etc.)
-
-IMPORTANT:
-- If the assistant just asked for name, email, or phone number, and the user is responding with that information, classify as "tour_scheduling"
-- Look at the recent conversation to detect ongoing information collection flows
-- A phone number, email, or name by itself during tour scheduling should be classified as "tour_scheduling"
-
-User message: {user_message}
-Recent context: {history}
-
-Return ONLY the category name, nothing else."""
-
-    response = llm.invoke(prompt)
-    intent = response.content.strip().lower()
+    # (sessions started before tour booking state was stored)
+    if not state.get("tour_booking") and is_collecting_tour_contact(history):
+        # User is likely providing contact info, keep tour_scheduling intent
+        state["intent"] = "tour_scheduling"
+        return state
+
+    if not state.get("degraded"):
+        try:
+            llm = select_llm(state, "classify_intent")
+
+            messages = render_prompt("classify_intent", user_message=user_message, history=history)
+
+            response = call_llm(state, "classify_intent", llm, messages)
+            state["intent"] = response.content.strip().lower()
+            return state
+        except ProviderUnavailable as e:
+            mark_degraded(state, "classify_intent", e)
+
+    state["intent"] = keyword_intent(user_message)
+    return state
+
+
+# Agent Node: Combined Intent + Enrichment Analyzer
+def analyze_turn_node(state: ConversationState) -> ConversationState:
+    """
+    Classify intent and extract enrichment events with a single structured LLM call
+
+    Replaces classify_intent + extract_enrichment in the "combined" workflow mode.
+    The events are held in state so update_understanding runs without a second call.
+    """
+    user_message = state["user_message"]
+    history = state.get("conversation_history", [])[-30:]
+
+    booking_reply = tour_booking.accepts(state.get("tour_booking"), user_message)
+    if not booking_reply and state.get("tour_booking"):
+        state["tour_booking"] = tour_booking.expire_offer(state["tour_booking"])
+
+    if booking_reply:
+        # The tour booking state machine handles this reply and emits its own events
+        intent = "tour_scheduling"
+        events = []
+    elif state.get("degraded"):
+        intent = keyword_intent(user_message)
+        events = []
+    else:
+        llm = select_llm(state, "analyze_turn")
+
+        messages = render_prompt("analyze_turn", user_message=user_message, history=history)
+
+        try:
+            result = call_structured_llm(state, "analyze_turn", llm, TurnAnalysis, messages)
+            intent = result.intent.strip().lower()
+            events = [event.model_dump() for event in result.enrichment.events]
+        except ProviderUnavailable as e:
+            mark_degraded(state, "analyze_turn", e)
+            intent = keyword_intent(user_message)
+            events = []
+        except Exception as e:
+            # Log error but continue gracefully with the fallback agent and no events
+            print(f"Error analyzing turn: {e}", file=sys.stderr)
+            intent = "general_info"
+            events = []
+
+    # Same rule-based override as classify_intent_node
+    if not state.get("tour_booking") and is_collecting_tour_contact(history):
+        intent = "tour_scheduling"
 
     state["intent"] = intent
+    state["enrichment_events"] = events
     return state
 
 
@@ -136,64 +311,78 @@ def pricing_agent_node(state: ConversationState) -> ConversationState:
     """
     Handle pricing inquiries
     """
-    llm = get_llm()
     user_message = state["user_message"]
     history = state.get("conversation_history", [])
 
-    # Retrieve pricing knowledge
-    rag_results = retriever.search(user_message, category_filter=["pricing"], top_k=3)
+    # Use the whole pricing category when small enough, otherwise retrieve
+    static_context = get_category_context("pricing")
+    if static_context:
+        rag_results = static_context.rag_context
+        knowledge_context = static_context.knowledge_context
+    else:
+        rag_results = retrieve(state, user_message, category_filter=["pricing"], top_k=3)
+        knowledge_context = "\n".join([f"- {item['content']}" for item in rag_results])
 
     state["rag_context"] = rag_results
 
-    # Format RAG context
-    knowledge_context = "\n".join([f"- {item['content']}" for item in rag_results])
-
-    prompt = f"""You are Sophie, a sales specialist at ACME Senior Living.
-
-Answer the user's pricing question using ONLY the facts provided below.
-
-PRICING FACTS (from Step 5):
-- Community starts at $2,000/month
-- Assisted Living starts from $3,000/month
-- Independent Living starts from $2,000/month
-- Entrance fee: $3,500
-- Included in monthly cost: Basic Cable, Internet/WiFi, Linen Service, Breakfast, Lunch, Dinner, Housekeeping
-- You do NOT have information on pricing per room type or size
-
-Additional Knowledge Base:
-{knowledge_context}
+    state["agent_response"] = generate_response(state, "pricing_agent", lambda: render_prompt(
+        "pricing_agent",
+        knowledge_context=knowledge_context,
+        history=history[-2:] if history else [],
+        user_message=user_message,
+    ))
 
-Guidelines:
-- Be warm and conversational
-- Provide the specific pricing information above when asked about costs
-- If asked about specific room pricing, say: "I don't have pricing per room type, but I can share our general rates. Would you like to hear those?"
-- After answering, ALWAYS suggest scheduling a tour
-- Keep response to 2-3 sentences maximum
-
-Conversation history: {history[-2:] if history else []}
-User's question: {user_message}
+    return state
 
-Your response:"""
 
-    response = llm.invoke(prompt)
-    state["agent_response"] = response.content
+def tour_prompt_availability() -> Tuple[str, str]:
+    """
+    Current date and time and the open slots to offer, formatted for the tour prompt
 
-    return state
+    Normally the live clock and the real open slots in the inventory. While a
+    cassette is active both are frozen (settings.LLM_CASSETTE_CLOCK and the
+    tour calendar from then on) so the prompt, and its recorded response,
+    are the same on every run.
+    """
+    limit = settings.TOUR_SLOT_OFFER_COUNT * 2
+    if not cassette.is_active():
+        now = tour_time.local_now()
+        starts = [slot.start for slot in tour_slots.open_slots(limit=limit)]
+    else:
+        now = datetime.fromisoformat(settings.LLM_CASSETTE_CLOCK).replace(tzinfo=tour_time.community_timezone())
+        starts = [
+            start for start in tour_slots.slot_starts(now.date(), settings.TOUR_SLOT_HORIZON_DAYS) if start > now
+        ][:limit]
+    return now.strftime("%A, %B %d, %Y, %I:%M %p"), tour_slots.format_slot_list(starts)
 
 
 # Agent Node: Tour Scheduling Agent
 def tour_scheduling_agent_node(state: ConversationState) -> ConversationState:
     """
     Handle tour scheduling requests and collect contact information
+
+    Time, name, email and phone are collected by the tour booking state machine
+    with templated prompts; the LLM only answers free-form turns.
     """
-    llm = get_llm()
     user_message = state["user_message"]
     history = state.get("conversation_history", [])
 
-    # Retrieve tour availability
-    rag_results = retriever.search("tour availability hours", category_filter=["tour"], top_k=1)
-    state["rag_context"] = rag_results
-    knowledge_context = "\n".join([f"- {item['content']}" for item in rag_results])
+    turn = tour_booking.advance(state.get("tour_booking"), user_message)
+    state["tour_booking"] = turn.booking
+    if turn.reply is not None:
+        state["agent_response"] = turn.reply
+        state["enrichment_events"] = state.get("enrichment_events", []) + turn.events
+        state["templated_response"] = True
+        return state
+
+    # Tour availability is a fixed query, precomputed once per worker
+    static_context = static_query_context(state, "tour_availability")
+    if static_context:
+        state["rag_context"] = static_context.rag_context
+        knowledge_context = static_context.knowledge_context
+    else:
+        state["rag_context"] = retrieve(state, "tour availability hours", category_filter=["tour"], top_k=1)
+        knowledge_context = "\n".join([f"- {item['content']}" for item in state["rag_context"]])
 
     # Check conversation history to see if we're collecting contact info
     conversation_context = "\n".join([
@@ -201,46 +390,19 @@ def tour_scheduling_agent_node(state: ConversationState) -> ConversationState:
         for msg in history[-30:] if msg.get('content')
     ])
 
-    # Get current date and time
-    from datetime import datetime
-    current_datetime = datetime.now().strftime("%A, %B %d, %Y, %I:%M %p")
-
-    prompt = f"""You are Sophie, a tour scheduling specialist at ACME Senior Living.
-
-Tour Availability:
-{knowledge_context}
-Tours are available Monday-Friday from 9:00 AM to 6:00 PM. We are closed on weekends.
-
-Current date and time: {current_datetime}
-
-Recent conversation:
-{conversation_context}
+    current_datetime, open_slots = tour_prompt_availability()
 
-User's latest message: {user_message}
+    state["agent_response"] = generate_response(state, "tour_scheduling_agent", lambda: render_prompt(
+        "tour_scheduling_agent",
+        knowledge_context=knowledge_context,
+        open_slots=open_slots or "None in the next few weeks",
+        current_datetime=current_datetime,
+        conversation_context=conversation_context,
+        user_message=user_message,
+    ))
 
-YOUR TASK: Help schedule a tour by collecting: date/time, name, email, and phone.
-
-INSTRUCTIONS:
-1. If user requests a tour, suggest a specific Monday-Friday time between 9 AM-6 PM
-2. If they request weekend/outside hours, politely offer Monday-Friday alternative
-3. Once they confirm a time works, collect contact info in order: name → email → phone
-
-HOW TO COLLECT CONTACT INFO:
-- Look at your last message to see what you just asked for
-- If you asked "Could you provide your full name?" and got a name → ask for EMAIL next
-- If you asked for email and got an email address → ask for PHONE next
-- If you asked for phone and got a phone number → confirm the tour is scheduled
-
-IMPORTANT RULES:
-- Only ask for ONE piece of information per message
-- NEVER repeat a question you just asked
-- Progress forward: name → email → phone
-- Keep responses short (2-3 sentences)
-
-Your response:"""
-
-    response = llm.invoke(prompt)
-    state["agent_response"] = response.content
+    # Remember a time the LLM offered so "yes" on the next turn books it
+    state["tour_booking"] = tour_booking.note_proposed_time(state["tour_booking"], state["agent_response"])
 
     return state
 
@@ -250,37 +412,18 @@ def amenities_agent_node(state: ConversationState) -> ConversationState:
     """
     Handle questions about community features
     """
-    llm = get_llm()
     user_message = state["user_message"]
 
     # Retrieve amenities knowledge (including policies like pets, cars, smoking)
-    rag_results = retriever.search(user_message, category_filter=["amenities", "services", "activities", "dietary", "room_amenities", "policies"], top_k=3)
+    rag_results = retrieve(state, user_message, category_filter=["amenities", "services", "activities", "dietary", "room_amenities", "policies"], top_k=3)
 
     state["rag_context"] = rag_results
 
     knowledge_context = "\n".join([f"- {item['content']}" for item in rag_results])
 
-    prompt = f"""You are Sophie, a specialist in community amenities and policies at ACME Senior Living.
-
-Answer the user's question using ONLY the facts below.
-
-Available Information:
-{knowledge_context}
-
-Guidelines:
-- Answer questions about amenities, services, activities, AND policies (pets, cars, parking, smoking, visiting, etc.)
-- List 2-3 specific items from the category they asked about
-- Be clear and direct when we have the information
-- If something is NOT in the knowledge base, say: "I don't have specific information about that, but I can connect you with our team to find out."
-- Be enthusiastic but factual
-- Keep response to 2-3 sentences
-
-User's question: {user_message}
-
-Your response:"""
-
-    response = llm.invoke(prompt)
-    state["agent_response"] = response.content
+    state["agent_response"] = generate_response(state, "amenities_agent", lambda: render_prompt(
+        "amenities_agent", knowledge_context=knowledge_context, user_message=user_message
+    ))
 
     return state
 
@@ -290,37 +433,22 @@ def financing_agent_node(state: ConversationState) -> ConversationState:
     """
     Handle questions about payment options, Medicaid, insurance, etc.
     """
-    llm = get_llm()
     user_message = state["user_message"]
 
-    # Retrieve financing knowledge
-    rag_results = retriever.search(user_message, category_filter=["financing"], top_k=3)
+    # Use the whole financing category when small enough, otherwise retrieve
+    static_context = get_category_context("financing")
+    if static_context:
+        rag_results = static_context.rag_context
+        knowledge_context = static_context.knowledge_context
+    else:
+        rag_results = retrieve(state, user_message, category_filter=["financing"], top_k=3)
+        knowledge_context = "\n".join([f"- {item['content']}" for item in rag_results])
 
     state["rag_context"] = rag_results
 
-    knowledge_context = "\n".join([f"- {item['content']}" for item in rag_results])
-
-    prompt = f"""You are Sophie, a financial specialist at ACME Senior Living.
-
-Answer the user's question using ONLY the facts below.
-
-Available Information:
-{knowledge_context}
-
-Guidelines:
-- If asked about Medicaid: YES, we participate in Medicaid programs
-- If asked about insurance: We do NOT accept long term care insurance
-- If asked about veterans: Veterans may be eligible for Veterans benefits
-- If asked about payment help: We offer bridge loans for homeowners and participate in HUD programs
-- Be clear and direct about what we accept and don't accept
-- Keep response to 2-3 sentences
-
-User's question: {user_message}
-
-Your response:"""
-
-    response = llm.invoke(prompt)
-    state["agent_response"] = response.content
+    state["agent_response"] = generate_response(state, "financing_agent", lambda: render_prompt(
+        "financing_agent", knowledge_context=knowledge_context, user_message=user_message
+    ))
 
     return state
 
@@ -330,35 +458,18 @@ def general_info_agent_node(state: ConversationState) -> ConversationState:
     """
     Fallback agent for general questions
     """
-    llm = get_llm()
     user_message = state["user_message"]
 
     # Broad search across all categories
-    rag_results = retriever.search(user_message, top_k=5)
+    rag_results = retrieve(state, user_message, top_k=5)
 
     state["rag_context"] = rag_results
 
     knowledge_context = "\n".join([f"- {item['content']}" for item in rag_results])
 
-    prompt = f"""You are Sophie, a sales specialist at ACME Senior Living.
-
-Answer the user's question using ONLY the facts below.
-
-Available Information:
-{knowledge_context}
-
-Guidelines:
-- Use the provided facts to answer
-- If the knowledge base doesn't contain the answer, say: "I don't have specific information about that. Would you like me to connect you with our team?"
-- Be warm and helpful
-- Keep response to 2-3 sentences
-
-User's question: {user_message}
-
-Your response:"""
-
-    response = llm.invoke(prompt)
-    state["agent_response"] = response.content
+    state["agent_response"] = generate_response(state, "general_info_agent", lambda: render_prompt(
+        "general_info_agent", knowledge_context=knowledge_context, user_message=user_message
+    ))
 
     return state
 
@@ -368,57 +479,38 @@ def extract_enrichment_node(state: ConversationState) -> ConversationState:
     """
     Extract enrichment events from conversation using LLM with structured output
     """
+    # Templated tour booking turns already produced their events deterministically
+    if state.get("templated_response"):
+        return state
+
+    # Enrichment is non-essential: skip it when degraded or rather than delay the response past the deadline
+    remaining = remaining_budget(state)
+    if state.get("degraded") or (remaining is not None and remaining < settings.CHAT_ENRICHMENT_MIN_BUDGET_SECONDS):
+        state.setdefault("skipped_nodes", []).append("extract_enrichment")
+        state["enrichment_events"] = []
+        return state
+
     # Use structured output for reliable JSON extraction
-    llm = get_llm()
-    structured_llm = llm.with_structured_output(EnrichmentEventList)
+    llm = select_llm(state, "extract_enrichment")
 
     user_message = state["user_message"]
     agent_response = state["agent_response"]
     agent_name = state.get("intent", "unknown") + "_agent"
 
-    prompt = f"""Analyze the user's message and identify any enrichment events.
-
-User message: "{user_message}"
-Agent response: "{agent_response}"
-Agent type: "{agent_name}"
-
-Event types to extract:
-- budget_inquiry: User asked about pricing
-- budget_mentioned: User stated specific budget (extract amount/range in event_data)
-- care_need_expressed: User mentioned care needs, conditions, or assistance required
-- timeline_shared: User indicated urgency or move timeline
-- preference_stated: User mentioned preferences - IMPORTANT: Extract specific details:
-  * Pets: If asking about pets or mentioning bringing a pet, extract pet type and any details (e.g., "golden retriever")
-  * Cars/Parking: If asking about bringing a car or parking
-  * Dietary needs, couples living together, smoking, etc.
-- tour_requested: User expressed interest in visiting
-- tour_scheduled: Tour confirmed with date/time (extract date and time in event_data)
-- contact_shared: User provided name, email, or phone number (extract to event_data)
-- financing_inquiry: User asked about payment/financial assistance (Medicaid, Medicare, insurance, VA benefits, bridge loans, etc.) - ALWAYS extract this when user mentions any payment help
-- room_type_interest: User asked about specific room types
-
-For each event, extract:
-- event_type: One of the types above
-- event_data: Relevant structured data, including:
-  - For financing_inquiry: {{"financing_type": "Medicaid"}} or "Medicare", "insurance", "VA benefits", etc.
-  - For care needs: {{"condition": "dementia"}}
-  - For budget: {{"max": 4000}}
-  - For contact: {{"name": "Eric"}}, {{"email": "eric@example.com"}}, {{"phone": "555-1234"}}
-  - For pets preference: {{"category": "pets", "detail": "golden retriever", "pet_type": "golden retriever"}}
-  - For car preference: {{"category": "parking", "detail": "wants to bring car", "car_interest": true}}
-- source_message: The exact user message
-- confidence: How confident you are (0.0-1.0)
-
-Return all identified events."""
+    messages = render_prompt(
+        "extract_enrichment",
+        user_message=user_message,
+        agent_response=agent_response,
+        agent_name=agent_name,
+    )
 
     try:
-        result = structured_llm.invoke(prompt)
+        result = call_structured_llm(state, "extract_enrichment", llm, EnrichmentEventList, messages)
         # Convert Pydantic models to dicts for storage
         events = [event.model_dump() for event in result.events]
         state["enrichment_events"] = events
     except Exception as e:
         # Log error but continue gracefully
-        import sys
         print(f"Error extracting enrichment events: {e}", file=sys.stderr)
         state["enrichment_events"] = []
 
@@ -430,72 +522,9 @@ def update_understanding_node(state: ConversationState) -> ConversationState:
     """
     Update current understanding based on enrichment events
     """
-    understanding = state.get("current_understanding", {})
-    events = state.get("enrichment_events", [])
-
-    for event in events:
-        event_type = event.get("event_type")
-        event_data = event.get("event_data", {})
-
-        if event_type == "budget_inquiry":
-            # Just track that they asked about pricing, don't assume a budget
-            understanding["budget_interest"] = "Inquired about pricing"
-
-        elif event_type == "budget_mentioned":
-            if event_data.get("range"):
-                understanding["budget_interest"] = event_data["range"]
-            elif event_data.get("max"):
-                understanding["budget_interest"] = f"Up to ${event_data['max']}/month"
-
-        elif event_type == "care_need_expressed":
-            care_needs = understanding.get("care_needs", [])
-            if event_data.get("condition"):
-                care_needs.append(event_data["condition"].title())
-            if event_data.get("care_level"):
-                care_needs.append(event_data["care_level"].replace("_", " ").title())
-            understanding["care_needs"] = list(set(care_needs))  # dedupe
-
-        elif event_type == "timeline_shared":
-            urgency = event_data.get("urgency") or "Exploring options"
-            understanding["timeline"] = urgency.title()
-
-        elif event_type == "preference_stated":
-            prefs = understanding.get("preferences", [])
-            category = event_data.get("category") or ""
-            detail = event_data.get("detail") or ""
-            if category:
-                prefs.append(f"{category.replace('_', ' ').title()}: {detail}")
-                understanding["preferences"] = prefs
-
-        elif event_type == "tour_requested":
-            understanding["tour_interest"] = "High - wants to visit"
-
-        elif event_type == "tour_scheduled":
-            tour_date = event_data.get("date")
-            tour_time = event_data.get("time")
-            if tour_date and tour_time:
-                understanding["tour_scheduled"] = f"{tour_date} at {tour_time}"
-            elif tour_date or tour_time:
-                understanding["tour_scheduled"] = tour_date or tour_time
-
-        elif event_type == "contact_shared":
-            # Collect contact information
-            if event_data.get("name"):
-                understanding["name"] = event_data["name"]
-            if event_data.get("email"):
-                understanding["email"] = event_data["email"]
-            if event_data.get("phone"):
-                understanding["phone"] = event_data["phone"]
-
-        elif event_type == "financing_inquiry":
-            # Track what financing options they asked about
-            financing_interests = understanding.get("financing_interests", [])
-            financing_type = event_data.get("financing_type", "Payment options")
-            if financing_type not in financing_interests:
-                financing_interests.append(financing_type)
-            understanding["financing_interests"] = financing_interests
-
-    state["current_understanding"] = understanding
+    state["current_understanding"] = reduce_events(
+        state.get("current_understanding", {}), state.get("enrichment_events", [])
+    )
 
     return state
 
@@ -519,44 +548,58 @@ def route_to_agent(state: ConversationState) -> str:
 
 
 # Build Workflow
-def create_workflow() -> StateGraph:
+AGENT_NODES = ["pricing_agent", "tour_scheduling_agent", "amenities_agent", "financing_agent", "general_info_agent"]
+
+
+def create_workflow(mode: Optional[str] = None) -> StateGraph:
     """
     Create and compile the LangGraph workflow
+
+    Args:
+        mode: "sequential" (separate intent and enrichment calls) or "combined"
+              (one call for both). Defaults to settings.SALES_AGENT_WORKFLOW_MODE.
     """
+    mode = mode or settings.SALES_AGENT_WORKFLOW_MODE
+    if mode not in WORKFLOW_MODES:
+        raise ValueError(f"Unknown workflow mode: {mode}. Available: {', '.join(WORKFLOW_MODES)}")
+
     workflow = StateGraph(ConversationState)
 
+    # Entry node classifies intent (and extracts enrichment in combined mode)
+    entry_node = "classify_intent" if mode == WORKFLOW_MODE_SEQUENTIAL else "analyze_turn"
+
     # Add nodes
-    workflow.add_node("classify_intent", classify_intent_node)
+    if mode == WORKFLOW_MODE_SEQUENTIAL:
+        workflow.add_node("classify_intent", classify_intent_node)
+        workflow.add_node("extract_enrichment", extract_enrichment_node)
+    else:
+        workflow.add_node("analyze_turn", analyze_turn_node)
     workflow.add_node("pricing_agent", pricing_agent_node)
     workflow.add_node("tour_scheduling_agent", tour_scheduling_agent_node)
     workflow.add_node("amenities_agent", amenities_agent_node)
     workflow.add_node("financing_agent", financing_agent_node)
     workflow.add_node("general_info_agent", general_info_agent_node)
-    workflow.add_node("extract_enrichment", extract_enrichment_node)
     workflow.add_node("update_understanding", update_understanding_node)
 
     # Entry point
-    workflow.set_entry_point("classify_intent")
+    workflow.set_entry_point(entry_node)
 
     # Conditional routing from intent classifier
     workflow.add_conditional_edges(
-        "classify_intent",
+        entry_node,
         route_to_agent,
-        {
-            "pricing_agent": "pricing_agent",
-            "tour_scheduling_agent": "tour_scheduling_agent",
-            "amenities_agent": "amenities_agent",
-            "financing_agent": "financing_agent",
-            "general_info_agent": "general_info_agent",
-        }
+        {agent: agent for agent in AGENT_NODES}
     )
 
-    # All agents flow to enrichment extraction
-    for agent in ["pricing_agent", "tour_scheduling_agent", "amenities_agent", "financing_agent", "general_info_agent"]:
-        workflow.add_edge(agent, "extract_enrichment")
-
-    # Enrichment flows to understanding updater
-    workflow.add_edge("extract_enrichment", "update_understanding")
+    if mode == WORKFLOW_MODE_SEQUENTIAL:
+        # All agents flow to enrichment extraction, which flows to understanding updater
+        for agent in AGENT_NODES:
+            workflow.add_edge(agent, "extract_enrichment")
+        workflow.add_edge("extract_enrichment", "update_understanding")
+    else:
+        # Enrichment was already extracted by analyze_turn
+        for agent in AGENT_NODES:
+            workflow.add_edge(agent, "update_understanding")
 
     # End workflow
     workflow.add_edge("update_understanding", END)
@@ -565,5 +608,22 @@ def create_workflow() -> StateGraph:
     return workflow.compile()
 
 
-# Global compiled workflow
-compiled_workflow = create_workflow()
+# Compiled workflows by mode
+_compiled_workflows = {}
+
+
+def get_workflow(mode: Optional[str] = None):
+    """
+    Get the compiled workflow for a mode, compiling it on first use
+    """
+    mode = mode or settings.SALES_AGENT_WORKFLOW_MODE
+    if mode not in _compiled_workflows:
+        _compiled_workflows[mode] = create_workflow(mode)
+    return _compiled_workflows[mode]
+
+
+def __getattr__(name):
+    """Build the default compiled_workflow lazily on first access"""
+    if name == "compiled_workflow":
+        return get_workflow()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
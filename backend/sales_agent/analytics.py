@@ -0,0 +1,298 @@
+"""
+Funnel and enrichment analytics backed by daily rollup tables
+
+Aggregation runs in Postgres (GROUP BY over EnrichmentEvent and Prospect,
+with event_data values read by key) and lands in three small rollup tables.
+Only a trailing window of days is recomputed on each refresh, because older
+days no longer change, so dashboard reads stay small as event volume grows.
+Days are in the community's time zone.
+
+The analytics endpoint only reads the rollups. They are refreshed outside the
+request path by `manage.py refresh_analytics` (cron) and/or each worker's
+AnalyticsRefresher thread; a Postgres advisory lock and the rollups' age keep
+workers from refreshing the same window at once. Every refresh, including
+the command's, takes the lock, and records its time in AnalyticsRefresh.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef, Subquery, Sum
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Lower, TruncDate
+from django.utils import timezone
+
+from sales_agent import tour_time
+from sales_agent.models import (
+    AnalyticsRefresh,
+    DailyDistributionRollup,
+    DailyEventRollup,
+    DailyFunnelRollup,
+    EnrichmentEvent,
+    Prospect,
+)
+
+
+# Funnel stages in order; "prospects" is prospect creation, the rest are event types
+FUNNEL_STAGES = ("prospects", "budget_inquiry", "tour_requested", "tour_scheduled")
+
+# Distribution dimension -> (event type, event_data key)
+DISTRIBUTIONS = {
+    "financing_type": ("financing_inquiry", "financing_type"),
+    "care_need": ("care_need_expressed", "condition"),
+    "care_level": ("care_need_expressed", "care_level"),
+}
+
+# pg_try_advisory_lock key held while refreshing ("analytics" in ASCII)
+REFRESH_LOCK_KEY = 0x616E616C79746963
+
+
+def _local_day(field: str) -> TruncDate:
+    return TruncDate(field, tzinfo=tour_time.community_timezone())
+
+
+def _day_start(day: date) -> datetime:
+    return tour_time.combine(day, datetime.min.time())
+
+
+def _event_rollups(since: datetime) -> list:
+    rows = EnrichmentEvent.objects.filter(created_at__gte=since).values(
+        'event_type', day=_local_day('created_at')
+    ).annotate(
+        event_count=Count('pk'),
+        prospect_count=Count('session__prospect', distinct=True),
+    )
+    return [DailyEventRollup(**row) for row in rows]
+
+
+def _distribution_rollups(since: datetime) -> list:
+    counts = Counter()
+    for dimension, (event_type, key) in DISTRIBUTIONS.items():
+        rows = EnrichmentEvent.objects.filter(
+            event_type=event_type,
+            created_at__gte=since,
+        ).annotate(
+            value=Lower(KeyTextTransform(key, 'event_data'))
+        ).exclude(value__isnull=True).exclude(value='').values(
+            'value', day=_local_day('created_at')
+        ).annotate(event_count=Count('pk'))
+        for row in rows:
+            # Same display form as the understanding reducer ("assisted_living" -> "Assisted Living")
+            value = row['value'].replace('_', ' ').title()[:200]
+            counts[(row['day'], dimension, value)] += row['event_count']
+    return [
+        DailyDistributionRollup(day=day, dimension=dimension, value=value, event_count=event_count)
+        for (day, dimension, value), event_count in counts.items()
+    ]
+
+
+def _funnel_rollups(since: datetime) -> list:
+    rollups = [
+        DailyFunnelRollup(stage="prospects", day=row['day'], prospect_count=row['prospect_count'])
+        for row in Prospect.objects.filter(created_at__gte=since).values(
+            day=_local_day('created_at')
+        ).annotate(prospect_count=Count('pk'))
+    ]
+
+    for stage in FUNNEL_STAGES[1:]:
+        stage_events = EnrichmentEvent.objects.filter(session__prospect=OuterRef('pk'), event_type=stage)
+        # Prospects with a stage event in the window, dated by their first one ever
+        rows = Prospect.objects.filter(
+            Exists(stage_events.filter(created_at__gte=since))
+        ).annotate(
+            reached_at=Subquery(stage_events.order_by('created_at').values('created_at')[:1])
+        ).filter(reached_at__gte=since).values(
+            day=_local_day('reached_at')
+        ).annotate(prospect_count=Count('pk'))
+        rollups.extend(
+            DailyFunnelRollup(stage=stage, day=row['day'], prospect_count=row['prospect_count'])
+            for row in rows
+        )
+    return rollups
+
+
+def refresh_rollups(days: Optional[int] = None, full: bool = False) -> Optional[Dict]:
+    """
+    Recompute rollups for the trailing window of local days (including today)
+
+    Holds the refresh advisory lock, so concurrent refreshes (cron and worker
+    threads) never delete and re-insert the same window at once.
+
+    Args:
+        days: Days to recompute (defaults to settings.ANALYTICS_ROLLUP_LOOKBACK_DAYS)
+        full: Recompute every day since the first prospect
+
+    Returns:
+        {"since": date, "events": rows, "distributions": rows, "funnel": rows},
+        or None if another process is refreshing
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [REFRESH_LOCK_KEY])
+        if not cursor.fetchone()[0]:
+            return None
+        try:
+            return _refresh_rollups(days, full)
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [REFRESH_LOCK_KEY])
+
+
+def _refresh_rollups(days: Optional[int], full: bool) -> Dict:
+    if full:
+        first = Prospect.objects.order_by('created_at').values_list('created_at', flat=True).first()
+        since_day = first.astimezone(tour_time.community_timezone()).date() if first else tour_time.local_now().date()
+    else:
+        days = days or settings.ANALYTICS_ROLLUP_LOOKBACK_DAYS
+        since_day = tour_time.local_now().date() - timedelta(days=days - 1)
+    since = _day_start(since_day)
+
+    events = _event_rollups(since)
+    distributions = _distribution_rollups(since)
+    funnel = _funnel_rollups(since)
+
+    # Readers see either the old or the new window, never a partial one
+    with transaction.atomic():
+        for model, rows in ((DailyEventRollup, events), (DailyDistributionRollup, distributions), (DailyFunnelRollup, funnel)):
+            model.objects.filter(day__gte=since_day).delete()
+            model.objects.bulk_create(rows, batch_size=1000)
+        # Recorded even when the window had no rows, so the age always resets
+        AnalyticsRefresh.objects.update_or_create(
+            pk=AnalyticsRefresh.SINGLETON_ID,
+            defaults={"refreshed_at": timezone.now(), "since": since_day},
+        )
+
+    return {"since": since_day, "events": len(events), "distributions": len(distributions), "funnel": len(funnel)}
+
+
+def last_refreshed_at() -> Optional[datetime]:
+    """When the rollups were last refreshed, or None if they never were"""
+    return AnalyticsRefresh.objects.filter(pk=AnalyticsRefresh.SINGLETON_ID).values_list(
+        'refreshed_at', flat=True
+    ).first()
+
+
+def refresh_if_due(max_age_seconds: float, initial_full: bool = True) -> Optional[Dict]:
+    """
+    Refresh the trailing window if the rollups are older than max_age_seconds
+
+    Skipped while another process is refreshing (advisory lock).
+
+    Args:
+        initial_full: Recompute all history when the rollups were never refreshed
+
+    Returns:
+        refresh_rollups() result, or None if nothing was done
+    """
+    latest = last_refreshed_at()
+    if latest is not None and (timezone.now() - latest).total_seconds() < max_age_seconds:
+        return None
+    return refresh_rollups(full=initial_full and latest is None)
+
+
+class AnalyticsRefresher:
+    """
+    Background thread that keeps the rollups at most ANALYTICS_REFRESH_SECONDS old
+    """
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.last_refresh_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        """Start the refresher thread once per process"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="analytics-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if refresh_if_due(settings.ANALYTICS_REFRESH_SECONDS) is not None:
+                    self.refreshes += 1
+                    self.last_refresh_at = time.time()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Analytics refresh failed: {e}", file=sys.stderr)
+            finally:
+                # This thread's connection would otherwise stay open between runs
+                connection.close()
+            # Check a few times per interval so one worker refreshes soon after the rollups age out
+            self._stop.wait(max(1.0, settings.ANALYTICS_REFRESH_SECONDS / 4))
+
+    def status(self) -> Dict:
+        """Refresher state for metrics endpoints"""
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "refreshes": self.refreshes,
+            "last_refresh_at": self.last_refresh_at,
+            "last_error": self.last_error,
+        }
+
+
+analytics_refresher = AnalyticsRefresher()
+
+
+def analytics_summary(start_day: date, end_day: date) -> Dict:
+    """
+    Funnel, daily event counts and event_data distributions between two local days (inclusive)
+
+    Returns:
+        {
+            "funnel": [{"stage", "prospects", "conversion_from_previous"}],
+            "funnel_by_day": [{"day", "stage", "prospects"}],
+            "event_counts": [{"day", "event_type", "events", "prospects"}],
+            "distributions": {"financing_type": [{"value", "events"}], ...},
+            "refreshed_at": iso-datetime or None
+        }
+    """
+    day_range = {"day__gte": start_day, "day__lte": end_day}
+
+    funnel_by_day = DailyFunnelRollup.objects.filter(**day_range)
+    stage_totals = dict(funnel_by_day.values_list('stage').annotate(total=Sum('prospect_count')).order_by())
+    funnel = []
+    previous = None
+    for stage in FUNNEL_STAGES:
+        total = stage_totals.get(stage, 0)
+        funnel.append({
+            "stage": stage,
+            "prospects": total,
+            "conversion_from_previous": round(total / previous, 4) if previous else None,
+        })
+        previous = total
+
+    distributions = {dimension: [] for dimension in DISTRIBUTIONS}
+    for row in DailyDistributionRollup.objects.filter(**day_range).values('dimension', 'value').annotate(
+        events=Sum('event_count')
+    ).order_by('dimension', '-events', 'value'):
+        distributions[row['dimension']].append({"value": row['value'], "events": row['events']})
+
+    refreshed_at = last_refreshed_at()
+
+    return {
+        "funnel": funnel,
+        "funnel_by_day": [
+            {"day": row.day.isoformat(), "stage": row.stage, "prospects": row.prospect_count}
+            for row in funnel_by_day
+        ],
+        "event_counts": [
+            {"day": row.day.isoformat(), "event_type": row.event_type, "events": row.event_count, "prospects": row.prospect_count}
+            for row in DailyEventRollup.objects.filter(**day_range)
+        ],
+        "distributions": distributions,
+        "refreshed_at": refreshed_at.isoformat() if refreshed_at else None,
+    }
@@ -0,0 +1,210 @@
+"""
+Record/replay cassette for LLM and embedding calls
+
+Responses are stored in a local SQLite file keyed by a SHA-256 hash of the
+request (model, parameters and prompt or input text), so development, CI and
+benchmark runs can repeat whole workflow runs without calling OpenAI.
+
+Modes (settings.LLM_CASSETTE_MODE):
+- passthrough: no cassette, every call goes to the provider (default)
+- record: answer from the cassette when the request was seen before, otherwise
+  call the provider and store the response
+- replay: answer only from the cassette; an unseen request raises CassetteMiss
+
+Chat models use it as their LangChain cache (ChatOpenAI(cache=...)), so the
+lookup covers everything LangChain sends, including structured output tools.
+Embeddings go through Cassette.fetch in KnowledgeRetriever.generate_embedding.
+Entries read once are kept in memory for the rest of the process.
+
+Keys only repeat when prompts do. While a cassette is active the tour
+scheduling prompt uses a fixed clock (settings.LLM_CASSETTE_CLOCK) and the tour
+calendar instead of the live time and slot inventory, so replayed tour answers
+describe that date rather than today. Templated booking replies still use the
+live inventory; a conversation whose history contains one only replays while
+the offered slots are unchanged.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from django.conf import settings
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+
+CASSETTE_MODE_PASSTHROUGH = "passthrough"
+CASSETTE_MODE_RECORD = "record"
+CASSETTE_MODE_REPLAY = "replay"
+CASSETTE_MODES = (CASSETTE_MODE_PASSTHROUGH, CASSETTE_MODE_RECORD, CASSETTE_MODE_REPLAY)
+MODEL_NAME_PATTERN = re.compile(r'"model_name": "([^"]+)"')
+
+
+class CassetteMiss(LookupError):
+    """A replay-mode request that was never recorded"""
+
+
+def request_key(kind: str, request: Dict[str, Any]) -> str:
+    """Stable hash of a request (dict keys are sorted before hashing)"""
+    payload = json.dumps({"kind": kind, **request}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class Cassette:
+    """
+    SQLite-backed response store shared by all threads (and processes) using one file
+    """
+
+    def __init__(self, path: str, mode: str):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}. Available: {', '.join(CASSETTE_MODES)}")
+        self.path = Path(path)
+        self.mode = mode
+        self._local = threading.local()
+        self._memory: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, kind TEXT NOT NULL, model TEXT, response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets concurrent workers read while one writes"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[str]:
+        """Stored response text for a key, or None"""
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+        row = self._connection().execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._memory[key] = row[0]
+        return row[0]
+
+    def put(self, key: str, kind: str, model: Optional[str], response: str):
+        """Store a response (a later recording of the same request replaces it)"""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO responses (key, kind, model, response, created_at) VALUES (?, ?, ?, ?, ?)",
+            (key, kind, model, response, time.time())
+        )
+        with self._lock:
+            self._memory[key] = response
+
+    def lookup(self, key: str) -> Optional[str]:
+        """
+        Recorded response for a request, counting hits and misses
+
+        Raises:
+            CassetteMiss: In replay mode when the request was never recorded
+        """
+        response = self.get(key)
+        if response is not None:
+            self.hits += 1
+            return response
+        self.misses += 1
+        if self.mode == CASSETTE_MODE_REPLAY:
+            raise CassetteMiss(f"No recorded response for request {key[:12]} in {self.path}")
+        return None
+
+    def fetch(self, kind: str, request: Dict[str, Any], compute: Callable[[], Any], model: Optional[str] = None) -> Any:
+        """
+        JSON-serializable response for a request: recorded, or computed and recorded
+
+        Args:
+            kind: Request type, e.g. "embeddings"
+            request: Everything that determines the response (model, parameters, input)
+            compute: Makes the real provider call (not called on a hit)
+            model: Stored alongside for inspection
+        """
+        key = request_key(kind, request)
+        recorded = self.lookup(key)
+        if recorded is not None:
+            return json.loads(recorded)
+        response = compute()
+        self.put(key, kind, model, json.dumps(response))
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "path": str(self.path), "hits": self.hits, "misses": self.misses}
+
+
+class CassetteLLMCache(BaseCache):
+    """LangChain cache adapter: chat generations stored in the cassette"""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        # llm_string carries the model, its parameters and any bound tools
+        return request_key("chat", {"llm": llm_string, "prompt": prompt})
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        recorded = self.cassette.lookup(self._key(prompt, llm_string))
+        if recorded is None:
+            return None
+        return [
+            ChatGeneration(message=message)
+            for message in messages_from_dict(json.loads(recorded))
+        ]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]):
+        messages = [
+            message_to_dict(generation.message)
+            for generation in return_val
+            if isinstance(generation, ChatGeneration)
+        ]
+        if messages:
+            model = MODEL_NAME_PATTERN.search(llm_string)
+            self.cassette.put(self._key(prompt, llm_string), "chat", model and model.group(1), json.dumps(messages))
+
+    def clear(self, **kwargs):
+        """Recordings are kept; delete the cassette file to start over"""
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The process-wide cassette, or None in passthrough mode"""
+    global _cassette
+    if settings.LLM_CASSETTE_MODE == CASSETTE_MODE_PASSTHROUGH:
+        return None
+    if _cassette is None:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette(settings.LLM_CASSETTE_PATH, settings.LLM_CASSETTE_MODE)
+    return _cassette
+
+
+def get_llm_cache() -> Optional[CassetteLLMCache]:
+    """LangChain cache for chat models, or None in passthrough mode"""
+    cassette = get_cassette()
+    return CassetteLLMCache(cassette) if cassette else None
+
+
+def is_active() -> bool:
+    """True when LLM and embedding calls go through the cassette (record or replay)"""
+    return settings.LLM_CASSETTE_MODE != CASSETTE_MODE_PASSTHROUGH
+
+
+def is_replaying() -> bool:
+    """True when every provider call is answered from the cassette"""
+    return settings.LLM_CASSETTE_MODE == CASSETTE_MODE_REPLAY
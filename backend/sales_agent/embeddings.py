@@ -0,0 +1,209 @@
+"""
+Versioned knowledge base embeddings and online migration between versions
+
+Embeddings are stored per EmbeddingVersion (model, dimensions). Changing
+RAG_EMBEDDING_MODEL or RAG_EMBEDDING_DIMENSIONS and running
+`manage.py reembed_knowledge` moves the knowledge base to the new version
+without downtime:
+
+1. build_version(): the target version is filled in batches (one embeddings
+   request per batch) while retrieval keeps reading the active version. It is
+   resumable and catches up items edited while it runs.
+2. ensure_ann_indexes() builds the new version's partial HNSW indexes.
+3. activate_version() switches in one transaction; workers follow within
+   RAG_KNOWLEDGE_INDEX_TTL (the active version is part of the knowledge fingerprint).
+4. collect_garbage() deletes the retired versions' vectors and indexes once
+   every worker has had time to switch.
+
+Writes to a knowledge item are embedded for every live (active or building)
+version via embed_for_live_versions(), so both versions stay complete during a
+migration.
+"""
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from sales_agent.models import CommunityKnowledge, EmbeddingVersion, KnowledgeEmbedding
+from sales_agent.rag import retriever
+from sales_agent.vector_index import ensure_ann_indexes, invalidate_category_vectors
+
+
+def target_version() -> EmbeddingVersion:
+    """The version for the configured model and dimensions (created, or revived if retired)"""
+    version, _created = EmbeddingVersion.objects.get_or_create(
+        model=settings.RAG_EMBEDDING_MODEL,
+        dimensions=settings.RAG_EMBEDDING_DIMENSIONS,
+    )
+    if version.status == EmbeddingVersion.STATUS_RETIRED:
+        version.status = EmbeddingVersion.STATUS_BUILDING
+        version.retired_at = None
+        version.save(update_fields=['status', 'retired_at'])
+    return version
+
+
+def live_versions() -> List[EmbeddingVersion]:
+    """Versions that must cover every knowledge item (active and building)"""
+    return list(EmbeddingVersion.objects.exclude(status=EmbeddingVersion.STATUS_RETIRED))
+
+
+def write_embeddings(items: List[CommunityKnowledge], version: EmbeddingVersion, vectors: List[List[float]]) -> int:
+    """
+    Upsert already generated vectors (one per item, in order) for one version
+
+    Returns:
+        Number of items written
+    """
+    KnowledgeEmbedding.objects.bulk_create(
+        [
+            KnowledgeEmbedding(knowledge=item, version=version, category=item.category, embedding=vector)
+            for item, vector in zip(items, vectors)
+        ],
+        update_conflicts=True,
+        unique_fields=['version', 'knowledge'],
+        update_fields=['category', 'embedding', 'updated_at'],
+    )
+    return len(items)
+
+
+def store_embeddings(items: List[CommunityKnowledge], version: EmbeddingVersion) -> int:
+    """
+    Embed items for one version in a single request and upsert their vectors
+
+    Returns:
+        Number of items embedded
+    """
+    if not items:
+        return 0
+    vectors = retriever.generate_embeddings([item.content for item in items], version=version)
+    return write_embeddings(items, version, vectors)
+
+
+LiveEmbeddings = List[Tuple[EmbeddingVersion, List[List[float]]]]
+
+
+def embed_for_live_versions(contents: List[str]) -> LiveEmbeddings:
+    """
+    Embed texts for every live version (one request per version)
+
+    Called before the transaction that writes them, so no row locks or
+    connection are held open across the provider calls.
+
+    Returns:
+        [(version, vectors)] to pass to write_live_embeddings()
+    """
+    return [(version, retriever.generate_embeddings(contents, version=version)) for version in live_versions()]
+
+
+def write_live_embeddings(items: List[CommunityKnowledge], embedded: LiveEmbeddings) -> int:
+    """
+    Upsert vectors from embed_for_live_versions() for the items they were generated from
+
+    Returns:
+        Number of (item, version) embeddings written
+    """
+    return sum(write_embeddings(items, version, vectors) for version, vectors in embedded)
+
+
+def pending_items(version: EmbeddingVersion):
+    """Items with no embedding in the version, or edited after it was embedded"""
+    version_embeddings = KnowledgeEmbedding.objects.filter(version=version, knowledge=OuterRef('pk'))
+    return CommunityKnowledge.objects.filter(
+        ~Exists(version_embeddings) | Exists(version_embeddings.filter(updated_at__lt=OuterRef('updated_at')))
+    )
+
+
+def build_version(
+    version: EmbeddingVersion,
+    batch_size: int = 100,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Fill a version until it covers every item (safe to interrupt and re-run)
+
+    Args:
+        version: Version to fill (typically target_version())
+        batch_size: Items per embeddings request
+        on_batch: Called with the running item count after each batch
+
+    Returns:
+        Number of items embedded
+    """
+    done = 0
+    while True:
+        batch = list(pending_items(version).only('id', 'category', 'content').order_by('id')[:batch_size])
+        if not batch:
+            return done
+        done += store_embeddings(batch, version)
+        if on_batch:
+            on_batch(done)
+
+
+def activate_version(version: EmbeddingVersion) -> List[EmbeddingVersion]:
+    """
+    Make a fully built version the one retrieval reads, retiring the previous one
+
+    Raises:
+        ValueError: If some items are not embedded in the version yet
+
+    Returns:
+        Versions retired by the switch
+    """
+    with transaction.atomic():
+        versions = list(EmbeddingVersion.objects.select_for_update().order_by('id'))
+        if pending_items(version).exists():
+            raise ValueError(f"{version} does not cover every knowledge item yet; run build_version first")
+
+        now = timezone.now()
+        retired = [
+            previous for previous in versions
+            if previous.status == EmbeddingVersion.STATUS_ACTIVE and previous.pk != version.pk
+        ]
+        EmbeddingVersion.objects.filter(pk__in=[previous.pk for previous in retired]).update(
+            status=EmbeddingVersion.STATUS_RETIRED,
+            retired_at=now,
+        )
+        EmbeddingVersion.objects.filter(pk=version.pk).update(
+            status=EmbeddingVersion.STATUS_ACTIVE,
+            activated_at=now,
+        )
+
+    version.refresh_from_db()
+    invalidate_category_vectors()
+    return retired
+
+
+def collect_garbage(grace_seconds: float, batch_size: int = 1000) -> Dict:
+    """
+    Delete vectors and indexes of versions retired at least grace_seconds ago
+
+    The grace period lets workers still serving a retired version notice the switch first.
+
+    Returns:
+        {"versions": [...], "embeddings": int, "indexes": [...]}
+    """
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    expired = list(EmbeddingVersion.objects.filter(
+        Q(retired_at__lte=cutoff) | Q(retired_at__isnull=True),
+        status=EmbeddingVersion.STATUS_RETIRED,
+    ))
+    if not expired:
+        return {"versions": [], "embeddings": 0, "indexes": []}
+
+    deleted = 0
+    for version in expired:
+        while True:
+            ids = list(KnowledgeEmbedding.objects.filter(version=version).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted += KnowledgeEmbedding.objects.filter(id__in=ids).delete()[0]
+        version.delete()
+
+    return {
+        "versions": [str(version) for version in expired],
+        "embeddings": deleted,
+        "indexes": ensure_ann_indexes()['dropped'],
+    }
@@ -0,0 +1,409 @@
+"""
+Offline evaluation: replay labelled conversations through the workflow
+
+A corpus is JSONL, one conversation per line:
+
+    {"id": "medicaid-dementia",
+     "turns": [
+        {"user": "Do you take Medicaid?",
+         "expected_intent": "financing",
+         "expected_events": [{"event_type": "financing_inquiry", "event_data": {"financing_type": "Medicaid"}}]},
+        ...
+     ]}
+
+Turns of a conversation run in order, carrying history, understanding and
+tour booking state the way the chat view does. Conversations run concurrently
+in a thread pool and turns are paced by an optional rate limit (LLM calls are
+additionally throttled by the outbound governor). Tour bookings made during a
+replay only check slot availability (tour_slots.dry_run_bookings), so the live
+inventory is left untouched. The report covers intent accuracy, enrichment
+precision/recall, per-node latency percentiles and token cost, and can be
+compared with a stored baseline report.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from sales_agent import tour_slots
+
+
+REPORT_VERSION = 1
+
+
+class TurnRateLimiter:
+    """Spaces turn starts evenly across all workers (turns_per_minute <= 0 disables)"""
+
+    def __init__(self, turns_per_minute: float):
+        self.interval = 60.0 / turns_per_minute if turns_per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def load_corpus(path: str) -> List[Dict]:
+    """
+    Read a JSONL corpus (blank lines and lines starting with # are skipped)
+
+    Raises:
+        ValueError: If a line is not a conversation with turns
+    """
+    conversations = []
+    with open(path) as corpus:
+        for line_number, line in enumerate(corpus, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            conversation = json.loads(line)
+            if not conversation.get("turns"):
+                raise ValueError(f"{path}:{line_number}: conversation has no turns")
+            conversation.setdefault("id", f"line-{line_number}")
+            conversations.append(conversation)
+    return conversations
+
+
+def _event_matches(expected: Dict, actual: Dict) -> bool:
+    """Same event type, and every expected event_data value present (case-insensitive)"""
+    if expected.get("event_type") != actual.get("event_type"):
+        return False
+    actual_data = actual.get("event_data") or {}
+    for key, value in (expected.get("event_data") or {}).items():
+        if str(actual_data.get(key, "")).lower() != str(value).lower():
+            return False
+    return True
+
+
+def score_events(expected: List[Dict], actual: List[Dict]) -> Dict[str, int]:
+    """
+    Match expected to extracted events one-to-one
+
+    Returns:
+        {"true_positives", "false_positives", "false_negatives"}
+    """
+    unmatched = list(actual)
+    true_positives = 0
+    for expected_event in expected:
+        for index, actual_event in enumerate(unmatched):
+            if _event_matches(expected_event, actual_event):
+                true_positives += 1
+                del unmatched[index]
+                break
+    return {
+        "true_positives": true_positives,
+        "false_positives": len(unmatched),
+        "false_negatives": len(expected) - true_positives,
+    }
+
+
+def token_cost(usage: Dict) -> float:
+    """USD cost of one LLM call from settings.LLM_PRICING_PER_MILLION (0 for unknown models)"""
+    prices = settings.LLM_PRICING_PER_MILLION.get(usage.get("model"))
+    if not prices:
+        return 0.0
+    cached = usage.get("cached_tokens", 0)
+    uncached = usage.get("input_tokens", 0) - cached
+    return (
+        uncached * prices["input"]
+        + cached * prices.get("cached_input", prices["input"])
+        + usage.get("output_tokens", 0) * prices["output"]
+    ) / 1_000_000
+
+
+def run_turn(workflow, state: Dict) -> tuple:
+    """
+    Run one turn, timing each node from the graph's update stream
+
+    Returns:
+        (final state, [(node, milliseconds), ...])
+    """
+    timings = []
+    result = state
+    started = time.perf_counter()
+    for update in workflow.stream(state, stream_mode="updates"):
+        finished = time.perf_counter()
+        for node, node_state in update.items():
+            timings.append((node, (finished - started) * 1000))
+            if node_state:
+                result = {**result, **node_state}
+        started = finished
+    return result, timings
+
+
+def run_conversation(
+    conversation: Dict,
+    workflow_mode: str,
+    limiter: TurnRateLimiter,
+    budget_seconds: Optional[float] = None
+) -> Dict:
+    """Replay one conversation turn by turn and score each turn (tour bookings are not written)"""
+    with tour_slots.dry_run_bookings():
+        return _run_conversation(conversation, workflow_mode, limiter, budget_seconds)
+
+
+def _run_conversation(
+    conversation: Dict,
+    workflow_mode: str,
+    limiter: TurnRateLimiter,
+    budget_seconds: Optional[float] = None
+) -> Dict:
+    from sales_agent.agents.workflow import get_workflow, initial_state
+
+    workflow = get_workflow(workflow_mode)
+    session_id = str(uuid.uuid4())
+    history, understanding, booking = [], {}, {}
+    turns = []
+
+    for index, turn in enumerate(conversation["turns"]):
+        limiter.wait()
+        state = initial_state(
+            session_id=session_id,
+            user_message=turn["user"],
+            conversation_history=list(history),
+            current_understanding=understanding,
+            budget_seconds=budget_seconds,
+            degraded=False,
+            tour_booking=booking,
+        )
+
+        started = time.perf_counter()
+        try:
+            result, timings = run_turn(workflow, state)
+            error = None
+        except Exception as e:
+            result, timings, error = state, [], f"{type(e).__name__}: {e}"
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        events = result.get("enrichment_events", [])
+        expected_intent = turn.get("expected_intent")
+        outcome = {
+            "conversation_id": conversation["id"],
+            "turn": index,
+            "user": turn["user"],
+            "response": result.get("agent_response", ""),
+            "intent": result.get("intent"),
+            "expected_intent": expected_intent,
+            "intent_correct": result.get("intent") == expected_intent if expected_intent else None,
+            "events": [{"event_type": e.get("event_type"), "event_data": e.get("event_data", {})} for e in events],
+            "latency_ms": round(latency_ms, 1),
+            "node_ms": timings,
+            "llm_usage": result.get("llm_usage", []),
+            "error": error,
+        }
+        if "expected_events" in turn:
+            outcome["event_score"] = score_events(turn["expected_events"], events)
+        turns.append(outcome)
+
+        # No timestamps: history is rendered into later prompts, and the cassette
+        # only replays prompts that are identical run to run
+        history += [
+            {"role": "user", "content": turn["user"]},
+            {"role": "assistant", "content": outcome["response"]},
+        ]
+        understanding = result.get("current_understanding", understanding)
+        booking = result.get("tour_booking", booking)
+
+    return {"id": conversation["id"], "turns": turns}
+
+
+def _percentile(values: List[float], percentile: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, round(percentile / 100 * len(ordered)))
+    return round(ordered[min(rank, len(ordered)) - 1], 1)
+
+
+def _ratio(numerator: float, denominator: float) -> Optional[float]:
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def summarize(conversations: List[Dict]) -> Dict:
+    """Aggregate metrics over replayed conversations"""
+    turns = [turn for conversation in conversations for turn in conversation["turns"]]
+
+    labelled = [turn for turn in turns if turn["intent_correct"] is not None]
+    confusion = defaultdict(lambda: defaultdict(int))
+    for turn in labelled:
+        confusion[turn["expected_intent"]][turn["intent"] or "none"] += 1
+
+    scored = [turn["event_score"] for turn in turns if "event_score" in turn]
+    true_positives = sum(score["true_positives"] for score in scored)
+    false_positives = sum(score["false_positives"] for score in scored)
+    false_negatives = sum(score["false_negatives"] for score in scored)
+    precision = _ratio(true_positives, true_positives + false_positives)
+    recall = _ratio(true_positives, true_positives + false_negatives)
+
+    node_samples = defaultdict(list)
+    for turn in turns:
+        for node, milliseconds in turn["node_ms"]:
+            node_samples[node].append(milliseconds)
+    turn_latencies = [turn["latency_ms"] for turn in turns if not turn["error"]]
+
+    usage = [call for turn in turns for call in turn["llm_usage"]]
+    by_model = defaultdict(lambda: {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "cost_usd": 0.0})
+    for call in usage:
+        totals = by_model[call.get("model")]
+        totals["calls"] += 1
+        for key in ("input_tokens", "cached_tokens", "output_tokens"):
+            totals[key] += call.get(key, 0)
+        totals["cost_usd"] += token_cost(call)
+    total_cost = sum(totals["cost_usd"] for totals in by_model.values())
+
+    return {
+        "conversations": len(conversations),
+        "turns": len(turns),
+        "errors": sum(1 for turn in turns if turn["error"]),
+        "intent": {
+            "labelled_turns": len(labelled),
+            "accuracy": _ratio(sum(1 for turn in labelled if turn["intent_correct"]), len(labelled)),
+            "confusion": {expected: dict(actual) for expected, actual in confusion.items()},
+        },
+        "enrichment": {
+            "scored_turns": len(scored),
+            "true_positives": true_positives,
+            "false_positives": false_positives,
+            "false_negatives": false_negatives,
+            "precision": precision,
+            "recall": recall,
+            "f1": round(2 * precision * recall / (precision + recall), 4) if precision and recall else None,
+        },
+        "latency_ms": {
+            "turn": {"p50": _percentile(turn_latencies, 50), "p95": _percentile(turn_latencies, 95), "max": _percentile(turn_latencies, 100)},
+            "nodes": {
+                node: {"calls": len(samples), "p50": _percentile(samples, 50), "p95": _percentile(samples, 95), "max": _percentile(samples, 100)}
+                for node, samples in sorted(node_samples.items())
+            },
+        },
+        "tokens": {
+            "by_model": {model: {**totals, "cost_usd": round(totals["cost_usd"], 6)} for model, totals in by_model.items()},
+            "total_cost_usd": round(total_cost, 6),
+            "cost_per_turn_usd": round(total_cost / len(turns), 6) if turns else None,
+        },
+    }
+
+
+def run_evaluation(
+    conversations: Iterable[Dict],
+    workflow_mode: Optional[str] = None,
+    workers: int = 4,
+    turns_per_minute: float = 0,
+    budget_seconds: Optional[float] = None,
+    on_conversation=None
+) -> Dict:
+    """
+    Replay conversations concurrently and build a report
+
+    Args:
+        conversations: Parsed corpus
+        workflow_mode: sequential|combined (defaults to settings)
+        workers: Conversations replayed in parallel
+        turns_per_minute: Global turn rate limit (0 for none)
+        budget_seconds: Per-turn deadline (defaults to settings.CHAT_TURN_BUDGET_SECONDS)
+        on_conversation: Optional callback(conversation_result) for progress
+
+    Returns:
+        Report with "summary", "conversations" and run metadata
+    """
+    workflow_mode = workflow_mode or settings.SALES_AGENT_WORKFLOW_MODE
+    limiter = TurnRateLimiter(turns_per_minute)
+    started = time.perf_counter()
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            pool.submit(run_conversation, conversation, workflow_mode, limiter, budget_seconds)
+            for conversation in conversations
+        ]
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            if on_conversation:
+                on_conversation(result)
+
+    return {
+        "version": REPORT_VERSION,
+        "created_at": timezone.now().isoformat(),
+        "workflow_mode": workflow_mode,
+        "models": {node: config.get("model") for node, config in settings.LLM_NODE_CONFIG.items()},
+        "wall_seconds": round(time.perf_counter() - started, 1),
+        "summary": summarize(results),
+        "conversations": results,
+    }
+
+
+def _delta(current, baseline) -> Optional[float]:
+    if current is None or baseline is None:
+        return None
+    return round(current - baseline, 6)
+
+
+def compare_reports(current: Dict, baseline: Dict) -> Dict:
+    """
+    Metric deltas (current - baseline) and turns whose intent correctness changed
+
+    Returns:
+        {"metrics": {name: {"current", "baseline", "delta"}}, "nodes": {...}, "intent_regressions": [...], "intent_fixes": [...]}
+    """
+    now, then = current["summary"], baseline["summary"]
+    metrics = {
+        "intent_accuracy": (now["intent"]["accuracy"], then["intent"]["accuracy"]),
+        "enrichment_precision": (now["enrichment"]["precision"], then["enrichment"]["precision"]),
+        "enrichment_recall": (now["enrichment"]["recall"], then["enrichment"]["recall"]),
+        "turn_p50_ms": (now["latency_ms"]["turn"]["p50"], then["latency_ms"]["turn"]["p50"]),
+        "turn_p95_ms": (now["latency_ms"]["turn"]["p95"], then["latency_ms"]["turn"]["p95"]),
+        "cost_per_turn_usd": (now["tokens"]["cost_per_turn_usd"], then["tokens"]["cost_per_turn_usd"]),
+        "errors": (now["errors"], then["errors"]),
+    }
+
+    nodes = {}
+    for node in sorted(set(now["latency_ms"]["nodes"]) | set(then["latency_ms"]["nodes"])):
+        current_node = now["latency_ms"]["nodes"].get(node, {})
+        baseline_node = then["latency_ms"]["nodes"].get(node, {})
+        nodes[node] = {
+            "p95_ms": current_node.get("p95"),
+            "baseline_p95_ms": baseline_node.get("p95"),
+            "delta_ms": _delta(current_node.get("p95"), baseline_node.get("p95")),
+        }
+
+    def correctness(report):
+        return {
+            (turn["conversation_id"], turn["turn"]): turn["intent_correct"]
+            for conversation in report["conversations"] for turn in conversation["turns"]
+            if turn["intent_correct"] is not None
+        }
+
+    current_turns, baseline_turns = correctness(current), correctness(baseline)
+    shared = sorted(set(current_turns) & set(baseline_turns))
+
+    return {
+        "baseline_created_at": baseline.get("created_at"),
+        "metrics": {
+            name: {"current": value, "baseline": baseline_value, "delta": _delta(value, baseline_value)}
+            for name, (value, baseline_value) in metrics.items()
+        },
+        "nodes": nodes,
+        "intent_regressions": [
+            {"conversation_id": key[0], "turn": key[1]} for key in shared
+            if baseline_turns[key] and not current_turns[key]
+        ],
+        "intent_fixes": [
+            {"conversation_id": key[0], "turn": key[1]} for key in shared
+            if current_turns[key] and not baseline_turns[key]
+        ],
+    }
@@ -0,0 +1,199 @@
+"""
+Streaming exports of prospects, sessions, messages and enrichment events
+
+Rows are read with server-side cursors (.iterator(chunk_size)) and serialized
+one line at a time, so an export uses constant memory however many rows it
+covers. `updated_since` limits an export to rows changed at or after a time;
+clients pass the previous export's start time to fetch only what changed.
+"""
+import csv
+import json
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from sales_agent.models import ConversationSession, EnrichmentEvent, Prospect
+
+
+EXPORT_FORMATS = ("ndjson", "csv")
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Understanding projection columns included with each prospect
+UNDERSTANDING_COLUMNS = [
+    "budget_interest", "care_needs", "timeline", "preferences", "financing_interests", "tour_status",
+]
+
+EXPORT_COLUMNS = {
+    "prospects": [
+        "prospect_id", "first_name", "last_name", "email", "phone", "tour_scheduled", "tour_datetime",
+        *UNDERSTANDING_COLUMNS, "created_at", "updated_at",
+    ],
+    "sessions": [
+        "session_id", "prospect_id", "current_understanding", "tour_booking", "is_active",
+        "started_at", "updated_at",
+    ],
+    "messages": [
+        "session_id", "prospect_id", "position", "role", "content", "intent", "timestamp",
+    ],
+    "events": [
+        "event_id", "session_id", "prospect_id", "event_type", "event_data", "extracted_by_agent",
+        "source_message", "confidence", "created_at",
+    ],
+}
+EXPORT_DATASETS = tuple(EXPORT_COLUMNS)
+
+
+def parse_updated_since(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse an ISO 8601 updated_since value (naive times are in the server time zone)
+
+    Raises:
+        ValueError: If the value is not a datetime
+    """
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid updated_since: {value}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _prospect_rows(updated_since: Optional[datetime], chunk_size: int) -> Iterator[Dict]:
+    prospects = Prospect.objects.order_by('updated_at', 'prospect_id')
+    if updated_since:
+        # New enrichment changes the projection without touching the prospect row
+        prospects = prospects.filter(
+            Q(updated_at__gte=updated_since) | Q(understanding__updated_at__gte=updated_since)
+        )
+    return prospects.values(
+        'prospect_id', 'first_name', 'last_name', 'email', 'phone', 'tour_scheduled', 'tour_datetime',
+        'created_at', 'updated_at',
+        **{column: F(f'understanding__{column}') for column in UNDERSTANDING_COLUMNS}
+    ).iterator(chunk_size=chunk_size)
+
+
+def _sessions(updated_since: Optional[datetime]):
+    sessions = ConversationSession.objects.order_by('updated_at', 'session_id')
+    if updated_since:
+        sessions = sessions.filter(updated_at__gte=updated_since)
+    return sessions
+
+
+def _session_rows(updated_since: Optional[datetime], chunk_size: int) -> Iterator[Dict]:
+    return _sessions(updated_since).values(
+        'session_id', 'prospect_id', 'current_understanding', 'tour_booking', 'is_active',
+        'started_at', 'updated_at',
+    ).iterator(chunk_size=chunk_size)
+
+
+def _message_rows(updated_since: Optional[datetime], chunk_size: int) -> Iterator[Dict]:
+    # Histories are large, so fewer sessions are fetched per round trip
+    sessions = _sessions(updated_since).values_list('session_id', 'prospect_id', 'conversation_history')
+    for session_id, prospect_id, history in sessions.iterator(chunk_size=max(1, chunk_size // 10)):
+        for position, message in enumerate(history or []):
+            timestamp = message.get("timestamp")
+            if updated_since and timestamp and datetime.fromisoformat(timestamp) < updated_since:
+                continue  # Sent before the previous export
+            yield {
+                "session_id": session_id,
+                "prospect_id": prospect_id,
+                "position": position,
+                "role": message.get("role"),
+                "content": message.get("content"),
+                "intent": message.get("intent"),
+                "timestamp": timestamp,
+            }
+
+
+def _event_rows(updated_since: Optional[datetime], chunk_size: int) -> Iterator[Dict]:
+    # Events are never updated, so creation time is their change time
+    events = EnrichmentEvent.objects.order_by('created_at', 'event_id')
+    if updated_since:
+        events = events.filter(created_at__gte=updated_since)
+    return events.values(
+        'event_id', 'session_id', 'event_type', 'event_data', 'extracted_by_agent',
+        'source_message', 'confidence', 'created_at',
+        prospect_id=F('session__prospect_id'),
+    ).iterator(chunk_size=chunk_size)
+
+
+ROW_SOURCES = {
+    "prospects": _prospect_rows,
+    "sessions": _session_rows,
+    "messages": _message_rows,
+    "events": _event_rows,
+}
+
+
+def iter_rows(dataset: str, updated_since: Optional[datetime] = None, chunk_size: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Stream one dataset's rows oldest change first
+
+    Args:
+        dataset: prospects|sessions|messages|events
+        updated_since: Only rows changed at or after this time
+        chunk_size: Rows per cursor round trip (defaults to settings.EXPORT_CHUNK_SIZE)
+    """
+    return ROW_SOURCES[dataset](updated_since, chunk_size or settings.EXPORT_CHUNK_SIZE)
+
+
+def _ndjson_lines(rows: Iterator[Dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+class _LineBuffer:
+    """File-like object that hands back what csv.writer writes"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(rows: Iterator[Dict], columns) -> Iterator[str]:
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_csv_value(row.get(column)) for column in columns])
+
+
+def stream_export(
+    dataset: str,
+    export_format: str = "ndjson",
+    updated_since: Optional[datetime] = None,
+    chunk_size: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Serialized export lines for a dataset
+
+    Args:
+        dataset: prospects|sessions|messages|events
+        export_format: ndjson (one JSON object per line) or csv (header row first;
+            JSON-valued columns are JSON-encoded strings)
+        updated_since: Only rows changed at or after this time
+        chunk_size: Rows per cursor round trip
+
+    Returns:
+        Iterator of text lines
+    """
+    rows = iter_rows(dataset, updated_since, chunk_size)
+    if export_format == "csv":
+        return _csv_lines(rows, EXPORT_COLUMNS[dataset])
+    return _ndjson_lines(rows)
@@ -0,0 +1,141 @@
+"""
+Create, update and delete knowledge base items
+
+Each write embeds only the changed item (for every live embedding version,
+so an in-progress version migration stays complete) before opening a short
+transaction that stores the item and its vectors and broadcasts a change
+notification; if embedding fails nothing is written. Metadata-only edits are
+not re-embedded: their embeddings are touched so they stay as fresh as the item.
+"""
+from typing import Dict, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from sales_agent.embeddings import embed_for_live_versions, write_live_embeddings
+from sales_agent.knowledge_events import notify_knowledge_changed
+from sales_agent.knowledge_index import invalidate_knowledge_caches
+from sales_agent.models import KNOWLEDGE_CATEGORIES, CommunityKnowledge, KnowledgeEmbedding
+
+
+EDITABLE_FIELDS = ("category", "content", "metadata")
+
+
+def knowledge_to_dict(item: CommunityKnowledge) -> Dict:
+    return {
+        "id": str(item.id),
+        "category": item.category,
+        "content": item.content,
+        "metadata": item.metadata,
+        "created_at": item.created_at.isoformat(),
+        "updated_at": item.updated_at.isoformat(),
+    }
+
+
+def clean_knowledge_fields(data: Dict, partial: bool = False) -> Dict:
+    """
+    Validate editable fields from a request body
+
+    Args:
+        data: Request body
+        partial: Only validate the fields present (PATCH)
+
+    Returns:
+        Dictionary of the provided editable fields
+
+    Raises:
+        ValueError: If a field is missing or invalid
+    """
+    fields = {name: data[name] for name in EDITABLE_FIELDS if name in data}
+    if not partial:
+        missing = [name for name in ("category", "content") if name not in fields]
+        if missing:
+            raise ValueError(f"Missing required fields: {', '.join(missing)}")
+        fields.setdefault("metadata", {})
+
+    if "category" in fields and fields["category"] not in KNOWLEDGE_CATEGORIES:
+        raise ValueError(f"Unknown category: {fields['category']}. Available: {', '.join(KNOWLEDGE_CATEGORIES)}")
+    if "content" in fields and (not isinstance(fields["content"], str) or not fields["content"].strip()):
+        raise ValueError("content must be a non-empty string")
+    if "metadata" in fields and not isinstance(fields["metadata"], dict):
+        raise ValueError("metadata must be a JSON object")
+    return fields
+
+
+def create_knowledge(data: Dict) -> CommunityKnowledge:
+    """
+    Add an item and embed it
+
+    Raises:
+        ValueError: If the fields are invalid
+    """
+    fields = clean_knowledge_fields(data)
+    embedded = embed_for_live_versions([fields["content"]])
+    with transaction.atomic():
+        item = CommunityKnowledge.objects.create(**fields)
+        write_live_embeddings([item], embedded)
+        notify_knowledge_changed("created", [item.id])
+    invalidate_knowledge_caches()
+    return item
+
+
+def update_knowledge(item_id, data: Dict, partial: bool = True) -> Optional[CommunityKnowledge]:
+    """
+    Change an item, re-embedding it only if its content changed
+
+    The new content is embedded before the row is locked; if another edit
+    changed the content in the meantime, the update starts over.
+
+    Returns:
+        The updated item, or None if it does not exist
+
+    Raises:
+        ValueError: If the fields are invalid
+    """
+    fields = clean_knowledge_fields(data, partial=partial)
+    while True:
+        current = CommunityKnowledge.objects.filter(id=item_id).values_list('content', flat=True).first()
+        if current is None:
+            return None
+        content_changed = "content" in fields and fields["content"] != current
+        embedded = embed_for_live_versions([fields["content"]]) if content_changed else None
+
+        with transaction.atomic():
+            item = CommunityKnowledge.objects.select_for_update().filter(id=item_id).first()
+            if item is None:
+                return None
+            if item.content != current:
+                continue
+
+            previous_updated_at = item.updated_at
+            for name, value in fields.items():
+                setattr(item, name, value)
+            item.save()
+
+            if content_changed:
+                write_live_embeddings([item], embedded)
+            else:
+                # Same text, same vectors: embeddings that were current stay current
+                # (and move partition if the category changed)
+                KnowledgeEmbedding.objects.filter(knowledge=item, updated_at__gte=previous_updated_at).update(
+                    category=item.category, updated_at=timezone.now()
+                )
+            notify_knowledge_changed("updated", [item.id])
+        invalidate_knowledge_caches()
+        return item
+
+
+def delete_knowledge(item_id) -> bool:
+    """
+    Remove an item and its embeddings
+
+    Returns:
+        False if the item does not exist
+    """
+    with transaction.atomic():
+        deleted, _ = CommunityKnowledge.objects.filter(id=item_id).delete()
+        if deleted:
+            notify_knowledge_changed("deleted", [item_id])
+    if deleted:
+        invalidate_knowledge_caches()
+    return bool(deleted)
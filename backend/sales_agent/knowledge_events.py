@@ -0,0 +1,120 @@
+"""
+Cross-process invalidation of knowledge caches with Postgres LISTEN/NOTIFY
+
+Every knowledge base write sends a notification on KNOWLEDGE_NOTIFY_CHANNEL in
+its transaction (delivered on commit). Each worker runs one listener thread on
+a dedicated connection that invalidates all of its KnowledgeCache instances
+(BM25 index, category vectors, static contexts) as notifications arrive, so
+changes show up within seconds instead of after the fingerprint TTL. The
+fingerprint check stays as the fallback if the listener is disconnected.
+"""
+import json
+import os
+import select
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connection, connections
+
+from sales_agent.knowledge_index import invalidate_knowledge_caches
+
+
+def notify_knowledge_changed(action: str, item_ids: List[str]):
+    """
+    Broadcast a knowledge change to every worker (sent when the current transaction commits)
+
+    Args:
+        action: "created", "updated" or "deleted"
+        item_ids: Changed CommunityKnowledge ids
+    """
+    payload = json.dumps({"action": action, "ids": [str(item_id) for item_id in item_ids], "pid": os.getpid()})
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, %s)", [settings.KNOWLEDGE_NOTIFY_CHANNEL, payload])
+
+
+class KnowledgeChangeListener:
+    """
+    Background thread that LISTENs for knowledge changes and invalidates local caches
+    """
+
+    def __init__(self, alias: str = "default"):
+        self.alias = alias
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.connected = False
+        self.notifications = 0
+        self.last_notification_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        """Start the listener thread once per process"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="knowledge-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _connect(self):
+        # A dedicated autocommit connection: Django's per-thread connection is
+        # closed between requests and LISTEN needs a long-lived session
+        wrapper = connections[self.alias]
+        raw = wrapper.get_new_connection(wrapper.get_connection_params())
+        raw.autocommit = True
+        with raw.cursor() as cursor:
+            cursor.execute(f'LISTEN "{settings.KNOWLEDGE_NOTIFY_CHANNEL}"')
+        return raw
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            raw = None
+            try:
+                raw = self._connect()
+                self.connected = True
+                backoff = 1.0
+                # Changes made while disconnected were not heard
+                invalidate_knowledge_caches()
+                while not self._stop.is_set():
+                    readable, _, _ = select.select([raw], [], [], settings.KNOWLEDGE_LISTENER_POLL_SECONDS)
+                    if not readable:
+                        continue
+                    raw.poll()
+                    if raw.notifies:
+                        # Several writes in one burst rebuild once
+                        self.notifications += len(raw.notifies)
+                        raw.notifies.clear()
+                        self.last_notification_at = time.time()
+                        invalidate_knowledge_caches()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Knowledge listener disconnected, retrying in {backoff:.0f}s: {e}", file=sys.stderr)
+            finally:
+                self.connected = False
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    def status(self) -> Dict:
+        """Listener state for metrics endpoints"""
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "connected": self.connected,
+            "notifications": self.notifications,
+            "last_notification_at": self.last_notification_at,
+            "last_error": self.last_error,
+        }
+
+
+knowledge_listener = KnowledgeChangeListener()
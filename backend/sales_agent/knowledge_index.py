@@ -0,0 +1,243 @@
+"""
+In-memory lexical (BM25) index over the community knowledge base
+
+Short, keyword-heavy questions ("Medicaid?", "smoking") match poorly on
+embeddings alone, so KnowledgeRetriever can blend these lexical rankings with
+vector rankings (see rag.py). The index is rebuilt whenever the knowledge
+base content changes.
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import BigIntegerField, Count, Func, Max, Sum, TextField
+from django.db.models.functions import Cast, Concat
+
+from sales_agent.models import CommunityKnowledge, EmbeddingVersion
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    "a", "about", "an", "and", "any", "are", "as", "at", "be", "can", "could", "do", "does",
+    "for", "from", "have", "how", "i", "if", "in", "is", "it", "me", "much", "my", "of", "on",
+    "or", "our", "should", "so", "tell", "that", "the", "there", "this", "to", "what", "when",
+    "where", "which", "who", "will", "with", "would", "you", "your",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase, split on non-alphanumerics, drop stopwords and strip plural "s"
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of normalized terms
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+class KnowledgeIndex:
+    """
+    BM25 inverted index over CommunityKnowledge.content
+    """
+
+    def __init__(self, items: List[Dict], k1: float = 1.5, b: float = 0.75):
+        """
+        Build the index
+
+        Args:
+            items: Knowledge items as dicts with id, category, content and metadata
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+        """
+        self.items = items
+        self.k1 = k1
+        self.b = b
+
+        self.positions = {item["id"]: doc_idx for doc_idx, item in enumerate(items)}
+        self.doc_terms: List[Counter] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for doc_idx, item in enumerate(items):
+            term_counts = Counter(tokenize(item["content"]))
+            self.doc_terms.append(term_counts)
+            for term, tf in term_counts.items():
+                self.postings[term].append((doc_idx, tf))
+
+        self.doc_lengths = [sum(terms.values()) for terms in self.doc_terms]
+        self.avg_doc_length = (sum(self.doc_lengths) / len(items)) if items else 0.0
+
+        doc_count = len(items)
+        self.idf = {
+            term: math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def search(
+        self,
+        query: str,
+        category_filter: Optional[List[str]] = None,
+        top_k: int = 5
+    ) -> List[Tuple[Dict, float]]:
+        """
+        Rank knowledge items by BM25 score
+
+        Args:
+            query: Natural language query
+            category_filter: Optional list of categories to filter by
+            top_k: Number of results to return
+
+        Returns:
+            List of (item, score) tuples, best first. Items with no matching terms are omitted.
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_idx, tf in self.postings[term]:
+                if category_filter and self.items[doc_idx]["category"] not in category_filter:
+                    continue
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_idx] / self.avg_doc_length
+                scores[doc_idx] += idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+
+        ranked = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)[:top_k]
+        return [(self.items[doc_idx], score) for doc_idx, score in ranked]
+
+    def covers_query(self, query: str, item: Dict) -> bool:
+        """
+        Check whether an item contains every term of the query
+
+        Args:
+            query: Natural language query
+            item: Knowledge item returned by search()
+
+        Returns:
+            True if all query terms appear in the item's content
+        """
+        terms = set(tokenize(query))
+        doc_terms = self.doc_terms[self.positions[item["id"]]]
+        return bool(terms) and all(term in doc_terms for term in terms)
+
+
+def knowledge_fingerprint() -> Tuple[int, Optional[str], Optional[int], Optional[int]]:
+    """
+    Cheap signature of the knowledge base that changes when content or the active embedding version changes
+
+    Count and latest updated_at alone miss a delete plus an insert (or an
+    update committed late) that leaves both unchanged, so the fingerprint
+    also sums a hash of every row's id and updated_at.
+
+    Returns:
+        Tuple of (row count, latest updated_at, row hash sum, active EmbeddingVersion id)
+    """
+    row_hash = Func(
+        Concat(Cast('id', TextField()), Cast('updated_at', TextField()), output_field=TextField()),
+        function='hashtext',
+        output_field=BigIntegerField()
+    )
+    stats = CommunityKnowledge.objects.aggregate(count=Count('id'), latest=Max('updated_at'), rows=Sum(row_hash))
+    latest = stats['latest'].isoformat() if stats['latest'] else None
+    active_version_id = EmbeddingVersion.objects.filter(
+        status=EmbeddingVersion.STATUS_ACTIVE
+    ).values_list('id', flat=True).first()
+    return stats['count'], latest, stats['rows'], active_version_id
+
+
+class KnowledgeCache:
+    """
+    Per-process cache of a value derived from the knowledge base
+
+    The value is rebuilt lazily when the knowledge fingerprint changes. The
+    fingerprint is checked at most every RAG_KNOWLEDGE_INDEX_TTL seconds, or
+    right away after invalidate_knowledge_caches() (called on knowledge change
+    notifications, see knowledge_events.py).
+    """
+
+    instances: List["KnowledgeCache"] = []
+
+    def __init__(self, builder: Callable[[], Any]):
+        """
+        Args:
+            builder: Function that builds the value from the database
+        """
+        self._builder = builder
+        self._lock = threading.Lock()
+        self._value = None
+        self._fingerprint = None
+        self._checked_at = 0.0
+        KnowledgeCache.instances.append(self)
+
+    def get(self, **build_kwargs) -> Any:
+        """
+        Get the cached value, rebuilding it if the knowledge base changed
+
+        Args:
+            **build_kwargs: Passed to the builder if this call rebuilds the value
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._value is None or now - self._checked_at >= settings.RAG_KNOWLEDGE_INDEX_TTL:
+                fingerprint = knowledge_fingerprint()
+                if self._value is None or fingerprint != self._fingerprint:
+                    self._value = self._builder(**build_kwargs)
+                    self._fingerprint = fingerprint
+                self._checked_at = now
+            return self._value
+
+    def invalidate(self):
+        """Force the next get() to rebuild"""
+        with self._lock:
+            self._value = None
+            self._fingerprint = None
+
+
+def invalidate_knowledge_caches():
+    """Force every knowledge-derived cache in this process to rebuild on next use"""
+    for cache in KnowledgeCache.instances:
+        cache.invalidate()
+
+
+def build_knowledge_index() -> KnowledgeIndex:
+    """
+    Build a fresh index from the database
+
+    Returns:
+        KnowledgeIndex over all CommunityKnowledge rows
+    """
+    items = [
+        {
+            'id': str(item['id']),
+            'category': item['category'],
+            'content': item['content'],
+            'metadata': item['metadata'],
+        }
+        for item in CommunityKnowledge.objects.values('id', 'category', 'content', 'metadata').order_by('id')
+    ]
+    return KnowledgeIndex(items)
+
+
+_index_cache = KnowledgeCache(build_knowledge_index)
+
+
+def get_knowledge_index() -> KnowledgeIndex:
+    """Get the current process-wide knowledge index"""
+    return _index_cache.get()
+
+
+def invalidate_knowledge_index():
+    """Force the next get_knowledge_index() call to rebuild"""
+    _index_cache.invalidate()
@@ -0,0 +1,412 @@
+"""
+Outbound call governor for OpenAI chat and embedding requests
+
+Every provider call goes through governor.call(), which applies:
+- a per-process concurrency limit (threads in this worker)
+- a cross-process concurrency limit shared by all workers on the host (flock'd slot files)
+- cross-process request and token rate limits (flock'd token buckets)
+- retries with exponential backoff and full jitter that honor Retry-After
+- a circuit breaker that fails fast while the provider is degraded
+
+Queue depth, wait times, retries and breaker state are exposed via snapshot().
+"""
+import fcntl
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+
+
+class ProviderUnavailable(Exception):
+    """
+    Raised when a provider call cannot be made or keeps failing
+
+    Attributes:
+        retry_after: Suggested seconds before the client retries
+    """
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(ProviderUnavailable):
+    """Raised when a call cannot complete within the chat turn's remaining budget"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, timeouts, connection errors and 5xx responses are worth retrying"""
+    import openai
+
+    return isinstance(error, (
+        openai.RateLimitError,
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+    ))
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Read the provider's Retry-After hint from an OpenAI error, if any
+
+    Returns:
+        Seconds to wait, or None if the response carried no hint
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        # Retry-After may also be an HTTP date; fall back to our own backoff
+        return None
+    return None
+
+
+class CircuitBreaker:
+    """
+    Opens after consecutive failures, fails fast while open, and lets a single
+    probe through once the reset timeout has passed (half-open)
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        """
+        Raises:
+            ProviderUnavailable: If the circuit is open
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.reset_seconds - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    raise ProviderUnavailable("LLM provider circuit is open", retry_after=remaining)
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise ProviderUnavailable("LLM provider circuit is half-open, probe in flight", retry_after=1.0)
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def cancel_probe(self):
+        """Release a half-open probe that never reached the provider"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_seconds
+
+
+class HostSlots:
+    """
+    Cross-process concurrency limit: a caller holds an flock on one of N slot files
+
+    Locks are released by the kernel if a worker dies, so slots never leak.
+    """
+
+    def __init__(self, directory: str, slots: int):
+        self.directory = directory
+        self.slots = slots
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def acquire(self, deadline: float):
+        """
+        Hold a host-wide slot for the duration of the block
+
+        Raises:
+            ProviderUnavailable: If no slot frees up before the deadline
+        """
+        order = list(range(self.slots))
+        while True:
+            random.shuffle(order)
+            for slot in order:
+                handle = open(os.path.join(self.directory, f"slot-{slot}.lock"), "a")
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    handle.close()
+                    continue
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+                    handle.close()
+                return
+            if time.monotonic() >= deadline:
+                raise ProviderUnavailable("Timed out waiting for a host-wide LLM slot", retry_after=1.0)
+            time.sleep(0.02 + random.random() * 0.03)
+
+
+class SharedTokenBucket:
+    """
+    Cross-process token bucket refilled at a per-minute rate, stored in an flock'd file
+    """
+
+    def __init__(self, path: str, per_minute: float):
+        self.path = path
+        self.capacity = per_minute
+        self.rate_per_second = per_minute / 60.0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def _take(self, amount: float) -> float:
+        """Take amount if available; otherwise return seconds until it will be"""
+        with open(self.path, "a+") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                handle.seek(0)
+                raw = handle.read()
+                now = time.time()
+                state = json.loads(raw) if raw else {"level": self.capacity, "updated": now}
+                level = min(self.capacity, state["level"] + (now - state["updated"]) * self.rate_per_second)
+                # Requests larger than the whole bucket are let through when it is full
+                needed = min(amount, self.capacity)
+                if level >= needed:
+                    level -= needed
+                    wait = 0.0
+                else:
+                    wait = (needed - level) / self.rate_per_second
+                handle.seek(0)
+                handle.truncate()
+                handle.write(json.dumps({"level": level, "updated": now}))
+                return wait
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def acquire(self, amount: float, deadline: float):
+        """
+        Block until amount is available
+
+        Raises:
+            ProviderUnavailable: If the wait would pass the deadline
+        """
+        while True:
+            wait = self._take(amount)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise ProviderUnavailable("LLM rate limit budget exhausted", retry_after=wait)
+            time.sleep(min(wait, 0.5) + random.random() * 0.05)
+
+
+class OutboundGovernor:
+    """
+    Shared limiter, retry policy and circuit breaker for provider calls
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._process_slots = threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY_PER_PROCESS)
+        state_dir = settings.LLM_GOVERNOR_STATE_DIR
+        self._host_slots = HostSlots(state_dir, settings.LLM_MAX_CONCURRENCY_HOST) if settings.LLM_MAX_CONCURRENCY_HOST else None
+        self._request_bucket = (
+            SharedTokenBucket(os.path.join(state_dir, "requests.bucket"), settings.LLM_REQUESTS_PER_MINUTE)
+            if settings.LLM_REQUESTS_PER_MINUTE else None
+        )
+        self._token_bucket = (
+            SharedTokenBucket(os.path.join(state_dir, "tokens.bucket"), settings.LLM_TOKENS_PER_MINUTE)
+            if settings.LLM_TOKENS_PER_MINUTE else None
+        )
+        self.breaker = CircuitBreaker(settings.LLM_CIRCUIT_FAILURE_THRESHOLD, settings.LLM_CIRCUIT_RESET_SECONDS)
+
+        # Metrics
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self._wait_ms = deque(maxlen=500)
+
+    def call(
+        self,
+        fn: Callable[[], Any],
+        estimated_tokens: int = 0,
+        operation: str = "chat",
+        deadline: Optional[float] = None
+    ) -> Any:
+        """
+        Run a provider call under the limits, retry policy and circuit breaker
+
+        Args:
+            fn: Zero-argument function making one provider request
+            estimated_tokens: Prompt tokens to charge against the token rate limit
+            operation: Label for logs ("chat", "embedding")
+            deadline: Optional wall-clock time (time.time()) after which no wait or retry starts
+
+        Returns:
+            Whatever fn returns
+
+        Raises:
+            ProviderUnavailable: Circuit open, queue timeout, or retries exhausted on retryable errors
+            Exception: Non-retryable errors from fn are re-raised unchanged
+        """
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except ProviderUnavailable:
+                with self._lock:
+                    self.rejected += 1
+                raise
+
+            try:
+                result = self._call_once(fn, estimated_tokens, deadline)
+            except ProviderUnavailable:
+                # Local queue/rate limit timeout: the provider was never called
+                with self._lock:
+                    self.rejected += 1
+                self.breaker.cancel_probe()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # The provider answered (e.g. 400), so it is healthy
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                with self._lock:
+                    self.failures += 1
+                if attempt >= settings.LLM_MAX_RETRIES or self.breaker.is_open:
+                    raise ProviderUnavailable(
+                        f"LLM {operation} call failed after {attempt + 1} attempts: {e}",
+                        retry_after=retry_after_seconds(e) or settings.LLM_CIRCUIT_RESET_SECONDS,
+                    ) from e
+
+                # Full jitter backoff, but never sooner than the provider asked
+                backoff = random.uniform(0, min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * (2 ** attempt)))
+                hinted = retry_after_seconds(e)
+                delay = max(backoff, hinted + random.uniform(0, 0.25)) if hinted is not None else backoff
+                if deadline is not None and time.time() + delay >= deadline:
+                    raise DeadlineExceeded(
+                        f"LLM {operation} call failed and no budget is left to retry: {e}",
+                        retry_after=delay,
+                    ) from e
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                print(f"Retrying LLM {operation} call in {delay:.2f}s (attempt {attempt}): {e}", file=sys.stderr)
+                time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            return result
+
+    def _call_once(self, fn: Callable[[], Any], estimated_tokens: int, turn_deadline: Optional[float]) -> Any:
+        queue_timeout = settings.LLM_QUEUE_TIMEOUT
+        if turn_deadline is not None:
+            queue_timeout = min(queue_timeout, max(0.0, turn_deadline - time.time()))
+        deadline = time.monotonic() + queue_timeout
+        queued_at = time.monotonic()
+        with self._lock:
+            self.queue_depth += 1
+        try:
+            if not self._process_slots.acquire(timeout=queue_timeout):
+                raise ProviderUnavailable("Timed out waiting for an LLM slot", retry_after=1.0)
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+
+        try:
+            with self._host_slot(deadline):
+                if self._request_bucket:
+                    self._request_bucket.acquire(1, deadline)
+                if self._token_bucket and estimated_tokens:
+                    self._token_bucket.acquire(estimated_tokens, deadline)
+
+                with self._lock:
+                    self._wait_ms.append((time.monotonic() - queued_at) * 1000)
+                    self.in_flight += 1
+                    self.calls += 1
+                try:
+                    return fn()
+                finally:
+                    with self._lock:
+                        self.in_flight -= 1
+        finally:
+            self._process_slots.release()
+
+    @contextmanager
+    def _host_slot(self, deadline: float):
+        if self._host_slots is None:
+            yield
+            return
+        with self._host_slots.acquire(deadline):
+            yield
+
+    def snapshot(self) -> Dict:
+        """Current metrics for this worker process"""
+        with self._lock:
+            waits = sorted(self._wait_ms)
+        p95 = waits[int(len(waits) * 0.95) - 1] if waits else 0.0
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "circuit_state": self.breaker.state,
+            "wait_ms": {
+                "avg": (sum(waits) / len(waits)) if waits else 0.0,
+                "p95": p95,
+                "max": waits[-1] if waits else 0.0,
+            },
+        }
+
+
+_governor: Optional[OutboundGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> OutboundGovernor:
+    """Get the process-wide governor, created on first use"""
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = OutboundGovernor()
+    return _governor
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt token estimate (about 4 characters per token)"""
+    return len(text) // 4 + 1
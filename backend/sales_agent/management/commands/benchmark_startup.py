@@ -0,0 +1,79 @@
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from django.core.management.base import BaseCommand
+
+
+# Each target is imported in a fresh interpreter after django.setup()
+IMPORT_TARGETS = [
+    "sales_agent.models",
+    "sales_agent.views",
+    "config.urls",
+    "sales_agent.rag",
+    "sales_agent.agents.workflow",
+]
+
+IMPORT_SCRIPT = """
+import json, os, sys, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+started = time.perf_counter()
+import django
+django.setup()
+setup_ms = (time.perf_counter() - started) * 1000
+started = time.perf_counter()
+__import__(sys.argv[1])
+import_ms = (time.perf_counter() - started) * 1000
+heavy = [name for name in ("langgraph", "langchain_openai", "openai") if name in sys.modules]
+print(json.dumps({"setup_ms": setup_ms, "import_ms": import_ms, "heavy_modules": heavy}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Measure cold import time of app modules and per-worker warm-up time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per import target')
+        parser.add_argument('--skip-warmup', action='store_true', help='Only measure imports')
+
+    def handle(self, *args, **options):
+        backend_dir = Path(__file__).resolve().parent.parent.parent.parent
+        repeat = options['repeat']
+
+        self.stdout.write(self.style.SUCCESS(f'Import benchmark ({repeat} fresh interpreters per target)'))
+        for target in IMPORT_TARGETS:
+            samples = []
+            heavy = []
+            for _ in range(repeat):
+                completed = subprocess.run(
+                    [sys.executable, '-c', IMPORT_SCRIPT, target],
+                    cwd=backend_dir, capture_output=True, text=True
+                )
+                if completed.returncode != 0:
+                    error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'unknown error'
+                    self.stdout.write(self.style.ERROR(f'  ✗ {target}: {error}'))
+                    break
+                result = json.loads(completed.stdout.strip().splitlines()[-1])
+                samples.append(result['import_ms'])
+                heavy = result['heavy_modules']
+            if samples:
+                self.stdout.write(
+                    f'  {target:<32} median {statistics.median(samples):8.1f} ms'
+                    f'  max {max(samples):8.1f} ms'
+                    f'  heavy: {", ".join(heavy) or "none"}'
+                )
+
+        if options['skip_warmup']:
+            return
+
+        from sales_agent.warmup import warm_up
+
+        self.stdout.write(self.style.SUCCESS('\nWorker warm-up'))
+        # Background threads would keep writing to the DB after the command exits
+        timings = warm_up.run(force=True, background=False)
+        for step, elapsed in timings.items():
+            error = warm_up.errors.get(step)
+            suffix = f'  ✗ {error.splitlines()[0]}' if error else ''
+            self.stdout.write(f'  {step:<32} {elapsed:8.1f} ms{suffix}')
+        self.stdout.write(f'  {"total":<32} {sum(timings.values()):8.1f} ms')
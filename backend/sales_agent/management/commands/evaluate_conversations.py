@@ -0,0 +1,92 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from sales_agent.evaluation import compare_reports, load_corpus, run_evaluation
+
+
+def _format(value, suffix=''):
+    return 'n/a' if value is None else f'{value}{suffix}'
+
+
+class Command(BaseCommand):
+    help = 'Replay a JSONL corpus of labelled conversations through the workflow and report quality, latency and cost'
+
+    def add_arguments(self, parser):
+        parser.add_argument('corpus', help='JSONL file, one conversation per line (e.g. data/eval_conversations.jsonl)')
+        parser.add_argument('--workflow-mode', default=settings.SALES_AGENT_WORKFLOW_MODE, help='sequential or combined')
+        parser.add_argument('--workers', type=int, default=4, help='Conversations replayed in parallel')
+        parser.add_argument('--turns-per-minute', type=float, default=0, help='Global turn rate limit (0 for none)')
+        parser.add_argument('--budget', type=float, default=settings.CHAT_TURN_BUDGET_SECONDS, help='Per-turn deadline in seconds')
+        parser.add_argument('--output', help='Write the full report (JSON) here, e.g. to use as a later baseline')
+        parser.add_argument('--baseline', help='Earlier report to compare against')
+
+    def handle(self, *args, **options):
+        try:
+            conversations = load_corpus(options['corpus'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        turns = sum(len(conversation['turns']) for conversation in conversations)
+        self.stdout.write(
+            f'Replaying {len(conversations)} conversations ({turns} turns) in {options["workflow_mode"]} mode '
+            f'with {options["workers"]} workers'
+        )
+
+        def progress(result):
+            errors = sum(1 for turn in result['turns'] if turn['error'])
+            self.stdout.write(f'  {result["id"]}: {len(result["turns"])} turns{f", {errors} errors" if errors else ""}')
+
+        report = run_evaluation(
+            conversations,
+            workflow_mode=options['workflow_mode'],
+            workers=options['workers'],
+            turns_per_minute=options['turns_per_minute'],
+            budget_seconds=options['budget'],
+            on_conversation=progress,
+        )
+        summary = report['summary']
+
+        self.stdout.write(self.style.SUCCESS(f'\nResults ({report["wall_seconds"]}s wall time)'))
+        self.stdout.write(f'  Intent accuracy:      {_format(summary["intent"]["accuracy"])} ({summary["intent"]["labelled_turns"]} labelled turns)')
+        self.stdout.write(
+            f'  Enrichment precision: {_format(summary["enrichment"]["precision"])}  '
+            f'recall: {_format(summary["enrichment"]["recall"])}  f1: {_format(summary["enrichment"]["f1"])}'
+        )
+        self.stdout.write(
+            f'  Turn latency:         p50 {_format(summary["latency_ms"]["turn"]["p50"], "ms")}  '
+            f'p95 {_format(summary["latency_ms"]["turn"]["p95"], "ms")}'
+        )
+        for node, stats in summary['latency_ms']['nodes'].items():
+            self.stdout.write(f'    {node:<24} p50 {_format(stats["p50"], "ms")}  p95 {_format(stats["p95"], "ms")}  ({stats["calls"]} runs)')
+        self.stdout.write(
+            f'  Token cost:           ${summary["tokens"]["total_cost_usd"]:.4f} total, '
+            f'${_format(summary["tokens"]["cost_per_turn_usd"])} per turn'
+        )
+        if summary['errors']:
+            self.stdout.write(self.style.WARNING(f'  Errors: {summary["errors"]} turns'))
+
+        if baseline:
+            comparison = compare_reports(report, baseline)
+            report['comparison'] = comparison
+            self.stdout.write(self.style.SUCCESS(f'\nCompared with baseline from {comparison["baseline_created_at"]}'))
+            for name, values in comparison['metrics'].items():
+                self.stdout.write(
+                    f'  {name:<22} {_format(values["current"])} vs {_format(values["baseline"])} '
+                    f'(delta {_format(values["delta"])})'
+                )
+            for regression in comparison['intent_regressions']:
+                self.stdout.write(self.style.WARNING(
+                    f'  Intent regression: {regression["conversation_id"]} turn {regression["turn"]}'
+                ))
+            if comparison['intent_fixes']:
+                self.stdout.write(f'  Intent fixes: {len(comparison["intent_fixes"])} turns')
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, default=str)
+            self.stdout.write(f'\nReport written to {options["output"]}')
@@ -0,0 +1,44 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from sales_agent.exports import EXPORT_DATASETS, EXPORT_FORMATS, parse_updated_since, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Stream prospects, sessions, messages or events as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=EXPORT_DATASETS)
+        parser.add_argument('--format', dest='export_format', choices=EXPORT_FORMATS, default='ndjson')
+        parser.add_argument('--updated-since', help='Only rows changed at or after this ISO 8601 time')
+        parser.add_argument('--output', help='File to write (defaults to stdout)')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched per cursor round trip')
+
+    def handle(self, *args, **options):
+        try:
+            updated_since = parse_updated_since(options['updated_since'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started_at = timezone.now()
+        started = time.perf_counter()
+        lines = stream_export(options['dataset'], options['export_format'], updated_since, options['chunk_size'])
+
+        count = 0
+        output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        try:
+            for line in lines:
+                output.write(line)
+                count += 1
+        finally:
+            if options['output']:
+                output.close()
+
+        if options['export_format'] == 'csv':
+            count -= 1  # header row
+        # Progress goes to stderr so stdout can be piped
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {max(count, 0)} {options["dataset"]} rows in {time.perf_counter() - started:.1f}s; '
+            f'next incremental export: --updated-since {started_at.isoformat()}'
+        ))
@@ -0,0 +1,30 @@
+from datetime import date
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sales_agent import tour_time
+from sales_agent.tour_slots import generate_slots
+
+
+class Command(BaseCommand):
+    help = 'Create bookable tour slots for tour hours on tour days (existing slots are kept)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.TOUR_SLOT_HORIZON_DAYS, help='Calendar days to generate')
+        parser.add_argument('--start', type=date.fromisoformat, help='First date (YYYY-MM-DD, defaults to today)')
+        parser.add_argument('--interval', type=int, default=settings.TOUR_SLOT_MINUTES, help='Minutes between tour starts')
+        parser.add_argument('--capacity', type=int, default=settings.TOUR_SLOT_CAPACITY, help='Parties per slot')
+        parser.add_argument('--community', default=settings.COMMUNITY_SLUG, help='Community slug')
+
+    def handle(self, *args, **options):
+        start_date = options['start'] or tour_time.local_now().date()
+        count = generate_slots(
+            start_date,
+            options['days'],
+            interval_minutes=options['interval'],
+            capacity=options['capacity'],
+            community=options['community'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Tour slots ensured for {options["community"]}: {count} slot times from {start_date} '
+            f'over {options["days"]} days (capacity {options["capacity"]})'
+        ))
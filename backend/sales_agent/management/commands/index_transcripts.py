@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from sales_agent.models import ConversationSession
+from sales_agent.transcripts import backfill_sessions
+
+
+class Command(BaseCommand):
+    help = 'Store and index messages of existing sessions for transcript search (safe to re-run)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Sessions per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        started = time.perf_counter()
+        sessions_done = 0
+        indexed = 0
+
+        batch = []
+        sessions = ConversationSession.objects.only(
+            'session_id', 'conversation_history', 'updated_at'
+        ).order_by('started_at').iterator(chunk_size=batch_size)
+        for session in sessions:
+            batch.append(session)
+            if len(batch) >= batch_size:
+                indexed += backfill_sessions(batch)
+                sessions_done += len(batch)
+                batch = []
+                self.stdout.write(f'  {sessions_done} sessions, {indexed} messages indexed')
+        if batch:
+            indexed += backfill_sessions(batch)
+            sessions_done += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} messages from {sessions_done} sessions in {time.perf_counter() - started:.1f}s'
+        ))
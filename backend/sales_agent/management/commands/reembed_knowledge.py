@@ -0,0 +1,57 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sales_agent.embeddings import activate_version, build_version, collect_garbage, target_version
+from sales_agent.vector_index import ensure_ann_indexes
+
+
+class Command(BaseCommand):
+    help = (
+        'Embed the knowledge base for the configured model and dimensions as a new version while the '
+        'current one keeps serving, then switch to it and delete the old vectors (safe to re-run)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Items per embeddings request')
+        parser.add_argument('--no-switch', action='store_true', help='Build the version without activating it')
+        parser.add_argument(
+            '--gc-grace', type=float, default=None,
+            help='Seconds to wait after the switch before deleting old vectors (default: 2x RAG_KNOWLEDGE_INDEX_TTL)'
+        )
+        parser.add_argument('--no-gc', action='store_true', help='Keep retired versions (e.g. for a quick rollback)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        version = target_version()
+        self.stdout.write(f'Building {version}')
+
+        embedded = build_version(
+            version,
+            batch_size=options['batch_size'],
+            on_batch=lambda done: self.stdout.write(f'  {done} items embedded')
+        )
+        for name in ensure_ann_indexes()['created']:
+            self.stdout.write(f'  Created index {name}')
+        self.stdout.write(f'Embedded {embedded} items in {time.perf_counter() - started:.1f}s')
+
+        if options['no_switch']:
+            return
+
+        for previous in activate_version(version):
+            self.stdout.write(f'  Retired {previous}')
+        self.stdout.write(self.style.SUCCESS(f'Active version: {version}'))
+
+        if options['no_gc']:
+            return
+
+        grace = options['gc_grace']
+        if grace is None:
+            grace = 2 * settings.RAG_KNOWLEDGE_INDEX_TTL
+        if grace > 0:
+            self.stdout.write(f'Waiting {grace:.0f}s for workers to switch before deleting old vectors')
+            time.sleep(grace)
+        result = collect_garbage(grace)
+        self.stdout.write(
+            f'Deleted {result["embeddings"]} embeddings and {len(result["indexes"])} indexes '
+            f'of {len(result["versions"])} retired versions'
+        )
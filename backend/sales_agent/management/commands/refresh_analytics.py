@@ -0,0 +1,29 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sales_agent.analytics import last_refreshed_at, refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily analytics rollups for recent days (run periodically, e.g. every few minutes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ANALYTICS_ROLLUP_LOOKBACK_DAYS, help='Trailing local days to recompute')
+        parser.add_argument('--full', action='store_true', help='Recompute every day (first run or after a backfill)')
+        parser.add_argument(
+            '--initial', action='store_true',
+            help='Recompute every day only if no rollups exist yet, otherwise the trailing days (container boot)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        full = options['full'] or (options['initial'] and last_refreshed_at() is None)
+        result = refresh_rollups(days=options['days'], full=full)
+        if result is None:
+            self.stdout.write(self.style.WARNING('Another process is refreshing the analytics rollups, skipped'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Analytics rollups refreshed since {result["since"]}: {result["events"]} event rows, '
+            f'{result["distributions"]} distribution rows, {result["funnel"]} funnel rows '
+            f'in {time.perf_counter() - started:.2f}s'
+        ))
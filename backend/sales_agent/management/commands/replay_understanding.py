@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+import time
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Exists, OuterRef
+from sales_agent.models import ConversationSession, EnrichmentEvent
+from sales_agent.understanding import replay_sessions
+
+
+def _replay_task(args):
+    session_ids, options = args
+    return replay_sessions(session_ids, **options)
+
+
+def _close_connections():
+    # Each worker opens its own database connection on first query
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild current_understanding and prospect projections by replaying EnrichmentEvent rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (1 runs in-process)')
+        parser.add_argument('--sessions-per-task', type=int, default=1000, help='Sessions handed to a worker at a time')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per server-side cursor round trip')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk write')
+        parser.add_argument('--skip-projections', action='store_true', help='Only rebuild session understanding')
+        parser.add_argument('--dry-run', action='store_true', help='Replay without writing results')
+
+    def session_partitions(self, sessions_per_task):
+        """
+        Yield lists of session ids with events, never splitting one prospect's
+        sessions across lists so each worker can rebuild whole projections
+        """
+        sessions = ConversationSession.objects.filter(
+            Exists(EnrichmentEvent.objects.filter(session=OuterRef('pk')))
+        ).order_by('prospect_id', 'session_id').values_list('prospect_id', 'session_id')
+
+        partition = []
+        previous_prospect = None
+        for prospect_id, session_id in sessions.iterator(chunk_size=10000):
+            if len(partition) >= sessions_per_task and (prospect_id != previous_prospect or prospect_id is None):
+                yield partition
+                partition = []
+            partition.append(session_id)
+            previous_prospect = prospect_id
+        if partition:
+            yield partition
+
+    def handle(self, *args, **options):
+        replay_options = {
+            'chunk_size': options['chunk_size'],
+            'batch_size': options['batch_size'],
+            'projections': not options['skip_projections'],
+            'dry_run': options['dry_run'],
+        }
+        workers = max(1, options['workers'])
+        total_sessions = ConversationSession.objects.filter(
+            Exists(EnrichmentEvent.objects.filter(session=OuterRef('pk')))
+        ).count()
+        self.stdout.write(
+            f'Replaying events for {total_sessions} sessions with {workers} worker(s)'
+            f'{" (dry run)" if options["dry_run"] else ""}'
+        )
+
+        totals = {'sessions': 0, 'events': 0, 'projections': 0}
+        started = time.perf_counter()
+
+        if workers == 1:
+            tasks = (
+                (partition, replay_options)
+                for partition in self.session_partitions(options['sessions_per_task'])
+            )
+            self.report(map(_replay_task, tasks), totals, total_sessions, started)
+        else:
+            # Partitions are read up front in this thread: the pool feeds tasks from
+            # its own handler thread, where a lazy query would open (and leak) a
+            # second connection. Forked workers must not share the parent's
+            # connection either, so it is closed before the fork.
+            tasks = [
+                (partition, replay_options)
+                for partition in self.session_partitions(options['sessions_per_task'])
+            ]
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(workers, initializer=_close_connections) as pool:
+                self.report(pool.imap_unordered(_replay_task, tasks), totals, total_sessions, started)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Replayed {totals["events"]} events into {totals["sessions"]} sessions and '
+            f'{totals["projections"]} projections in {elapsed:.1f}s '
+            f'({totals["events"] / elapsed if elapsed else 0:.0f} events/s)'
+        ))
+
+    def report(self, results, totals, total_sessions, started):
+        for counts in results:
+            for key in totals:
+                totals[key] += counts[key]
+            elapsed = time.perf_counter() - started
+            percent = totals['sessions'] / total_sessions * 100 if total_sessions else 100
+            self.stdout.write(
+                f'  {totals["sessions"]}/{total_sessions} sessions ({percent:.0f}%), '
+                f'{totals["events"]} events, {totals["events"] / elapsed if elapsed else 0:.0f} events/s'
+            )
@@ -1,22 +1,72 @@
 import json
 import os
 from pathlib import Path
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from openai import OpenAI
-from sales_agent.models import CommunityKnowledge
+from sales_agent.embeddings import activate_version, collect_garbage, target_version
+from sales_agent.models import CommunityKnowledge, EmbeddingVersion, KnowledgeEmbedding
+from sales_agent.snapshot import load_snapshot, write_snapshot
+from sales_agent.vector_index import ensure_ann_indexes
 
 
 class Command(BaseCommand):
     help = 'Seed the knowledge base with ACME Senior Living facts and embeddings'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-snapshot', metavar='PATH',
+            help='Load knowledge and embeddings from a snapshot .npy file with COPY instead of calling OpenAI'
+        )
+        parser.add_argument(
+            '--snapshot-out', metavar='PATH',
+            help='Write the active embeddings as a snapshot .npy file (plus .json sidecar) after seeding'
+        )
+        parser.add_argument(
+            '--if-empty', action='store_true',
+            help='Only seed when the knowledge base has no items (seeding replaces all knowledge, including API edits)'
+        )
+
     def handle(self, *args, **options):
+        if options['if_empty'] and CommunityKnowledge.objects.exists():
+            self.stdout.write('Knowledge base already seeded; skipping (--if-empty)')
+            return
+
+        if options['from_snapshot']:
+            self.load_snapshot(options['from_snapshot'])
+        elif not self.seed():
+            return
+
+        if options['snapshot_out']:
+            version = EmbeddingVersion.objects.get(status=EmbeddingVersion.STATUS_ACTIVE)
+            count = write_snapshot(options['snapshot_out'], version)
+            self.stdout.write(self.style.SUCCESS(f'Wrote snapshot of {count} items ({version}) to {options["snapshot_out"]}'))
+
+    def load_snapshot(self, path):
+        self.stdout.write(self.style.SUCCESS(f'Loading knowledge base snapshot from: {path}'))
+        version = load_snapshot(path)
+        if (version.model, version.dimensions) != (settings.RAG_EMBEDDING_MODEL, settings.RAG_EMBEDDING_DIMENSIONS):
+            self.stdout.write(self.style.WARNING(
+                f'Snapshot is {version}, settings ask for {settings.RAG_EMBEDDING_MODEL}/{settings.RAG_EMBEDDING_DIMENSIONS}; '
+                'run reembed_knowledge to migrate'
+            ))
+
+        for name in ensure_ann_indexes()['created']:
+            self.stdout.write(f'  Created index {name}')
+        collect_garbage(grace_seconds=0)
+
+        count = KnowledgeEmbedding.objects.filter(version=version).count()
+        self.stdout.write(self.style.SUCCESS(f'\nSnapshot loaded! {count} knowledge items ({version})'))
+
+    def seed(self) -> bool:
+        """Embed data/acme_knowledge.json with OpenAI; False if it could not run"""
         self.stdout.write(self.style.SUCCESS('Starting knowledge base seeding...'))
 
         # Initialize OpenAI client
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key:
             self.stdout.write(self.style.ERROR('OPENAI_API_KEY not set in environment'))
-            return
+            return False
 
         client = OpenAI(api_key=api_key)
 
@@ -34,23 +84,32 @@ class Command(BaseCommand):
         CommunityKnowledge.objects.all().delete()
         self.stdout.write(f'Deleted {deleted_count} existing knowledge items')
 
+        # Embeddings are stored for the configured model and dimensions
+        version = target_version()
+        self.stdout.write(f'Embedding version: {version}')
+
         # Create embeddings and save
         created_count = 0
         for item in knowledge_items:
             try:
                 # Generate embedding using OpenAI
                 response = client.embeddings.create(
-                    model="text-embedding-3-small",
+                    model=settings.RAG_EMBEDDING_MODEL,
                     input=item['content'],
-                    dimensions=1536
+                    dimensions=settings.RAG_EMBEDDING_DIMENSIONS
                 )
                 embedding = response.data[0].embedding
 
                 # Create knowledge entry
-                CommunityKnowledge.objects.create(
+                knowledge = CommunityKnowledge.objects.create(
                     category=item['category'],
                     content=item['content'],
-                    metadata=item['metadata'],
+                    metadata=item['metadata']
+                )
+                KnowledgeEmbedding.objects.create(
+                    knowledge=knowledge,
+                    version=version,
+                    category=knowledge.category,
                     embedding=embedding
                 )
                 created_count += 1
@@ -61,6 +120,15 @@ class Command(BaseCommand):
                     self.style.ERROR(f'  ✗ Error creating {item["category"]}: {str(e)}')
                 )
 
+        indexes = ensure_ann_indexes()
+        for name in indexes['created']:
+            self.stdout.write(f'  Created index {name}')
+
+        # The old knowledge (and its vectors) is gone, so other versions are retired right away
+        activate_version(version)
+        collect_garbage(grace_seconds=0)
+
         self.stdout.write(
             self.style.SUCCESS(f'\nSeeding complete! Created {created_count}/{len(knowledge_items)} knowledge items')
         )
+        return True
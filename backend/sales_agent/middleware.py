@@ -0,0 +1,24 @@
+"""
+Middleware for the sales agent app
+"""
+from django.conf import settings
+
+from sales_agent.warmup import warm_up
+
+
+class WarmUpMiddleware:
+    """
+    Warms lazily constructed components on the first request a worker serves
+
+    Covers servers without the gunicorn post_worker_init hook (runserver, other
+    WSGI servers) when SALES_AGENT_WARMUP=True is set for them. Once warm-up has
+    run this is a single attribute check.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.SALES_AGENT_WARMUP and not warm_up.done:
+            warm_up.run()
+        return self.get_response(request)
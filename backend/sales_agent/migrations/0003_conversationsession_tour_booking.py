@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales_agent", "0002_communityknowledge_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversationsession",
+            name="tour_booking",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
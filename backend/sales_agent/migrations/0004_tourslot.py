@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:00
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales_agent", "0003_conversationsession_tour_booking"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TourSlot",
+            fields=[
+                (
+                    "slot_id",
+                    models.UUIDField(
+                        default=uuid.uuid4, primary_key=True, serialize=False
+                    ),
+                ),
+                ("community", models.CharField(max_length=50)),
+                ("start", models.DateTimeField()),
+                ("capacity", models.PositiveSmallIntegerField(default=1)),
+                ("booked_count", models.PositiveSmallIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["start"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("booked_count__lt", models.F("capacity"))),
+                        fields=["community", "start"],
+                        name="tourslot_open_idx",
+                    )
+                ],
+                "constraints": [
+                    models.CheckConstraint(
+                        condition=models.Q(("booked_count__lte", models.F("capacity"))),
+                        name="tourslot_not_overbooked",
+                    ),
+                    models.CheckConstraint(
+                        condition=models.Q(("booked_count__gte", 0)),
+                        name="tourslot_booked_count_non_negative",
+                    ),
+                    models.UniqueConstraint(
+                        fields=("community", "start"),
+                        name="tourslot_unique_community_start",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name="prospect",
+            name="tour_slot",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="prospects",
+                to="sales_agent.tourslot",
+            ),
+        ),
+    ]
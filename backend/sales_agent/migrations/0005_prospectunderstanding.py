@@ -0,0 +1,219 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:04
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from itertools import groupby
+from operator import itemgetter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copy of sales_agent.understanding as of this migration, so later
+# changes to the live reducer don't change what this backfill writes
+LIST_FIELDS = ("care_needs", "preferences", "financing_interests")
+SCALAR_FIELDS = ("budget_interest", "timeline", "tour_interest", "tour_scheduled")
+
+
+def apply_event(understanding, event_type, event_data):
+    event_data = event_data or {}
+
+    if event_type == "budget_inquiry":
+        understanding["budget_interest"] = "Inquired about pricing"
+
+    elif event_type == "budget_mentioned":
+        if event_data.get("range"):
+            understanding["budget_interest"] = event_data["range"]
+        elif event_data.get("max"):
+            understanding["budget_interest"] = f"Up to ${event_data['max']}/month"
+
+    elif event_type == "care_need_expressed":
+        care_needs = understanding["care_needs"]
+        if event_data.get("condition"):
+            care_needs.append(event_data["condition"].title())
+        if event_data.get("care_level"):
+            care_needs.append(event_data["care_level"].replace("_", " ").title())
+        understanding["care_needs"] = list(dict.fromkeys(care_needs))
+
+    elif event_type == "timeline_shared":
+        urgency = event_data.get("urgency") or "Exploring options"
+        understanding["timeline"] = urgency.title()
+
+    elif event_type == "preference_stated":
+        category = event_data.get("category") or ""
+        detail = event_data.get("detail") or ""
+        if category:
+            understanding["preferences"].append(
+                f"{category.replace('_', ' ').title()}: {detail}"
+            )
+
+    elif event_type == "tour_requested":
+        understanding["tour_interest"] = "High - wants to visit"
+
+    elif event_type == "tour_scheduled":
+        tour_date = event_data.get("date")
+        tour_time = event_data.get("time")
+        if tour_date and tour_time:
+            understanding["tour_scheduled"] = f"{tour_date} at {tour_time}"
+        elif tour_date or tour_time:
+            understanding["tour_scheduled"] = tour_date or tour_time
+
+    elif event_type == "financing_inquiry":
+        financing_type = event_data.get("financing_type", "Payment options")
+        if financing_type not in understanding["financing_interests"]:
+            understanding["financing_interests"].append(financing_type)
+
+
+def build_projection(ProspectUnderstanding, prospect_id, events):
+    """Projection row for one prospect from its (event_type, event_data, created_at) rows"""
+    understanding = {field: [] for field in LIST_FIELDS}
+    for event_type, event_data, _created_at in events:
+        apply_event(understanding, event_type, event_data)
+
+    projection = ProspectUnderstanding(prospect_id=prospect_id)
+    for field in LIST_FIELDS:
+        max_length = ProspectUnderstanding._meta.get_field(field).base_field.max_length
+        setattr(projection, field, [str(item)[:max_length] for item in understanding[field]])
+    for field in SCALAR_FIELDS:
+        value = understanding.get(field)
+        max_length = ProspectUnderstanding._meta.get_field(field).max_length
+        setattr(projection, field, str(value)[:max_length] if value else None)
+
+    if understanding.get("tour_scheduled"):
+        projection.tour_status = "scheduled"
+    elif understanding.get("tour_interest"):
+        projection.tour_status = "requested"
+    else:
+        projection.tour_status = "none"
+    projection.event_count = len(events)
+    projection.last_event_at = max(
+        (created_at for _event_type, _event_data, created_at in events if created_at),
+        default=None,
+    )
+    return projection
+
+
+def backfill_understanding(apps, schema_editor):
+    """Build the projection of every prospect that already has enrichment events"""
+    EnrichmentEvent = apps.get_model("sales_agent", "EnrichmentEvent")
+    ProspectUnderstanding = apps.get_model("sales_agent", "ProspectUnderstanding")
+
+    rows = (
+        EnrichmentEvent.objects.filter(session__prospect__isnull=False)
+        .order_by("session__prospect_id", "created_at")
+        .values_list("session__prospect_id", "event_type", "event_data", "created_at")
+        .iterator(chunk_size=2000)
+    )
+    projections = []
+    for prospect_id, prospect_rows in groupby(rows, key=itemgetter(0)):
+        events = [row[1:] for row in prospect_rows]
+        projections.append(build_projection(ProspectUnderstanding, prospect_id, events))
+        if len(projections) >= 500:
+            ProspectUnderstanding.objects.bulk_create(projections)
+            projections = []
+    ProspectUnderstanding.objects.bulk_create(projections)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales_agent", "0004_tourslot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProspectUnderstanding",
+            fields=[
+                (
+                    "prospect",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="understanding",
+                        serialize=False,
+                        to="sales_agent.prospect",
+                    ),
+                ),
+                (
+                    "budget_interest",
+                    models.CharField(blank=True, max_length=200, null=True),
+                ),
+                (
+                    "care_needs",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=100),
+                        blank=True,
+                        default=list,
+                        size=None,
+                    ),
+                ),
+                ("timeline", models.CharField(blank=True, max_length=100, null=True)),
+                (
+                    "preferences",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=300),
+                        blank=True,
+                        default=list,
+                        size=None,
+                    ),
+                ),
+                (
+                    "financing_interests",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=100),
+                        blank=True,
+                        default=list,
+                        size=None,
+                    ),
+                ),
+                (
+                    "tour_interest",
+                    models.CharField(blank=True, max_length=100, null=True),
+                ),
+                (
+                    "tour_scheduled",
+                    models.CharField(blank=True, max_length=200, null=True),
+                ),
+                (
+                    "tour_status",
+                    models.CharField(
+                        choices=[
+                            ("none", "None"),
+                            ("requested", "Requested"),
+                            ("scheduled", "Scheduled"),
+                        ],
+                        default="none",
+                        max_length=20,
+                    ),
+                ),
+                ("event_count", models.PositiveIntegerField(default=0)),
+                ("last_event_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["budget_interest"],
+                        name="sales_agent_budget__aaa75e_idx",
+                    ),
+                    models.Index(
+                        fields=["timeline"], name="sales_agent_timelin_2b458b_idx"
+                    ),
+                    models.Index(
+                        fields=["tour_status"], name="sales_agent_tour_st_2b5656_idx"
+                    ),
+                    models.Index(
+                        fields=["-last_event_at"], name="sales_agent_last_ev_2eafb0_idx"
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["care_needs"], name="understanding_care_needs_gin"
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["financing_interests"],
+                        name="understanding_financing_gin",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_understanding, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales_agent", "0005_prospectunderstanding"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyDistributionRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("dimension", models.CharField(max_length=50)),
+                ("value", models.CharField(max_length=200)),
+                ("event_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["day", "dimension", "value"],
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyEventRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("event_type", models.CharField(max_length=50)),
+                ("event_count", models.PositiveIntegerField(default=0)),
+                ("prospect_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["day", "event_type"],
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyFunnelRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("stage", models.CharField(max_length=50)),
+                ("prospect_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["day", "stage"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="enrichmentevent",
+            index=models.Index(
+                fields=["created_at"], name="sales_agent_created_f8cffb_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dailydistributionrollup",
+            index=models.Index(
+                fields=["dimension", "day"], name="sales_agent_dimensi_c5df40_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailydistributionrollup",
+            constraint=models.UniqueConstraint(
+                fields=("day", "dimension", "value"),
+                name="dailydistributionrollup_unique_day_value",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailyeventrollup",
+            constraint=models.UniqueConstraint(
+                fields=("day", "event_type"), name="dailyeventrollup_unique_day_type"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailyfunnelrollup",
+            constraint=models.UniqueConstraint(
+                fields=("day", "stage"), name="dailyfunnelrollup_unique_day_stage"
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:10
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without blocking writes to large tables
+    atomic = False
+
+    dependencies = [
+        ("sales_agent", "0006_analytics_rollups"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="conversationsession",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["current_understanding"],
+                name="session_understanding_gin",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="enrichmentevent",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["event_data"],
+                name="event_data_gin",
+                opclasses=["jsonb_path_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:11
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales_agent", "0007_jsonb_gin_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TranscriptMessage",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("position", models.PositiveIntegerField()),
+                ("role", models.CharField(max_length=20)),
+                ("content", models.TextField()),
+                (
+                    "search_vector",
+                    django.contrib.postgres.search.SearchVectorField(null=True),
+                ),
+                ("created_at", models.DateTimeField()),
+                (
+                    "session",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transcript_messages",
+                        to="sales_agent.conversationsession",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["session", "position"],
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["search_vector"], name="transcript_search_gin"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("session", "position"),
+                        name="transcriptmessage_unique_position",
+                    )
+                ],
+            },
+        ),
+    ]
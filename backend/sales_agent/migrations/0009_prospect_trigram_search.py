@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:12
+
+import re
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def fill_normalized_phone(apps, schema_editor):
+    Prospect = apps.get_model("sales_agent", "Prospect")
+    prospects = Prospect.objects.exclude(phone__isnull=True).exclude(phone="")
+    for prospect in prospects.only("prospect_id", "phone").iterator(chunk_size=1000):
+        digits = re.sub(r"\D", "", prospect.phone)
+        if len(digits) == 11 and digits.startswith("1"):
+            digits = digits[1:]
+        Prospect.objects.filter(pk=prospect.pk).update(normalized_phone=digits or None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales_agent", "0008_transcriptmessage"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="prospect",
+            name="normalized_phone",
+            field=models.CharField(
+                blank=True, editable=False, max_length=20, null=True
+            ),
+        ),
+        migrations.RunPython(fill_normalized_phone, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="prospect",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["first_name"],
+                name="prospect_first_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="prospect",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["last_name"],
+                name="prospect_last_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="prospect",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["email"], name="prospect_email_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="prospect",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["normalized_phone"],
+                name="prospect_phone_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:17
+
+import pgvector.django.vector
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Per-category HNSW indexes are not created here: their size depends on the
+    # configured embedding dimensions and storage, so they are built by
+    # vector_index.ensure_ann_indexes() (seed_knowledge, reembed_knowledge).
+    # The column only loses its fixed vector(1536) size.
+
+    dependencies = [
+        ("sales_agent", "0009_prospect_trigram_search"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="communityknowledge",
+            name="embedding",
+            field=pgvector.django.vector.VectorField(),
+        ),
+    ]
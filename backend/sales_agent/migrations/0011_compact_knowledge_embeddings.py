@@ -0,0 +1,14 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:19
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Folded into 0010: the fixed-size HNSW indexes it used to drop are no longer
+    # built there. Kept so the migration graph (0012 depends on it) is unchanged.
+
+    dependencies = [
+        ("sales_agent", "0010_knowledge_category_hnsw"),
+    ]
+
+    operations = []
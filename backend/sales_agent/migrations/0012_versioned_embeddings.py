@@ -0,0 +1,131 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:21
+
+import django.db.models.deletion
+import pgvector.django.vector
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_embeddings(apps, schema_editor):
+    """Existing embeddings become the first, active version"""
+    CommunityKnowledge = apps.get_model("sales_agent", "CommunityKnowledge")
+    EmbeddingVersion = apps.get_model("sales_agent", "EmbeddingVersion")
+    KnowledgeEmbedding = apps.get_model("sales_agent", "KnowledgeEmbedding")
+
+    first = CommunityKnowledge.objects.values_list("embedding", flat=True).first()
+    if first is None:
+        return
+
+    version = EmbeddingVersion.objects.create(
+        model=settings.RAG_EMBEDDING_MODEL,
+        dimensions=len(first),
+        status="active",
+        activated_at=timezone.now(),
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {KnowledgeEmbedding._meta.db_table} "
+            "(knowledge_id, version_id, category, embedding, created_at, updated_at) "
+            f"SELECT id, %s, category, embedding, now(), now() FROM {CommunityKnowledge._meta.db_table}",
+            [version.id],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales_agent", "0011_compact_knowledge_embeddings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmbeddingVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model", models.CharField(max_length=100)),
+                ("dimensions", models.PositiveIntegerField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("building", "Building"),
+                            ("active", "Active"),
+                            ("retired", "Retired"),
+                        ],
+                        default="building",
+                        max_length=20,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("activated_at", models.DateTimeField(blank=True, null=True)),
+                ("retired_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("model", "dimensions"),
+                        name="embeddingversion_unique_model_dimensions",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("status", "active")),
+                        fields=("status",),
+                        name="embeddingversion_single_active",
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="KnowledgeEmbedding",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("category", models.CharField(max_length=50)),
+                ("embedding", pgvector.django.vector.VectorField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "knowledge",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="embeddings",
+                        to="sales_agent.communityknowledge",
+                    ),
+                ),
+                (
+                    "version",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="embeddings",
+                        to="sales_agent.embeddingversion",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["version", "category"],
+                        name="sales_agent_version_dfa5f4_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("version", "knowledge"),
+                        name="knowledgeembedding_unique_version_item",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(copy_embeddings, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="communityknowledge",
+            name="embedding",
+        ),
+    ]
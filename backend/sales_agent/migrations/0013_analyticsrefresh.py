@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:00
+
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def seed_refresh(apps, schema_editor):
+    # Existing rollups count as refreshed, so workers don't all start with a full recompute
+    DailyFunnelRollup = apps.get_model("sales_agent", "DailyFunnelRollup")
+    AnalyticsRefresh = apps.get_model("sales_agent", "AnalyticsRefresh")
+    latest = DailyFunnelRollup.objects.aggregate(refreshed_at=Max("updated_at"), since=Min("day"))
+    if latest["refreshed_at"] is not None:
+        AnalyticsRefresh.objects.create(pk=1, **latest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sales_agent", "0012_versioned_embeddings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnalyticsRefresh",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("refreshed_at", models.DateTimeField()),
+                ("since", models.DateField()),
+            ],
+        ),
+        migrations.RunPython(seed_refresh, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,23 @@
+import re
 import uuid
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import F, Q
 from pgvector.django import VectorField
 
 
+def normalize_phone(phone):
+    """Digits only, without a leading US country code ("+1 (555) 123-4567" -> "5551234567")"""
+    if not phone:
+        return None
+    digits = re.sub(r"\D", "", phone)
+    if len(digits) == 11 and digits.startswith("1"):
+        digits = digits[1:]
+    return digits or None
+
+
 class Prospect(models.Model):
     """
     Represents a person inquiring about ACME Senior Living
@@ -15,10 +30,18 @@ class Prospect(models.Model):
     last_name = models.CharField(max_length=100, null=True, blank=True)
     email = models.EmailField(null=True, blank=True)
     phone = models.CharField(max_length=20, null=True, blank=True)
+    normalized_phone = models.CharField(max_length=20, null=True, blank=True, editable=False)  # Set in save()
 
     # Tour Details
     tour_scheduled = models.BooleanField(default=False)
     tour_datetime = models.DateTimeField(null=True, blank=True)
+    tour_slot = models.ForeignKey(
+        'TourSlot',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='prospects'
+    )
 
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -28,8 +51,20 @@ class Prospect(models.Model):
         indexes = [
             models.Index(fields=['email']),
             models.Index(fields=['tour_scheduled']),
+            # Fuzzy and substring lookup (pg_trgm), see sales_agent/prospect_search.py
+            GinIndex(fields=['first_name'], opclasses=['gin_trgm_ops'], name='prospect_first_name_trgm'),
+            GinIndex(fields=['last_name'], opclasses=['gin_trgm_ops'], name='prospect_last_name_trgm'),
+            GinIndex(fields=['email'], opclasses=['gin_trgm_ops'], name='prospect_email_trgm'),
+            GinIndex(fields=['normalized_phone'], opclasses=['gin_trgm_ops'], name='prospect_phone_trgm'),
         ]
 
+    def save(self, *args, **kwargs):
+        self.normalized_phone = normalize_phone(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_phone'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         if self.first_name and self.last_name:
             return f"{self.first_name} {self.last_name}"
@@ -76,6 +111,14 @@ class ConversationSession(models.Model):
     #   "tour_interest": "High - requested specific time"
     # }
 
+    # Tour booking state machine (see sales_agent/agents/tour_booking.py)
+    tour_booking = models.JSONField(default=dict, blank=True)
+    # {
+    #   "stage": "awaiting_email",  # awaiting_time|awaiting_name|awaiting_email|awaiting_phone|confirmed
+    #   "tour_at": "2025-03-11T14:00:00-08:00",
+    #   "name": "Eric Smith"
+    # }
+
     # Session metadata
     started_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -83,11 +126,46 @@ class ConversationSession(models.Model):
 
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            # Containment (@>) filters on understanding, see sales_agent/segments.py
+            GinIndex(fields=['current_understanding'], opclasses=['jsonb_path_ops'], name='session_understanding_gin'),
+        ]
 
     def __str__(self):
         return f"Session {self.session_id} - {self.started_at.strftime('%Y-%m-%d %H:%M')}"
 
 
+class TranscriptMessage(models.Model):
+    """
+    One conversation message, stored for full-text search across transcripts
+    Written alongside ConversationSession.conversation_history (see sales_agent/transcripts.py)
+    """
+    id = models.BigAutoField(primary_key=True)
+    session = models.ForeignKey(
+        ConversationSession,
+        on_delete=models.CASCADE,
+        related_name='transcript_messages'
+    )
+    position = models.PositiveIntegerField()  # Index in conversation_history
+    role = models.CharField(max_length=20)  # user|assistant
+    content = models.TextField()
+    search_vector = SearchVectorField(null=True)  # to_tsvector(content), set when the message is written
+
+    created_at = models.DateTimeField()  # Message timestamp
+
+    class Meta:
+        ordering = ['session', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'position'], name='transcriptmessage_unique_position'),
+        ]
+        indexes = [
+            GinIndex(fields=['search_vector'], name='transcript_search_gin'),
+        ]
+
+    def __str__(self):
+        return f"{self.role}: {self.content[:50]}"
+
+
 class EnrichmentEvent(models.Model):
     """
     Captures specific learnings from conversation
@@ -133,12 +211,72 @@ class EnrichmentEvent(models.Model):
         indexes = [
             models.Index(fields=['session', 'created_at']),
             models.Index(fields=['event_type']),
+            models.Index(fields=['created_at']),  # Analytics rollup refresh windows
+            # Containment (@>) filters on event data, see sales_agent/segments.py
+            GinIndex(fields=['event_data'], opclasses=['jsonb_path_ops'], name='event_data_gin'),
         ]
 
     def __str__(self):
         return f"{self.event_type} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
 
+class ProspectUnderstanding(models.Model):
+    """
+    Per-prospect projection of enrichment events into typed, indexed columns
+    Updated incrementally in the same transaction that writes EnrichmentEvent rows
+    (see sales_agent/understanding.py), so admin filters are plain indexed queries
+    """
+    TOUR_STATUS_NONE = 'none'
+    TOUR_STATUS_REQUESTED = 'requested'
+    TOUR_STATUS_SCHEDULED = 'scheduled'
+    TOUR_STATUS_CHOICES = [
+        (TOUR_STATUS_NONE, 'None'),
+        (TOUR_STATUS_REQUESTED, 'Requested'),
+        (TOUR_STATUS_SCHEDULED, 'Scheduled'),
+    ]
+
+    prospect = models.OneToOneField(
+        Prospect,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='understanding'
+    )
+
+    budget_interest = models.CharField(max_length=200, null=True, blank=True)
+    care_needs = ArrayField(models.CharField(max_length=100), default=list, blank=True)
+    timeline = models.CharField(max_length=100, null=True, blank=True)
+    preferences = ArrayField(models.CharField(max_length=300), default=list, blank=True)
+    financing_interests = ArrayField(models.CharField(max_length=100), default=list, blank=True)
+    tour_interest = models.CharField(max_length=100, null=True, blank=True)
+    tour_scheduled = models.CharField(max_length=200, null=True, blank=True)  # e.g. "Tuesday at 2 PM"
+    tour_status = models.CharField(max_length=20, choices=TOUR_STATUS_CHOICES, default=TOUR_STATUS_NONE)
+
+    # Projection bookkeeping
+    event_count = models.PositiveIntegerField(default=0)
+    last_event_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['budget_interest']),
+            models.Index(fields=['timeline']),
+            models.Index(fields=['tour_status']),
+            models.Index(fields=['-last_event_at']),
+            GinIndex(fields=['care_needs'], name='understanding_care_needs_gin'),
+            GinIndex(fields=['financing_interests'], name='understanding_financing_gin'),
+        ]
+
+    def __str__(self):
+        return f"Understanding for {self.prospect}"
+
+
+# Knowledge categories with their own partial vector index (see vector_index.ensure_ann_indexes)
+KNOWLEDGE_CATEGORIES = [
+    "pricing", "amenities", "services", "policies", "activities", "care_types", "room_types",
+    "room_amenities", "financing", "contact", "dietary", "accessibility", "tour",
+]
+
+
 class CommunityKnowledge(models.Model):
     """
     Knowledge base for RAG retrieval
@@ -146,15 +284,14 @@ class CommunityKnowledge(models.Model):
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
 
-    category = models.CharField(max_length=50)
-    # Categories: pricing, amenities, services, policies, activities,
-    #             care_types, room_types, financing, contact, dietary
+    category = models.CharField(max_length=50)  # One of KNOWLEDGE_CATEGORIES
 
     content = models.TextField()  # Human-readable fact
     metadata = models.JSONField()  # Structured data for filtering
-    embedding = VectorField(dimensions=1536)  # pgvector for similarity search
+    # Embeddings are stored per EmbeddingVersion in KnowledgeEmbedding
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Lets in-memory indexes detect content changes
 
     class Meta:
         indexes = [
@@ -163,3 +300,199 @@ class CommunityKnowledge(models.Model):
 
     def __str__(self):
         return f"{self.category}: {self.content[:50]}..."
+
+
+class EmbeddingVersion(models.Model):
+    """
+    One embedding model and size the knowledge base is (being) embedded with
+    Retrieval reads the single active version; a new version is filled in the
+    background while it is building and switched to atomically (see sales_agent/embeddings.py)
+    """
+    STATUS_BUILDING = 'building'
+    STATUS_ACTIVE = 'active'
+    STATUS_RETIRED = 'retired'
+    STATUS_CHOICES = [
+        (STATUS_BUILDING, 'Building'),
+        (STATUS_ACTIVE, 'Active'),
+        (STATUS_RETIRED, 'Retired'),
+    ]
+
+    model = models.CharField(max_length=100)  # e.g. "text-embedding-3-small"
+    dimensions = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_BUILDING)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    activated_at = models.DateTimeField(null=True, blank=True)
+    retired_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'dimensions'], name='embeddingversion_unique_model_dimensions'),
+            models.UniqueConstraint(
+                fields=['status'],
+                condition=Q(status='active'),
+                name='embeddingversion_single_active',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.model} ({self.dimensions}d, {self.status})"
+
+
+class KnowledgeEmbedding(models.Model):
+    """
+    Full-precision embedding of a knowledge item for one EmbeddingVersion
+    category is copied from the item so each (version, category) can have its own
+    partial ANN index (halfvec/binary expression indexes, see vector_index.ensure_ann_indexes)
+    """
+    id = models.BigAutoField(primary_key=True)
+    knowledge = models.ForeignKey(
+        CommunityKnowledge,
+        on_delete=models.CASCADE,
+        related_name='embeddings'
+    )
+    version = models.ForeignKey(
+        EmbeddingVersion,
+        on_delete=models.CASCADE,
+        related_name='embeddings'
+    )
+    category = models.CharField(max_length=50)
+    embedding = VectorField()  # Undimensioned: the size is the version's
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['version', 'knowledge'], name='knowledgeembedding_unique_version_item'),
+        ]
+        indexes = [
+            models.Index(fields=['version', 'category']),
+        ]
+
+    def __str__(self):
+        return f"{self.version} embedding of {self.knowledge_id}"
+
+
+class TourSlot(models.Model):
+    """
+    Bookable tour start time with limited capacity
+    Generated ahead of time (manage.py generate_tour_slots) and booked atomically
+    """
+    slot_id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+
+    community = models.CharField(max_length=50)
+    start = models.DateTimeField()
+    capacity = models.PositiveSmallIntegerField(default=1)
+    booked_count = models.PositiveSmallIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['start']
+        constraints = [
+            # The database refuses overbooking even if two requests race
+            models.CheckConstraint(condition=Q(booked_count__lte=F('capacity')), name='tourslot_not_overbooked'),
+            models.CheckConstraint(condition=Q(booked_count__gte=0), name='tourslot_booked_count_non_negative'),
+            models.UniqueConstraint(fields=['community', 'start'], name='tourslot_unique_community_start'),
+        ]
+        indexes = [
+            # Open-slot range scans: community = ? AND start >= ? ... ORDER BY start
+            models.Index(
+                fields=['community', 'start'],
+                condition=Q(booked_count__lt=F('capacity')),
+                name='tourslot_open_idx'
+            ),
+        ]
+
+    @property
+    def is_open(self):
+        return self.booked_count < self.capacity
+
+    def __str__(self):
+        return f"{self.community} tour at {self.start.isoformat()} ({self.booked_count}/{self.capacity})"
+
+
+class DailyEventRollup(models.Model):
+    """
+    Enrichment events per local day and event type
+    Refreshed by sales_agent/analytics.py (manage.py refresh_analytics)
+    """
+    day = models.DateField()
+    event_type = models.CharField(max_length=50)
+    event_count = models.PositiveIntegerField(default=0)
+    prospect_count = models.PositiveIntegerField(default=0)  # Distinct prospects with this event that day
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['day', 'event_type']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'event_type'], name='dailyeventrollup_unique_day_type'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.event_type}: {self.event_count}"
+
+
+class DailyDistributionRollup(models.Model):
+    """
+    Counts of event_data values per local day, e.g. financing_type = "Medicaid"
+    """
+    day = models.DateField()
+    dimension = models.CharField(max_length=50)  # financing_type, care_need, care_level
+    value = models.CharField(max_length=200)
+    event_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['day', 'dimension', 'value']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'dimension', 'value'],
+                name='dailydistributionrollup_unique_day_value'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.dimension}={self.value}: {self.event_count}"
+
+
+class DailyFunnelRollup(models.Model):
+    """
+    Prospects reaching each funnel stage for the first time, per local day
+    Stages: prospects (created), budget_inquiry, tour_requested, tour_scheduled
+    """
+    day = models.DateField()
+    stage = models.CharField(max_length=50)
+    prospect_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['day', 'stage']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'stage'], name='dailyfunnelrollup_unique_day_stage'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.stage}: {self.prospect_count}"
+
+
+class AnalyticsRefresh(models.Model):
+    """
+    Single row recording when the analytics rollups were last refreshed
+    Written by every refresh, even one whose window produced no rollup rows
+    """
+    SINGLETON_ID = 1
+
+    refreshed_at = models.DateTimeField()
+    since = models.DateField()  # First local day recomputed by that refresh
+
+    def __str__(self):
+        return f"Rollups refreshed {self.refreshed_at} (since {self.since})"
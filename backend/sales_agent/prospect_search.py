@@ -0,0 +1,88 @@
+"""
+Typeahead prospect lookup by name, email and phone
+
+Matching uses pg_trgm through the gin_trgm_ops indexes on Prospect: each word
+of the query must fuzzily match (word similarity, the %> operator) the first
+name, last name or email, and digit runs match the normalized phone by
+substring (LIKE, also served by the trigram index). Results are ordered by
+summed similarity and capped, so the browser never receives the full list.
+"""
+import re
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import FloatField, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from sales_agent.models import Prospect, normalize_phone
+
+
+PHONE_QUERY_PATTERN = re.compile(r"^[\d\s().+-]+$")
+MAX_QUERY_WORDS = 4
+MIN_PHONE_DIGITS = 3
+TEXT_FIELDS = ("first_name", "last_name", "email")
+
+
+def search_prospects(query: str, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Best matching prospects for a partial name, email or phone
+
+    Args:
+        query: e.g. "eric sm", "eric@exa", "555-12"
+        limit: Maximum results (defaults to settings.PROSPECT_SEARCH_LIMIT)
+
+    Returns:
+        Prospect summaries with a match score, best first
+    """
+    limit = min(limit or settings.PROSPECT_SEARCH_LIMIT, settings.PROSPECT_SEARCH_MAX_LIMIT)
+    query = query.strip()
+
+    if PHONE_QUERY_PATTERN.match(query):
+        # "(555) 123-45" is one phone fragment, not several words
+        terms = [query]
+    else:
+        terms = query.split()[:MAX_QUERY_WORDS]
+
+    prospects = Prospect.objects.all()
+    scores = []
+    for term in terms:
+        digits = normalize_phone(term) if PHONE_QUERY_PATTERN.match(term) else None
+        if digits and len(digits) >= MIN_PHONE_DIGITS:
+            prospects = prospects.filter(normalized_phone__contains=digits)
+            scores.append(Value(1.0))
+            continue
+
+        matches = Q()
+        for field in TEXT_FIELDS:
+            matches |= Q(**{f"{field}__trigram_word_similar": term})
+        prospects = prospects.filter(matches)
+        scores.append(Coalesce(
+            Greatest(*(TrigramWordSimilarity(term, field) for field in TEXT_FIELDS)),
+            Value(0.0),
+            output_field=FloatField()
+        ))
+
+    if not scores:
+        return []
+
+    score = scores[0]
+    for term_score in scores[1:]:
+        score = score + term_score
+
+    rows = prospects.annotate(score=score).order_by('-score', '-updated_at').values(
+        'prospect_id', 'first_name', 'last_name', 'email', 'phone', 'tour_scheduled', 'score'
+    )[:limit]
+
+    return [
+        {
+            "prospect_id": str(row['prospect_id']),
+            "first_name": row['first_name'],
+            "last_name": row['last_name'],
+            "email": row['email'],
+            "phone": row['phone'],
+            "tour_scheduled": row['tour_scheduled'],
+            "score": round(row['score'] / len(scores), 3),
+        }
+        for row in rows
+    ]
@@ -2,47 +2,158 @@
 RAG (Retrieval-Augmented Generation) utilities for knowledge base queries
 """
 import os
+import threading
 from typing import List, Dict, Optional
-from openai import OpenAI
-from sales_agent.models import CommunityKnowledge
-from pgvector.django import L2Distance
+from django.conf import settings
+from sales_agent.cassette import get_cassette
+from sales_agent.models import CommunityKnowledge, EmbeddingVersion
+from sales_agent.knowledge_index import get_knowledge_index, tokenize
+from sales_agent.llm_governor import estimate_tokens, get_governor
+from sales_agent.vector_index import get_category_vectors, partitioned_search
+
+
+# Search modes
+SEARCH_MODE_VECTOR = "vector"  # pgvector L2 distance only
+SEARCH_MODE_HYBRID = "hybrid"  # BM25 + vector, merged with reciprocal rank fusion
+SEARCH_MODE_LEXICAL = "lexical"  # BM25 only, no embedding call (used in degraded mode)
+SEARCH_MODES = (SEARCH_MODE_VECTOR, SEARCH_MODE_HYBRID, SEARCH_MODE_LEXICAL)
+
+
+def _model_and_dimensions(version: Optional[EmbeddingVersion]):
+    if version is None:
+        return settings.RAG_EMBEDDING_MODEL, settings.RAG_EMBEDDING_DIMENSIONS
+    return version.model, version.dimensions
 
 
 class KnowledgeRetriever:
     """
     Retrieves relevant knowledge from the community knowledge base
-    using semantic search with pgvector
+    using semantic search with pgvector (partitioned by category, see vector_index.py)
     """
 
     def __init__(self):
-        """Initialize OpenAI client for embeddings"""
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError('OPENAI_API_KEY not set in environment')
-        self.client = OpenAI(api_key=api_key)
+        """Defer OpenAI client creation until the first embedding is needed"""
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """
+        OpenAI client for embeddings, created on first use
 
-    def generate_embedding(self, text: str) -> List[float]:
+        Raises:
+            ValueError: If OPENAI_API_KEY is not set
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
+
+                    api_key = os.getenv('OPENAI_API_KEY')
+                    if not api_key:
+                        raise ValueError('OPENAI_API_KEY not set in environment')
+                    # Retries are owned by the outbound governor
+                    self._client = OpenAI(api_key=api_key, max_retries=0)
+        return self._client
+
+    def _embed(
+        self,
+        texts,
+        estimated_tokens: int,
+        model: str,
+        dimensions: int,
+        deadline: Optional[float] = None
+    ) -> List[List[float]]:
+        """Embed one text or a batch in one request (recorded by the cassette)"""
+        request = {"model": model, "input": texts, "dimensions": dimensions}
+
+        def create() -> List[List[float]]:
+            response = get_governor().call(
+                lambda: self.client.embeddings.create(**request),
+                estimated_tokens=estimated_tokens,
+                operation="embedding",
+                deadline=deadline
+            )
+            return [item.embedding for item in response.data]
+
+        cassette = get_cassette()
+        if cassette is None:
+            return create()
+        return cassette.fetch("embeddings", request, create, model=model)
+
+    def generate_embedding(
+        self,
+        text: str,
+        version: Optional[EmbeddingVersion] = None,
+        deadline: Optional[float] = None
+    ) -> List[float]:
         """
         Generate embedding for a text query using OpenAI
 
         Args:
             text: Query text to embed
+            version: Embedding version to match (defaults to the active one, or
+                settings.RAG_EMBEDDING_MODEL/DIMENSIONS before any is active)
+            deadline: Optional wall-clock time (time.time()) after which the
+                embeddings call is not retried
 
         Returns:
             List of floats representing the embedding vector
         """
-        response = self.client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text,
-            dimensions=1536
-        )
-        return response.data[0].embedding
+        version = version or get_category_vectors().version
+        model, dimensions = _model_and_dimensions(version)
+        return self._embed(text, estimate_tokens(text), model, dimensions, deadline=deadline)[0]
+
+    def generate_embeddings(self, texts: List[str], version: Optional[EmbeddingVersion] = None) -> List[List[float]]:
+        """
+        Generate embeddings for a batch of texts in one request
+
+        Args:
+            texts: Texts to embed
+            version: Embedding version to embed for (defaults as in generate_embedding)
+
+        Returns:
+            Embedding vectors in input order
+        """
+        version = version or get_category_vectors().version
+        model, dimensions = _model_and_dimensions(version)
+        return self._embed(texts, sum(estimate_tokens(text) for text in texts), model, dimensions)
 
     def search(
         self,
         query: str,
         category_filter: Optional[List[str]] = None,
-        top_k: int = 5
+        top_k: int = 5,
+        mode: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Search the knowledge base
+
+        Args:
+            query: Natural language query
+            category_filter: Optional list of categories to filter by
+            top_k: Number of results to return
+            mode: "vector", "hybrid" or "lexical" (defaults to settings.RAG_SEARCH_MODE)
+            deadline: Optional wall-clock time (time.time()) after which the
+                embeddings call is not retried
+
+        Returns:
+            List of dictionaries containing matched knowledge items with similarity scores
+        """
+        mode = mode or settings.RAG_SEARCH_MODE
+        if mode == SEARCH_MODE_HYBRID:
+            return self.hybrid_search(query, category_filter=category_filter, top_k=top_k, deadline=deadline)
+        if mode == SEARCH_MODE_LEXICAL:
+            return self.lexical_search(query, category_filter=category_filter, top_k=top_k)
+        return self.vector_search(query, category_filter=category_filter, top_k=top_k, deadline=deadline)
+
+    def vector_search(
+        self,
+        query: str,
+        category_filter: Optional[List[str]] = None,
+        top_k: int = 5,
+        deadline: Optional[float] = None
     ) -> List[Dict]:
         """
         Search the knowledge base using semantic similarity
@@ -51,43 +162,120 @@ class KnowledgeRetriever:
             query: Natural language query
             category_filter: Optional list of categories to filter by
             top_k: Number of results to return
+            deadline: Optional wall-clock time (time.time()) after which the
+                embeddings call is not retried
 
         Returns:
             List of dictionaries containing matched knowledge items with similarity scores
         """
-        # Generate embedding for query
-        query_embedding = self.generate_embedding(query)
+        # Query and stored embeddings come from the same (active) version
+        vectors = get_category_vectors()
+        query_embedding = self.generate_embedding(query, version=vectors.version, deadline=deadline)
 
-        # Build query
-        queryset = CommunityKnowledge.objects.all()
+        # Each category is searched on its own (exact in memory or via its partial
+        # HNSW index) so filtered searches still return complete results
+        results = partitioned_search(query_embedding, vectors, category_filter=category_filter, top_k=top_k)
 
-        # Apply category filter if provided
-        if category_filter:
-            queryset = queryset.filter(category__in=category_filter)
+        # Similarity score for display: lower L2 distance = higher similarity
+        # Note: This is a rough approximation, actual similarity can vary
+        return [
+            {**item, 'similarity_score': 1.0 / (1.0 + distance)}
+            for item, distance in results
+        ]
 
-        # Annotate with distance and order by similarity using pgvector L2 distance
-        # Note: Lower L2 distance = higher similarity
-        results = queryset.annotate(
-            distance=L2Distance('embedding', query_embedding)
-        ).order_by('distance')[:top_k]
+    def lexical_search(
+        self,
+        query: str,
+        category_filter: Optional[List[str]] = None,
+        top_k: int = 5
+    ) -> List[Dict]:
+        """
+        Search the in-memory BM25 index only, without calling the embeddings API
 
-        # Format results
-        formatted_results = []
-        for item in results:
-            # Calculate similarity score (convert L2 distance to similarity)
-            # For display purposes, we'll use a simple transformation
-            # Note: This is a rough approximation, actual similarity can vary
-            similarity_score = 1.0 / (1.0 + item.distance)  # Use annotated distance value
+        When no term matches a category-filtered query, the first items of those
+        categories are returned so callers still get the relevant facts.
 
-            formatted_results.append({
-                'id': str(item.id),
-                'category': item.category,
-                'content': item.content,
-                'metadata': item.metadata,
-                'similarity_score': similarity_score,
-            })
+        Args:
+            query: Natural language query
+            category_filter: Optional list of categories to filter by
+            top_k: Number of results to return
+
+        Returns:
+            List of dictionaries containing matched knowledge items with BM25 scores
+        """
+        index = get_knowledge_index()
+        results = index.search(query, category_filter=category_filter, top_k=top_k)
+        if not results and category_filter:
+            results = [(item, 0.0) for item in index.items if item['category'] in category_filter][:top_k]
+        return [
+            {**item, 'similarity_score': score, 'retrieval': 'lexical'}
+            for item, score in results
+        ]
+
+    def hybrid_search(
+        self,
+        query: str,
+        category_filter: Optional[List[str]] = None,
+        top_k: int = 5,
+        deadline: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Search with BM25 and vector rankings merged by reciprocal rank fusion
+
+        Short exact-term queries whose terms all appear in the best lexical
+        match are answered from the in-memory index without an embedding call.
+
+        Args:
+            query: Natural language query
+            category_filter: Optional list of categories to filter by
+            top_k: Number of results to return
+            deadline: Optional wall-clock time (time.time()) after which the
+                embeddings call is not retried
+
+        Returns:
+            List of dictionaries containing matched knowledge items with fused scores
+        """
+        index = get_knowledge_index()
+        candidate_count = max(top_k, settings.RAG_HYBRID_CANDIDATES)
+        lexical_results = index.search(query, category_filter=category_filter, top_k=candidate_count)
+
+        # Exact-term shortcut: keyword queries fully covered by the top lexical hit
+        if (
+            lexical_results
+            and len(tokenize(query)) <= settings.RAG_LEXICAL_MAX_TERMS
+            and index.covers_query(query, lexical_results[0][0])
+        ):
+            return [
+                {**item, 'similarity_score': score, 'retrieval': 'lexical'}
+                for item, score in lexical_results[:top_k]
+            ]
+
+        vector_results = self.vector_search(query, category_filter=category_filter, top_k=candidate_count, deadline=deadline)
+
+        # Reciprocal rank fusion: score = sum(1 / (k + rank)) over both rankings
+        fused_scores: Dict[str, float] = {}
+        items_by_id: Dict[str, Dict] = {}
+        rankings = [
+            [item for item, _score in lexical_results],
+            vector_results,
+        ]
+        for ranking in rankings:
+            for rank, item in enumerate(ranking, start=1):
+                fused_scores[item['id']] = fused_scores.get(item['id'], 0.0) + 1.0 / (settings.RAG_RRF_K + rank)
+                items_by_id.setdefault(item['id'], item)
 
-        return formatted_results
+        ranked_ids = sorted(fused_scores, key=fused_scores.get, reverse=True)[:top_k]
+        return [
+            {
+                'id': item_id,
+                'category': items_by_id[item_id]['category'],
+                'content': items_by_id[item_id]['content'],
+                'metadata': items_by_id[item_id]['metadata'],
+                'similarity_score': fused_scores[item_id],
+                'retrieval': 'hybrid',
+            }
+            for item_id in ranked_ids
+        ]
 
     def search_by_category(
         self,
@@ -130,5 +318,5 @@ class KnowledgeRetriever:
         ]
 
 
-# Singleton instance for easy import
+# Singleton instance for easy import (cheap: the OpenAI client is created on first use)
 retriever = KnowledgeRetriever()
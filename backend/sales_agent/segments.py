@@ -0,0 +1,112 @@
+"""
+Prospect segment filters for the admin prospect list
+
+Filters are translated into indexed lookups: equality and array containment on
+the ProspectUnderstanding projection, and jsonb containment (@>) on
+ConversationSession.current_understanding and EnrichmentEvent.event_data, which
+the jsonb_path_ops GIN indexes serve. JSON filters are EXISTS subqueries, so a
+prospect matches once however many sessions or events match.
+
+Query parameters (all optional, combined with AND):
+    care_need, financing: Projection array contains the value, e.g. "Dementia"
+    tour_status, timeline, budget_interest: Projection column equals the value
+    understanding: JSON object a session's understanding contains,
+        e.g. {"care_needs": ["Dementia"]}
+    understanding.<key>: Shorthand for one key; list-valued keys (care_needs,
+        preferences, financing_interests) match one element
+    event_type: A matching event must have this type (applies to event_data filters,
+        or on its own: the prospect has an event of this type)
+    event_data: JSON object one event's data contains, e.g. {"financing_type": "Medicaid"}
+    event_data.<key>: Shorthand for one key; each is matched by its own event
+
+Containment is case-sensitive: understanding values are title-cased by the
+reducer ("Dementia"), event data is as extracted ("dementia").
+"""
+import json
+
+from django.db.models import Exists, OuterRef, QuerySet
+
+from sales_agent.models import ConversationSession, EnrichmentEvent
+from sales_agent.understanding import LIST_FIELDS
+
+
+PROJECTION_CONTAINS = {
+    "care_need": "understanding__care_needs__contains",
+    "financing": "understanding__financing_interests__contains",
+}
+PROJECTION_EQUALS = {
+    "tour_status": "understanding__tour_status",
+    "timeline": "understanding__timeline",
+    "budget_interest": "understanding__budget_interest",
+}
+
+
+def _json_object(name: str, value: str) -> dict:
+    try:
+        parsed = json.loads(value)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{name} must be a JSON object: {e}")
+    if not isinstance(parsed, dict):
+        raise ValueError(f"{name} must be a JSON object")
+    return parsed
+
+
+def _session_contains(document: dict) -> Exists:
+    return Exists(ConversationSession.objects.filter(
+        prospect=OuterRef('pk'),
+        current_understanding__contains=document,
+    ))
+
+
+def _event_matches(event_type, document=None) -> Exists:
+    events = EnrichmentEvent.objects.filter(session__prospect=OuterRef('pk'))
+    if event_type:
+        events = events.filter(event_type=event_type)
+    if document:
+        events = events.filter(event_data__contains=document)
+    return Exists(events)
+
+
+def apply_segment_filters(prospects: QuerySet, params) -> QuerySet:
+    """
+    Narrow a Prospect queryset by segment query parameters (see module docstring)
+
+    Args:
+        prospects: Prospect queryset
+        params: Request query parameters (QueryDict or dict)
+
+    Returns:
+        Filtered queryset
+
+    Raises:
+        ValueError: If a JSON parameter is malformed
+    """
+    for name, lookup in PROJECTION_CONTAINS.items():
+        if params.get(name):
+            prospects = prospects.filter(**{lookup: [params[name]]})
+    for name, lookup in PROJECTION_EQUALS.items():
+        if params.get(name):
+            prospects = prospects.filter(**{lookup: params[name]})
+
+    if params.get('understanding'):
+        prospects = prospects.filter(_session_contains(_json_object('understanding', params['understanding'])))
+
+    event_type = params.get('event_type')
+    event_filters = []
+    if params.get('event_data'):
+        event_filters.append(_json_object('event_data', params['event_data']))
+
+    for name in params.keys():
+        if name.startswith('understanding.'):
+            key = name.split('.', 1)[1]
+            value = params[name]
+            prospects = prospects.filter(_session_contains({key: [value] if key in LIST_FIELDS else value}))
+        elif name.startswith('event_data.'):
+            event_filters.append({name.split('.', 1)[1]: params[name]})
+
+    for document in event_filters:
+        prospects = prospects.filter(_event_matches(event_type, document))
+    if event_type and not event_filters:
+        prospects = prospects.filter(_event_matches(event_type))
+
+    return prospects
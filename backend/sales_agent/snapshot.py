@@ -0,0 +1,284 @@
+"""
+Portable knowledge base embedding snapshots
+
+A snapshot is a contiguous float32 .npy matrix (one row per knowledge item,
+grouped by category) plus a JSON sidecar next to it (same name, .json) with
+the embedding model and dimensions and each row's item: id, category,
+content, metadata and a content hash.
+
+- `manage.py seed_knowledge --snapshot-out data/knowledge.npy` writes one at
+  build time from the active embedding version. Each write creates a new
+  `knowledge-<timestamp>.npy`/`.json` pair and then atomically repoints the
+  `knowledge.npy` symlink at it, so readers never pair a matrix with another
+  write's sidecar
+- `manage.py seed_knowledge --from-snapshot data/knowledge.npy` loads one with
+  COPY and no network access
+- with settings.RAG_EMBEDDING_SNAPSHOT set, workers memory-map the .npy file
+  read-only and the in-memory category matrices are slices of it, so all
+  workers on a host share one physical copy of the pages. Items added or
+  edited after the snapshot (content hash mismatch) are read from the database,
+  and a snapshot that cannot be opened is ignored in favour of the database.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from sales_agent.knowledge_events import notify_knowledge_changed
+from sales_agent.knowledge_index import invalidate_knowledge_caches
+from sales_agent.models import CommunityKnowledge, EmbeddingVersion, KnowledgeEmbedding
+
+
+SNAPSHOT_FORMAT_VERSION = 1
+COPY_CHUNK_ROWS = 5000
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def sidecar_path(path) -> Path:
+    """Metadata file that accompanies a snapshot .npy file"""
+    return Path(path).with_suffix(".json")
+
+
+class EmbeddingSnapshot:
+    """
+    A read-only, memory-mapped snapshot
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: The .npy file, or a symlink to one (resolved once, so the
+                matrix and sidecar always come from the same write)
+
+        Raises:
+            ValueError: If the .npy file does not match its sidecar
+        """
+        self.path = Path(path).resolve()
+        with open(sidecar_path(self.path)) as f:
+            self.metadata = json.load(f)
+        self.model = self.metadata["model"]
+        self.dimensions = self.metadata["dimensions"]
+        self.items: List[Dict] = self.metadata["items"]
+
+        self.vectors = np.load(self.path, mmap_mode="r")
+        if self.vectors.dtype != np.float32 or self.vectors.shape != (len(self.items), self.dimensions):
+            raise ValueError(
+                f"{self.path} holds {self.vectors.dtype} {self.vectors.shape}, "
+                f"sidecar describes float32 ({len(self.items)}, {self.dimensions})"
+            )
+        self.positions = {item["id"]: row for row, item in enumerate(self.items)}
+
+    def matches(self, version: EmbeddingVersion) -> bool:
+        """Whether the snapshot was embedded like the version"""
+        return self.model == version.model and self.dimensions == version.dimensions
+
+    def position(self, item: Dict) -> Optional[int]:
+        """Snapshot row for a knowledge item, or None if missing or its content changed since"""
+        row = self.positions.get(item["id"])
+        if row is None or self.items[row]["content_sha1"] != content_hash(item["content"]):
+            return None
+        return row
+
+    def category_matrix(self, items: List[Dict], fetch_embeddings: Callable[[List[str]], Dict[str, list]]) -> np.ndarray:
+        """
+        Embedding matrix for one category's items
+
+        When every item is in the snapshot at consecutive rows (the normal case)
+        this is a slice of the memory map, shared with other processes, and
+        items is reordered to match it. Otherwise an owned copy is built, with
+        rows for new or edited items fetched from the database.
+
+        Args:
+            items: The category's knowledge items (reordered in place)
+            fetch_embeddings: Loads {item id: embedding} for ids not usable from the snapshot
+        """
+        positions = [self.position(item) for item in items]
+        if all(row is not None for row in positions):
+            order = sorted(range(len(items)), key=positions.__getitem__)
+            items[:] = [items[i] for i in order]
+            rows = [positions[i] for i in order]
+            if rows == list(range(rows[0], rows[0] + len(rows))):
+                return self.vectors[rows[0]:rows[0] + len(rows)]
+            return np.asarray(self.vectors[rows])
+
+        fetched = fetch_embeddings([item["id"] for item, row in zip(items, positions) if row is None])
+        return np.vstack([
+            self.vectors[row] if row is not None else np.asarray(fetched[item["id"]], dtype=np.float32)
+            for item, row in zip(items, positions)
+        ])
+
+
+_snapshot: Optional[EmbeddingSnapshot] = None
+_snapshot_key = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot(version: Optional[EmbeddingVersion]) -> Optional[EmbeddingSnapshot]:
+    """
+    The configured snapshot if it matches the version (reopened when the file is replaced)
+
+    Returns:
+        None when no snapshot is configured, the file is missing, unreadable or was embedded differently
+    """
+    global _snapshot, _snapshot_key
+    path = settings.RAG_EMBEDDING_SNAPSHOT
+    if not path or version is None or not os.path.exists(path):
+        return None
+
+    target = os.path.realpath(path)
+    key = (target, os.stat(target).st_mtime_ns)
+    with _snapshot_lock:
+        if _snapshot_key != key:
+            try:
+                _snapshot = EmbeddingSnapshot(target)
+            except (OSError, ValueError, KeyError) as e:
+                # Retried on the next call; until then retrieval reads the database
+                print(f"Ignoring embedding snapshot {path}: {e}", file=sys.stderr)
+                return None
+            _snapshot_key = key
+        snapshot = _snapshot
+    return snapshot if snapshot.matches(version) else None
+
+
+def write_snapshot(path, version: EmbeddingVersion, chunk_size: int = 2000) -> int:
+    """
+    Write a version's embeddings as a snapshot (rows streamed into the .npy file)
+
+    The matrix and sidecar go to a new timestamped pair next to `path`, which
+    is then atomically replaced by a symlink to it. The pair before it is
+    kept for readers still opening it; older ones are removed.
+
+    Returns:
+        Number of items written
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    embeddings = KnowledgeEmbedding.objects.filter(version=version)
+    count = embeddings.count()
+
+    target = path.with_name(f"{path.stem}-{timezone.now():%Y%m%d%H%M%S%f}.npy")
+    vectors = np.lib.format.open_memmap(target, mode="w+", dtype=np.float32, shape=(count, version.dimensions))
+    items = []
+    rows = embeddings.order_by('category', 'knowledge_id').values_list(
+        'knowledge_id', 'category', 'knowledge__content', 'knowledge__metadata', 'embedding'
+    )
+    for row, (item_id, category, content, metadata, embedding) in enumerate(rows.iterator(chunk_size=chunk_size)):
+        vectors[row] = embedding
+        items.append({
+            "id": str(item_id),
+            "category": category,
+            "content": content,
+            "metadata": metadata,
+            "content_sha1": content_hash(content),
+        })
+    vectors.flush()
+    del vectors
+
+    sidecar = {
+        "format": SNAPSHOT_FORMAT_VERSION,
+        "model": version.model,
+        "dimensions": version.dimensions,
+        "count": len(items),
+        "created_at": timezone.now().isoformat(),
+        "items": items,
+    }
+    with open(sidecar_path(target), "w") as f:
+        json.dump(sidecar, f)
+
+    previous = Path(os.path.realpath(path)) if path.is_symlink() else None
+    tmp_link = path.with_name(path.name + ".tmp")
+    tmp_link.unlink(missing_ok=True)
+    tmp_link.symlink_to(target.name)
+    os.replace(tmp_link, path)
+    sidecar_path(path).unlink(missing_ok=True)  # Left over from a pre-symlink snapshot
+
+    for old in path.parent.glob(f"{path.stem}-*.npy"):
+        if old not in (target, previous):
+            old.unlink(missing_ok=True)
+            sidecar_path(old).unlink(missing_ok=True)
+    return len(items)
+
+
+def _copy_rows(cursor, table: str, columns: Iterable[str], rows: Iterable[list]):
+    """COPY rows into a table in chunks of CSV"""
+    statement = f'COPY "{table}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)'
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= COPY_CHUNK_ROWS:
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            pending = 0
+    if pending:
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+
+
+def load_snapshot(path) -> EmbeddingVersion:
+    """
+    Replace the knowledge base with a snapshot using COPY (no embeddings API calls)
+
+    The snapshot's (model, dimensions) version becomes the active one. Build
+    the ANN indexes and collect old versions afterwards, outside a transaction.
+
+    Returns:
+        The activated version
+    """
+    from sales_agent.embeddings import activate_version
+
+    snapshot = EmbeddingSnapshot(path)
+    now = timezone.now()
+
+    with transaction.atomic():
+        CommunityKnowledge.objects.all().delete()
+        version, _created = EmbeddingVersion.objects.get_or_create(
+            model=snapshot.model,
+            dimensions=snapshot.dimensions,
+        )
+        if version.status == EmbeddingVersion.STATUS_RETIRED:
+            version.status = EmbeddingVersion.STATUS_BUILDING
+            version.retired_at = None
+            version.save(update_fields=['status', 'retired_at'])
+
+        with connection.cursor() as cursor:
+            _copy_rows(
+                cursor,
+                CommunityKnowledge._meta.db_table,
+                ["id", "category", "content", "metadata", "created_at", "updated_at"],
+                (
+                    [item["id"], item["category"], item["content"], json.dumps(item["metadata"]), now, now]
+                    for item in snapshot.items
+                )
+            )
+            _copy_rows(
+                cursor,
+                KnowledgeEmbedding._meta.db_table,
+                ["knowledge_id", "version_id", "category", "embedding", "created_at", "updated_at"],
+                (
+                    [item["id"], version.id, item["category"], "[" + ",".join(map(str, vector.tolist())) + "]", now, now]
+                    for item, vector in zip(snapshot.items, snapshot.vectors)
+                )
+            )
+
+        activate_version(version)
+        notify_knowledge_changed("loaded", [])
+    invalidate_knowledge_caches()
+    return version
@@ -0,0 +1,151 @@
+"""
+Precomputed knowledge contexts for agents whose retrieval does not depend on the user message
+
+Some agents always search the same constant string (the tour agent asks for
+"tour availability hours") and some categories are small enough to include
+whole (financing, pricing). These are resolved once per worker into
+ready-to-use knowledge_context strings and rebuilt when the knowledge base changes.
+
+Category contexts come from the database only and are cached apart from the
+query contexts, which need the embeddings API: an embeddings outage does not
+affect them. A failed query build is not retried for the provider's
+retry_after (at least QUERY_RETRY_SECONDS), so turns fail fast instead of
+queueing behind the cache lock.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from sales_agent.knowledge_index import KnowledgeCache
+from sales_agent.llm_governor import ProviderUnavailable
+from sales_agent.models import CommunityKnowledge
+from sales_agent.rag import retriever
+
+
+# Fixed queries resolved once instead of on every turn
+STATIC_QUERIES = {
+    "tour_availability": {"query": "tour availability hours", "category_filter": ["tour"], "top_k": 1},
+}
+
+# Categories included whole when they have at most RAG_STATIC_CATEGORY_MAX_ITEMS items
+STATIC_CATEGORIES = ["pricing", "financing"]
+
+# Minimum seconds before a failed query context build is tried again
+QUERY_RETRY_SECONDS = 5.0
+
+
+@dataclass(frozen=True)
+class StaticContext:
+    """Retrieved knowledge items and their prompt-ready formatting"""
+    rag_context: List[Dict]
+    knowledge_context: str
+
+
+def format_knowledge_context(rag_results: List[Dict]) -> str:
+    """Format retrieved knowledge items as a bulleted list for prompts"""
+    return "\n".join([f"- {item['content']}" for item in rag_results])
+
+
+def build_query_contexts(deadline: Optional[float] = None) -> Dict[str, StaticContext]:
+    """
+    Resolve every static query (one embeddings call each)
+
+    Args:
+        deadline: Wall-clock time after which embeddings calls are not retried
+
+    Returns:
+        Dictionary keyed by STATIC_QUERIES name
+
+    Raises:
+        ProviderUnavailable: If the embeddings API is unavailable
+    """
+    contexts = {}
+    for name, params in STATIC_QUERIES.items():
+        rag_results = retriever.search(
+            params["query"],
+            category_filter=params["category_filter"],
+            top_k=params["top_k"],
+            deadline=deadline
+        )
+        contexts[name] = StaticContext(rag_results, format_knowledge_context(rag_results))
+    return contexts
+
+
+def build_category_contexts() -> Dict[str, StaticContext]:
+    """
+    Load every small category whole (database only)
+
+    Returns:
+        Dictionary keyed by category; categories over RAG_STATIC_CATEGORY_MAX_ITEMS are left out
+    """
+    contexts = {}
+    for category in STATIC_CATEGORIES:
+        items = list(
+            CommunityKnowledge.objects.filter(category=category)
+            .order_by('created_at')[:settings.RAG_STATIC_CATEGORY_MAX_ITEMS + 1]
+        )
+        if len(items) > settings.RAG_STATIC_CATEGORY_MAX_ITEMS:
+            # Too large to include whole, agent falls back to retrieval
+            continue
+        rag_results = [
+            {
+                'id': str(item.id),
+                'category': item.category,
+                'content': item.content,
+                'metadata': item.metadata,
+                'similarity_score': 1.0,
+            }
+            for item in items
+        ]
+        contexts[category] = StaticContext(rag_results, format_knowledge_context(rag_results))
+    return contexts
+
+
+_query_contexts = KnowledgeCache(build_query_contexts)
+_category_contexts = KnowledgeCache(build_category_contexts)
+_query_failure_lock = threading.Lock()
+_query_retry_at = 0.0
+
+
+def get_static_query_context(name: str, deadline: Optional[float] = None) -> Optional[StaticContext]:
+    """
+    Get the precomputed context for a fixed query in STATIC_QUERIES
+
+    Args:
+        deadline: Wall-clock time after which a rebuild stops retrying embeddings calls
+
+    Raises:
+        ProviderUnavailable: If the contexts must be built and the embeddings API is
+            unavailable, or a recent build failed
+    """
+    global _query_retry_at
+    with _query_failure_lock:
+        wait = _query_retry_at - time.monotonic()
+    if wait > 0:
+        raise ProviderUnavailable("Static query contexts recently failed to build", retry_after=wait)
+    try:
+        return _query_contexts.get(deadline=deadline).get(name)
+    except ProviderUnavailable as e:
+        with _query_failure_lock:
+            _query_retry_at = time.monotonic() + max(QUERY_RETRY_SECONDS, e.retry_after)
+        raise
+
+
+def get_category_context(category: str) -> Optional[StaticContext]:
+    """Get the whole-category context, or None if the category is too large to include whole"""
+    return _category_contexts.get().get(category)
+
+
+def warm_static_contexts():
+    """Resolve all static contexts now rather than on the first agent turn"""
+    _category_contexts.get()
+    _query_contexts.get()
+
+
+def invalidate_static_contexts():
+    """Force the next lookup to re-resolve all static contexts"""
+    _query_contexts.invalidate()
+    _category_contexts.invalidate()
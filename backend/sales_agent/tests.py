@@ -1,3 +1,666 @@
-from django.test import TestCase
+"""
+Unit tests for deterministic sales agent logic (no database or OpenAI needed)
 
-# Create your tests here.
+Run with: uv run python manage.py test sales_agent
+"""
+import importlib
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, time as clock, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+from unittest import mock
+
+import httpx
+import numpy
+import openai
+from django.test import SimpleTestCase, override_settings
+from langchain_core.messages import HumanMessage
+from langchain_openai import ChatOpenAI
+
+from sales_agent import llm_governor, rag, static_context, tour_time, transcripts, understanding
+from sales_agent.agents import llm, tour_booking
+from sales_agent.knowledge_index import KnowledgeIndex, tokenize
+from sales_agent.models import ProspectUnderstanding
+from sales_agent.llm_governor import (
+    CircuitBreaker,
+    DeadlineExceeded,
+    OutboundGovernor,
+    ProviderUnavailable,
+    SharedTokenBucket,
+    is_retryable,
+    retry_after_seconds,
+)
+from sales_agent.agents.tour_booking import (
+    STAGE_AWAITING_EMAIL,
+    STAGE_AWAITING_NAME,
+    STAGE_AWAITING_PHONE,
+    STAGE_AWAITING_TIME,
+    STAGE_CONFIRMED,
+    accepts,
+    advance,
+    parse_email,
+    parse_name,
+    parse_phone,
+)
+
+
+def _slot(start: datetime):
+    return SimpleNamespace(start=start, slot_id=uuid.uuid4())
+
+
+class ParseNameTests(SimpleTestCase):
+    def test_bare_names(self):
+        self.assertEqual(parse_name("Eric Smith"), "Eric Smith")
+        self.assertEqual(parse_name("mary ann o'neil"), "Mary Ann O'neil")
+        self.assertEqual(parse_name("McDonald."), "McDonald")
+
+    def test_prefixed_names(self):
+        self.assertEqual(parse_name("my name is eric"), "Eric")
+        self.assertEqual(parse_name("Sure, I'm Jane Doe"), "Jane Doe")
+        self.assertEqual(parse_name("This is Bob Lee!"), "Bob Lee")
+
+    def test_questions_and_topics_are_not_names(self):
+        for message in (
+            "Assisted living cost",
+            "Pets allowed",
+            "Medicaid",
+            "Kosher meals please",
+            "Pets?",
+            "how much",
+            "Can Bob come",
+            "I'm looking for memory care",
+            "yes",
+        ):
+            with self.subTest(message=message):
+                self.assertIsNone(parse_name(message))
+
+    def test_long_or_non_alphabetic_replies(self):
+        self.assertIsNone(parse_name("one two three four five"))
+        self.assertIsNone(parse_name("eric@example.com"))
+        self.assertIsNone(parse_name(""))
+
+
+class ParseContactTests(SimpleTestCase):
+    def test_parse_email(self):
+        self.assertEqual(parse_email("It's Eric.Smith@Example.com, thanks"), "eric.smith@example.com")
+        self.assertIsNone(parse_email("eric at example dot com"))
+        self.assertIsNone(parse_email("eric@example"))
+
+    def test_parse_phone(self):
+        self.assertEqual(parse_phone("(555) 123-4567"), "555-123-4567")
+        self.assertEqual(parse_phone("call me at +1 555.123.4567"), "555-123-4567")
+        self.assertEqual(parse_phone("5551234567"), "555-123-4567")
+        self.assertIsNone(parse_phone("123-4567"))
+        self.assertIsNone(parse_phone("55512345678901"))
+
+
+class TourTimeTests(SimpleTestCase):
+    def setUp(self):
+        # Monday, October 19 2026, 16:00 community time
+        self.now = tour_time.combine(date(2026, 10, 19), clock(16, 0))
+
+    def test_parse_weekdays(self):
+        self.assertEqual(tour_time.parse_date("Wednesday works", self.now), date(2026, 10, 21))
+        self.assertEqual(tour_time.parse_date("next Wednesday", self.now), date(2026, 10, 28))
+        self.assertEqual(tour_time.parse_date("Fridays are best", self.now), date(2026, 10, 23))
+        self.assertEqual(tour_time.parse_date("next Monday", self.now), date(2026, 10, 26))
+
+    def test_todays_weekday_rolls_forward_unless_still_ahead(self):
+        self.assertEqual(tour_time.parse_date("Monday", self.now), date(2026, 10, 26))
+        self.assertEqual(tour_time.parse_date("Monday", self.now, at=clock(10, 0)), date(2026, 10, 26))
+        self.assertEqual(tour_time.parse_date("Monday", self.now, at=clock(16, 0)), date(2026, 10, 26))
+        self.assertEqual(tour_time.parse_date("Monday", self.now, at=clock(17, 0)), date(2026, 10, 19))
+
+    def test_parse_tour_datetime_is_never_in_the_past(self):
+        self.assertEqual(
+            tour_time.parse_tour_datetime("Monday", "10 AM", now=self.now),
+            tour_time.combine(date(2026, 10, 26), clock(10, 0))
+        )
+        self.assertEqual(
+            tour_time.parse_tour_datetime("Monday", "5 PM", now=self.now),
+            tour_time.combine(date(2026, 10, 19), clock(17, 0))
+        )
+        self.assertEqual(
+            tour_time.parse_tour_datetime("Tuesday", None, now=self.now),
+            tour_time.combine(date(2026, 10, 20), clock(14, 0))
+        )
+        self.assertIsNone(tour_time.parse_tour_datetime("sometime soon", "2 PM", now=self.now))
+
+    def test_parse_relative_and_calendar_dates(self):
+        self.assertEqual(tour_time.parse_date("today", self.now), date(2026, 10, 19))
+        self.assertEqual(tour_time.parse_date("Tomorrow please", self.now), date(2026, 10, 20))
+        self.assertEqual(tour_time.parse_date("Oct 21st", self.now), date(2026, 10, 21))
+        self.assertEqual(tour_time.parse_date("January 5", self.now), date(2027, 1, 5))
+        self.assertEqual(tour_time.parse_date("10/21", self.now), date(2026, 10, 21))
+        self.assertEqual(tour_time.parse_date("3/2/27", self.now), date(2027, 3, 2))
+        self.assertIsNone(tour_time.parse_date("2/30/27", self.now))
+        self.assertIsNone(tour_time.parse_date("soon", self.now))
+
+    def test_parse_time(self):
+        self.assertEqual(tour_time.parse_time("2pm"), clock(14, 0))
+        self.assertEqual(tour_time.parse_time("10:30 a.m."), clock(10, 30))
+        self.assertEqual(tour_time.parse_time("12 am"), clock(0, 0))
+        self.assertEqual(tour_time.parse_time("12pm"), clock(12, 0))
+        self.assertEqual(tour_time.parse_time("around noon"), clock(12, 0))
+        self.assertEqual(tour_time.parse_time("at 2"), clock(14, 0))
+        self.assertEqual(tour_time.parse_time("at 10:15"), clock(10, 15))
+        self.assertIsNone(tour_time.parse_time("13pm"))
+        self.assertIsNone(tour_time.parse_time("at 10/21"))
+        self.assertIsNone(tour_time.parse_time("Tuesday"))
+
+
+class TourBookingTests(SimpleTestCase):
+    def setUp(self):
+        # Monday, 10:00 community time
+        self.now = tour_time.combine(datetime(2026, 10, 19).date(), datetime(2026, 10, 19, 10).time())
+        self.tuesday_10 = tour_time.combine(datetime(2026, 10, 20).date(), datetime(2026, 10, 20, 10).time())
+
+        patcher = mock.patch.object(tour_booking, "tour_slots")
+        self.slots = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.slots.book_slot.return_value = True
+        self.slots.format_slot_choices.return_value = "Tuesday at 10:00 AM"
+
+    def test_accepts_only_the_expected_field(self):
+        self.assertFalse(accepts({}, "Eric Smith", now=self.now))
+        self.assertTrue(accepts({"stage": STAGE_AWAITING_NAME}, "Eric Smith", now=self.now))
+        self.assertFalse(accepts({"stage": STAGE_AWAITING_NAME}, "Assisted living cost", now=self.now))
+        self.assertTrue(accepts({"stage": STAGE_AWAITING_EMAIL}, "eric@example", now=self.now))
+        self.assertFalse(accepts({"stage": STAGE_AWAITING_EMAIL}, "What's the price?", now=self.now))
+        self.assertTrue(accepts({"stage": STAGE_AWAITING_PHONE}, "555 123", now=self.now))
+
+    def test_accepts_time_only_for_tour_messages(self):
+        booking = {"stage": STAGE_AWAITING_TIME}
+        self.assertTrue(accepts(booking, "Can I tour on Tuesday at 10am?", now=self.now))
+        self.assertFalse(accepts(booking, "price on Tuesday?", now=self.now))
+        self.assertFalse(accepts(booking, "Tuesday at 10am", now=self.now))
+
+        offered = {"stage": STAGE_AWAITING_TIME, "offered": [self.tuesday_10.isoformat()]}
+        self.assertTrue(accepts(offered, "Tuesday at 10am", now=self.now))
+        self.assertTrue(accepts(offered, "yes", now=self.now))
+        self.assertFalse(accepts(offered, "Is dinner served on Tuesday?", now=self.now))
+        self.assertFalse(accepts(tour_booking.expire_offer(offered), "Tuesday at 10am", now=self.now))
+
+    def test_confirmed_booking_only_reschedules(self):
+        booking = {"stage": STAGE_CONFIRMED}
+        self.assertFalse(accepts(booking, "Is lunch included on Friday?", now=self.now))
+        self.assertFalse(accepts(booking, "actually, what's the price on Friday?", now=self.now))
+        self.assertTrue(accepts(booking, "Actually Friday at 2pm works better", now=self.now))
+
+    def test_full_booking(self):
+        slot = _slot(self.tuesday_10)
+        self.slots.find_open_slot.return_value = slot
+
+        turn = advance({}, "I'd like to tour Tuesday at 10am", now=self.now)
+        self.assertEqual(turn.booking["stage"], STAGE_AWAITING_NAME)
+        self.assertEqual(turn.booking["slot_id"], str(slot.slot_id))
+        self.assertIn("full name", turn.reply)
+        self.assertEqual([event["event_type"] for event in turn.events], ["tour_requested"])
+
+        turn = advance(turn.booking, "Eric Smith", now=self.now)
+        self.assertEqual(turn.booking["stage"], STAGE_AWAITING_EMAIL)
+        self.assertEqual(turn.events[0]["event_data"], {"name": "Eric Smith"})
+
+        turn = advance(turn.booking, "eric@example", now=self.now)
+        self.assertEqual(turn.booking["stage"], STAGE_AWAITING_EMAIL)
+        self.assertEqual(turn.reply, tour_booking.BOOKING_PROMPTS["reask_email"])
+
+        turn = advance(turn.booking, "eric@example.com", now=self.now)
+        self.assertEqual(turn.booking["stage"], STAGE_AWAITING_PHONE)
+
+        turn = advance(turn.booking, "555-123-4567", now=self.now)
+        self.assertEqual(turn.booking["stage"], STAGE_CONFIRMED)
+        self.slots.book_slot.assert_called_once_with(str(slot.slot_id))
+        self.assertEqual(
+            [event["event_type"] for event in turn.events], ["contact_shared", "tour_scheduled"]
+        )
+        self.assertIn("You're all set, Eric", turn.reply)
+
+    def test_free_form_turns_go_to_the_llm(self):
+        turn = advance({"stage": STAGE_AWAITING_NAME}, "Do you allow pets?", now=self.now)
+        self.assertIsNone(turn.reply)
+        self.assertNotIn("name", turn.booking)
+
+        turn = advance({"stage": STAGE_AWAITING_TIME}, "What are your hours?", now=self.now)
+        self.assertIsNone(turn.reply)
+        self.assertEqual(turn.events, [])
+
+    def test_slot_taken_at_confirmation(self):
+        self.slots.book_slot.return_value = False
+        self.slots.slots_near.return_value = [_slot(self.tuesday_10)]
+        booking = {
+            "stage": STAGE_AWAITING_PHONE,
+            "tour_at": self.tuesday_10.isoformat(),
+            "slot_id": str(uuid.uuid4()),
+            "name": "Eric Smith",
+            "email": "eric@example.com",
+        }
+
+        turn = advance(booking, "555-123-4567", now=self.now)
+        self.assertEqual(turn.booking["stage"], STAGE_AWAITING_TIME)
+        self.assertNotIn("slot_id", turn.booking)
+        self.assertEqual(turn.booking["offered"], [self.tuesday_10.isoformat()])
+        self.assertIn("was just booked", turn.reply)
+
+
+@override_settings(
+    LLM_ROUTER_ENABLED=True,
+    LLM_ROUTER_LATENCY_THRESHOLD_MS=1000,
+    LLM_ROUTER_MIN_SAMPLES=3,
+    LLM_ROUTER_PROBE_RATE=0.0,
+)
+class LatencyRouterTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(llm._latency_trackers, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.primary = llm.node_llm_config("pricing_agent")["model"]
+
+    def test_slow_primary_is_routed_per_node(self):
+        for _ in range(3):
+            llm.model_latency_tracker("pricing_agent", self.primary).record(5.0)
+            llm.model_latency_tracker("classify_intent", self.primary).record(0.2)
+
+        self.assertEqual(llm.latency_router.route("pricing_agent")["reason"], "primary_slow")
+        self.assertEqual(llm.latency_router.route("classify_intent")["reason"], "within_threshold")
+
+    def test_timing_out_primary_is_routed_away(self):
+        model = llm.get_llm("pricing_agent")
+        with mock.patch.object(llm, "_run_within_budget", side_effect=DeadlineExceeded("timed out")), \
+                mock.patch.object(llm, "degraded_mode"):
+            for _ in range(3):
+                with self.assertRaises(DeadlineExceeded):
+                    llm.call_llm(None, "pricing_agent", model, [HumanMessage(content="Hello")])
+
+        decision = llm.latency_router.route("pricing_agent")
+        self.assertEqual((decision["tier"], decision["reason"]), ("fallback", "primary_slow"))
+        self.assertGreaterEqual(decision["observed_ms"], model.request_timeout * 1000)
+
+    def test_slow_samples_age_out(self):
+        with mock.patch("sales_agent.agents.llm.time.monotonic", return_value=1000.0):
+            for _ in range(3):
+                llm.model_latency_tracker("pricing_agent", self.primary).record(5.0)
+            self.assertEqual(llm.latency_router.route("pricing_agent")["tier"], "fallback")
+
+        with mock.patch("sales_agent.agents.llm.time.monotonic", return_value=1000.0 + 3600):
+            decision = llm.latency_router.route("pricing_agent")
+        self.assertEqual((decision["tier"], decision["reason"]), ("primary", "insufficient_samples"))
+
+
+def _openai_error(error_class, status_code: int, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return error_class("error", response=response, body=None)
+
+
+class RetryClassificationTests(SimpleTestCase):
+    def test_is_retryable(self):
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        self.assertTrue(is_retryable(_openai_error(openai.RateLimitError, 429)))
+        self.assertTrue(is_retryable(_openai_error(openai.InternalServerError, 503)))
+        self.assertTrue(is_retryable(openai.APITimeoutError(request=request)))
+        self.assertTrue(is_retryable(openai.APIConnectionError(request=request)))
+        self.assertFalse(is_retryable(_openai_error(openai.BadRequestError, 400)))
+        self.assertFalse(is_retryable(_openai_error(openai.AuthenticationError, 401)))
+        self.assertFalse(is_retryable(ValueError("bad schema")))
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(retry_after_seconds(_openai_error(openai.RateLimitError, 429, {"retry-after": "2"})), 2.0)
+        self.assertEqual(
+            retry_after_seconds(_openai_error(openai.RateLimitError, 429, {"retry-after-ms": "250", "retry-after": "2"})),
+            0.25
+        )
+        self.assertIsNone(retry_after_seconds(
+            _openai_error(openai.RateLimitError, 429, {"retry-after": "Wed, 21 Oct 2026 07:28:00 GMT"})
+        ))
+        self.assertIsNone(retry_after_seconds(_openai_error(openai.RateLimitError, 429)))
+        self.assertIsNone(retry_after_seconds(ValueError("no response")))
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(llm_governor.time, "monotonic", return_value=100.0)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.before_call()
+        self.breaker.record_failure()
+
+        self.assertTrue(self.breaker.is_open)
+        with self.assertRaises(ProviderUnavailable) as raised:
+            self.breaker.before_call()
+        self.assertEqual(raised.exception.retry_after, 30)
+
+    def test_half_open_lets_one_probe_through(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.return_value = 131.0
+
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(ProviderUnavailable):
+            self.breaker.before_call()
+
+        self.breaker.cancel_probe()
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.before_call()
+
+    def test_failed_probe_reopens(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.return_value = 131.0
+        self.breaker.before_call()
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.opened_at, 131.0)
+        self.assertTrue(self.breaker.is_open)
+
+
+class SharedTokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(llm_governor.time, "time", return_value=1000.0)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        # 60 per minute: refills one token per second
+        self.bucket = SharedTokenBucket(str(Path(directory.name) / "tokens.json"), per_minute=60)
+
+    def test_take_and_refill(self):
+        self.assertEqual(self.bucket._take(50), 0.0)
+        self.assertEqual(self.bucket._take(20), 10.0)
+
+        self.clock.return_value = 1010.0
+        self.assertEqual(self.bucket._take(20), 0.0)
+        self.assertEqual(self.bucket._take(1), 1.0)
+
+    def test_shared_through_the_file(self):
+        self.assertEqual(self.bucket._take(60), 0.0)
+        other_process = SharedTokenBucket(self.bucket.path, per_minute=60)
+        self.assertEqual(other_process._take(30), 30.0)
+
+    def test_oversized_request_waits_for_a_full_bucket(self):
+        self.assertEqual(self.bucket._take(500), 0.0)
+        self.assertEqual(self.bucket._take(500), 60.0)
+
+    def test_acquire_gives_up_past_the_deadline(self):
+        self.bucket._take(60)
+        with mock.patch.object(llm_governor.time, "monotonic", return_value=0.0):
+            with self.assertRaises(ProviderUnavailable) as raised:
+                self.bucket.acquire(30, deadline=5.0)
+        self.assertEqual(raised.exception.retry_after, 30.0)
+
+
+@override_settings(
+    LLM_MAX_CONCURRENCY_HOST=0,
+    LLM_REQUESTS_PER_MINUTE=0,
+    LLM_TOKENS_PER_MINUTE=0,
+    LLM_MAX_RETRIES=10,
+    LLM_RETRY_BASE_DELAY=0.01,
+    LLM_RETRY_MAX_DELAY=0.01,
+    LLM_CIRCUIT_FAILURE_THRESHOLD=100,
+    LLM_HEDGING_ENABLED=False,
+)
+class CallBudgetTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(LLM_GOVERNOR_STATE_DIR=directory.name):
+            self.governor = OutboundGovernor()
+        for patcher in (
+            mock.patch.object(llm, "get_governor", return_value=self.governor),
+            mock.patch.object(llm, "degraded_mode"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # Every request hangs until its client timeout
+        self.request_timeouts = []
+
+        def hang(model, *args, **kwargs):
+            self.request_timeouts.append(model.root_client.timeout)
+            time.sleep(model.root_client.timeout)
+            raise openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+        patcher = mock.patch.object(ChatOpenAI, "_generate", autospec=True, side_effect=hang)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_node_timeout_shorter_than_turn_budget(self):
+        model = llm.GovernedChatOpenAI(model="gpt-4o-mini", api_key="test", timeout=0.3, max_retries=0)
+        state = {"deadline": time.time() + 30}
+
+        started = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            llm.call_llm(state, "pricing_agent", model, [HumanMessage(content="Hello")])
+        self.assertLess(time.monotonic() - started, 1.0)
+
+        # Retries end with the attempt, not the turn, and share its 0.3s
+        time.sleep(0.5)
+        attempts = len(self.request_timeouts)
+        time.sleep(0.3)
+        self.assertEqual(len(self.request_timeouts), attempts)
+        self.assertLess(self.request_timeouts[0], 0.3 + 1e-6)
+        self.assertEqual(self.request_timeouts, sorted(self.request_timeouts, reverse=True))
+        self.assertLess(self.governor.failures, 5)
+
+
+class StaticQueryContextTests(SimpleTestCase):
+    def setUp(self):
+        for patcher in (
+            mock.patch("sales_agent.knowledge_index.knowledge_fingerprint", return_value=(0, None, None, None)),
+            mock.patch.object(static_context.retriever, "search", side_effect=ProviderUnavailable("down", retry_after=0.0)),
+            mock.patch.object(static_context, "_query_retry_at", 0.0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.search = static_context.retriever.search
+        static_context.invalidate_static_contexts()
+        self.addCleanup(static_context.invalidate_static_contexts)
+
+    def test_failed_build_fails_fast(self):
+        deadline = time.time() + 5
+        with self.assertRaises(ProviderUnavailable):
+            static_context.get_static_query_context("tour_availability", deadline=deadline)
+        self.assertEqual(self.search.call_args.kwargs["deadline"], deadline)
+
+        with self.assertRaises(ProviderUnavailable) as raised:
+            static_context.get_static_query_context("tour_availability")
+        self.assertEqual(self.search.call_count, 1)
+        self.assertGreater(raised.exception.retry_after, 0)
+
+
+def _event(event_type: str, created_at: Optional[datetime] = None, **event_data) -> dict:
+    return {"event_type": event_type, "event_data": event_data, "created_at": created_at}
+
+
+UNDERSTANDING_EVENTS = [
+    _event("budget_inquiry", datetime(2026, 3, 1, 10, tzinfo=timezone.utc)),
+    _event("care_need_expressed", datetime(2026, 3, 1, 10, 1, tzinfo=timezone.utc), condition="dementia", care_level="memory_care"),
+    _event("care_need_expressed", datetime(2026, 3, 1, 10, 2, tzinfo=timezone.utc), condition="Dementia"),
+    _event("preference_stated", datetime(2026, 3, 1, 10, 3, tzinfo=timezone.utc), category="pet_friendly", detail="small dog"),
+    _event("financing_inquiry", datetime(2026, 3, 1, 10, 4, tzinfo=timezone.utc), financing_type="Medicaid"),
+    _event("financing_inquiry", datetime(2026, 3, 1, 10, 5, tzinfo=timezone.utc), financing_type="Medicaid"),
+    _event("budget_mentioned", datetime(2026, 3, 1, 10, 6, tzinfo=timezone.utc), max=5000),
+    _event("tour_requested", datetime(2026, 3, 1, 10, 7, tzinfo=timezone.utc)),
+    _event("contact_shared", datetime(2026, 3, 1, 10, 8, tzinfo=timezone.utc), name="Ana Ruiz", email="ana@example.com"),
+]
+
+
+class UnderstandingReducerTests(SimpleTestCase):
+    def test_reduce_events(self):
+        result = understanding.reduce_events(None, UNDERSTANDING_EVENTS)
+
+        self.assertEqual(result, {
+            "budget_interest": "Up to $5000/month",
+            "care_needs": ["Dementia", "Memory Care"],
+            "preferences": ["Pet Friendly: small dog"],
+            "financing_interests": ["Medicaid"],
+            "tour_interest": "High - wants to visit",
+            "name": "Ana Ruiz",
+            "email": "ana@example.com",
+        })
+
+    def test_tour_scheduled_with_date_only(self):
+        result = understanding.reduce_events({}, [_event("tour_scheduled", date="2026-03-04")])
+
+        self.assertEqual(result["tour_scheduled"], "2026-03-04")
+
+    def test_apply_to_projection_accumulates(self):
+        projection = understanding.apply_to_projection(ProspectUnderstanding(), UNDERSTANDING_EVENTS[:4])
+        understanding.apply_to_projection(projection, [
+            *UNDERSTANDING_EVENTS[4:],
+            _event("tour_scheduled", datetime(2026, 3, 1, 9, tzinfo=timezone.utc), date="2026-03-04", time="2:00 PM"),
+            _event("preference_stated", category="view", detail="x" * 400),
+        ])
+
+        self.assertEqual(projection.care_needs, ["Dementia", "Memory Care"])
+        self.assertEqual(projection.financing_interests, ["Medicaid"])
+        self.assertEqual(projection.budget_interest, "Up to $5000/month")
+        self.assertEqual(projection.tour_scheduled, "2026-03-04 at 2:00 PM")
+        self.assertEqual(projection.tour_status, ProspectUnderstanding.TOUR_STATUS_SCHEDULED)
+        self.assertIsNone(projection.timeline)
+        # Values are cut to the column length; contact details aren't projected
+        self.assertEqual(len(projection.preferences[-1]), 300)
+        self.assertFalse(hasattr(projection, "email"))
+        self.assertEqual(projection.event_count, len(UNDERSTANDING_EVENTS) + 2)
+        # An older event in a later batch doesn't move last_event_at back
+        self.assertEqual(projection.last_event_at, datetime(2026, 3, 1, 10, 8, tzinfo=timezone.utc))
+
+    def test_migration_backfill_matches_reducer(self):
+        migration = importlib.import_module("sales_agent.migrations.0005_prospectunderstanding")
+        events = [(event["event_type"], event["event_data"], event["created_at"]) for event in UNDERSTANDING_EVENTS]
+
+        backfilled = migration.build_projection(ProspectUnderstanding, None, events)
+        live = understanding.apply_to_projection(ProspectUnderstanding(), UNDERSTANDING_EVENTS)
+
+        for field in (*understanding.PROJECTED_FIELDS, "tour_status", "event_count", "last_event_at"):
+            self.assertEqual(getattr(backfilled, field), getattr(live, field), field)
+
+
+def _knowledge(item_id: str, category: str, content: str) -> dict:
+    return {"id": item_id, "category": category, "content": content, "metadata": {}}
+
+
+KNOWLEDGE = [
+    _knowledge("medicaid", "financing", "We accept Medicaid waivers for assisted living residents."),
+    _knowledge("pets", "policies", "Small pets such as cats and dogs are welcome in apartments."),
+    _knowledge("dining", "dietary", "Three meals a day with kosher and vegetarian options."),
+    _knowledge("pricing", "pricing", "Assisted living starts at $4,500 per month; memory care costs more."),
+    _knowledge("smoking", "policies", "Smoking is not allowed anywhere on campus, including apartments."),
+]
+
+
+class KnowledgeIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = KnowledgeIndex(KNOWLEDGE)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Are PETS allowed in the apartments?"), ["pet", "allowed", "apartment"])
+        self.assertEqual(tokenize("What does it cost?"), ["cost"])
+
+    def test_ranks_by_bm25(self):
+        results = self.index.search("Medicaid for assisted living?")
+        self.assertEqual([item["id"] for item, _score in results], ["medicaid", "pricing"])
+        self.assertGreater(results[0][1], results[1][1])
+
+    def test_rare_terms_outweigh_common_ones(self):
+        # "apartments" is in two items, "dogs" in one
+        results = self.index.search("dogs in apartments")
+        self.assertEqual([item["id"] for item, _score in results], ["pets", "smoking"])
+
+    def test_category_filter_and_misses(self):
+        self.assertEqual(
+            [item["id"] for item, _score in self.index.search("apartments", category_filter=["policies"], top_k=1)],
+            ["pets"]
+        )
+        self.assertEqual(self.index.search("apartments", category_filter=["pricing"]), [])
+        self.assertEqual(self.index.search("swimming pool"), [])
+
+    def test_covers_query(self):
+        self.assertTrue(self.index.covers_query("kosher meals", KNOWLEDGE[2]))
+        self.assertFalse(self.index.covers_query("kosher pool", KNOWLEDGE[2]))
+        self.assertFalse(self.index.covers_query("the", KNOWLEDGE[2]))
+
+
+@override_settings(RAG_RRF_K=60, RAG_HYBRID_CANDIDATES=10, RAG_LEXICAL_MAX_TERMS=3)
+class HybridSearchTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(rag, "get_knowledge_index", return_value=KnowledgeIndex(KNOWLEDGE))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(rag.retriever, "vector_search")
+        self.vector_search = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reciprocal_rank_fusion(self):
+        by_id = {item["id"]: item for item in KNOWLEDGE}
+        # Lexical ranks medicaid then pricing; vectors rank pricing, dining, medicaid
+        self.vector_search.return_value = [by_id["pricing"], by_id["dining"], by_id["medicaid"]]
+
+        results = rag.retriever.hybrid_search("Is Medicaid accepted for assisted living care?", top_k=3)
+
+        self.assertEqual([item["id"] for item in results], ["pricing", "medicaid", "dining"])
+        self.assertAlmostEqual(results[0]["similarity_score"], 1 / 62 + 1 / 61)
+        self.assertAlmostEqual(results[1]["similarity_score"], 1 / 61 + 1 / 63)
+        self.assertAlmostEqual(results[2]["similarity_score"], 1 / 62)
+        self.assertEqual({item["retrieval"] for item in results}, {"hybrid"})
+
+    def test_short_covered_query_skips_the_embedding(self):
+        results = rag.retriever.hybrid_search("Medicaid?", top_k=2)
+
+        self.vector_search.assert_not_called()
+        self.assertEqual([item["id"] for item in results], ["medicaid"])
+        self.assertEqual(results[0]["retrieval"], "lexical")
+
+
+class TranscriptPagingTests(SimpleTestCase):
+    def test_cursor_round_trip(self):
+        # ts_rank values are float4 widened to double precision
+        rank = float(numpy.float32(0.0607927))
+        cursor = transcripts.encode_cursor(rank, 42)
+
+        self.assertEqual(transcripts.decode_cursor(cursor), (rank, 42))
+        with self.assertRaises(ValueError):
+            transcripts.decode_cursor("not-a-cursor")
+
+    def test_keyset_pages_cover_tied_ranks_once(self):
+        hits = [{"id": message_id, "rank": rank} for message_id, rank in (
+            (9, 0.5), (8, 0.25), (7, 0.25), (6, 0.25), (5, 0.25), (4, 0.125), (3, 0.0625),
+        )]
+        seen = []
+        cursor = None
+        while True:
+            remaining = hits
+            if cursor:
+                # Same predicate as search_transcripts: rank < r OR (rank = r AND id < i)
+                after_rank, after_id = transcripts.decode_cursor(cursor)
+                remaining = [
+                    hit for hit in hits
+                    if hit["rank"] < after_rank or (hit["rank"] == after_rank and hit["id"] < after_id)
+                ]
+            page, cursor = transcripts._split_page(remaining[:3], 2)
+            seen.extend(hit["id"] for hit in page)
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, [9, 8, 7, 6, 5, 4, 3])
+
+    def test_negative_limit_is_clamped(self):
+        with mock.patch.object(transcripts, "TranscriptMessage") as model:
+            values = model.objects.filter.return_value.annotate.return_value.annotate.return_value.order_by.return_value.values
+            values.return_value.__getitem__.return_value = []
+            for limit in (-1, -5):
+                self.assertEqual(transcripts.search_transcripts("medicaid", limit=limit)["results"], [])
+                values.return_value.__getitem__.assert_called_with(slice(None, 2))
@@ -0,0 +1,216 @@
+"""
+Tour slot inventory: open-slot queries and conflict-free booking
+
+Slots are generated ahead of time for tour hours on tour days. Booking is a
+single conditional UPDATE (booked_count < capacity), so concurrent requests for
+the last place in a slot cannot both succeed; the CheckConstraint on TourSlot
+backs this up at the database level.
+
+Within dry_run_bookings() (offline evaluation) booking and releasing only
+check the inventory and write nothing, so replayed conversations don't use
+up real tour places.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.db.models import F
+
+from sales_agent import tour_time
+from sales_agent.models import TourSlot
+
+
+def open_slots(
+    after: Optional[datetime] = None,
+    before: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    community: Optional[str] = None
+) -> List[TourSlot]:
+    """
+    Open tour slots in start order
+
+    Args:
+        after: Earliest start (defaults to now)
+        before: Latest start, exclusive (defaults to the booking horizon)
+        limit: Maximum number of slots
+        community: Community slug (defaults to settings.COMMUNITY_SLUG)
+
+    Returns:
+        List of TourSlot with spare capacity
+    """
+    now = tour_time.local_now()
+    after = max(after, now) if after else now
+    before = before or now + timedelta(days=settings.TOUR_SLOT_HORIZON_DAYS)
+    queryset = TourSlot.objects.filter(
+        community=community or settings.COMMUNITY_SLUG,
+        start__gte=after,
+        start__lt=before,
+        booked_count__lt=F('capacity'),
+    ).order_by('start')
+    if limit:
+        queryset = queryset[:limit]
+    return list(queryset)
+
+
+def open_slots_on(day: date, limit: Optional[int] = None) -> List[TourSlot]:
+    """Open slots starting on a local calendar day"""
+    day_start = tour_time.combine(day, datetime.min.time())
+    return open_slots(after=day_start, before=day_start + timedelta(days=1), limit=limit)
+
+
+def find_open_slot(start: datetime) -> Optional[TourSlot]:
+    """The open slot starting exactly at a time, if any"""
+    return TourSlot.objects.filter(
+        community=settings.COMMUNITY_SLUG,
+        start=start,
+        booked_count__lt=F('capacity'),
+    ).first()
+
+
+def first_open_slot(starts: List[datetime]) -> Optional[TourSlot]:
+    """The earliest upcoming open slot among candidate start times"""
+    return TourSlot.objects.filter(
+        community=settings.COMMUNITY_SLUG,
+        start__in=starts,
+        start__gt=tour_time.local_now(),
+        booked_count__lt=F('capacity'),
+    ).order_by('start').first()
+
+
+def slots_near(target: datetime, limit: Optional[int] = None) -> List[TourSlot]:
+    """
+    Open slots to offer instead of an unavailable time: the same day first, then the next openings
+    """
+    limit = limit or settings.TOUR_SLOT_OFFER_COUNT
+    day_start = tour_time.combine(target.astimezone(tour_time.community_timezone()).date(), datetime.min.time())
+    return open_slots(after=day_start, limit=limit)
+
+
+# A context variable rather than a thread-local: LangGraph runs nodes in executor
+# threads with a copy of the caller's context
+_dry_run: ContextVar[bool] = ContextVar("tour_slots_dry_run", default=False)
+
+
+@contextmanager
+def dry_run_bookings():
+    """Make book_slot/release_slot in this context report success without writing"""
+    token = _dry_run.set(True)
+    try:
+        yield
+    finally:
+        _dry_run.reset(token)
+
+
+def book_slot(slot_id) -> bool:
+    """
+    Take one place in a slot
+
+    Returns:
+        True if booked, False if the slot is full or no longer exists
+    """
+    if _dry_run.get():
+        return TourSlot.objects.filter(slot_id=slot_id, booked_count__lt=F('capacity')).exists()
+    updated = TourSlot.objects.filter(
+        slot_id=slot_id,
+        booked_count__lt=F('capacity'),
+    ).update(booked_count=F('booked_count') + 1)
+    return updated == 1
+
+
+def release_slot(slot_id) -> bool:
+    """
+    Give back one place in a slot (cancelled or rescheduled tour)
+
+    Returns:
+        True if released
+    """
+    if _dry_run.get():
+        return True
+    updated = TourSlot.objects.filter(
+        slot_id=slot_id,
+        booked_count__gt=0,
+    ).update(booked_count=F('booked_count') - 1)
+    return updated == 1
+
+
+def slot_starts(start_date: date, days: int, interval_minutes: Optional[int] = None) -> List[datetime]:
+    """
+    Tour start times during tour hours on tour days (the calendar, not the inventory)
+
+    Args:
+        start_date: First local date
+        days: Number of calendar days
+        interval_minutes: Minutes between tour starts (defaults to settings.TOUR_SLOT_MINUTES)
+    """
+    interval = timedelta(minutes=interval_minutes or settings.TOUR_SLOT_MINUTES)
+    hours_start, hours_end = tour_time.tour_hours()
+
+    starts = []
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        if day.weekday() not in tour_time.TOUR_WEEKDAYS:
+            continue
+        start = tour_time.combine(day, hours_start)
+        end = tour_time.combine(day, hours_end)
+        while start < end:
+            starts.append(start)
+            start += interval
+    return starts
+
+
+def generate_slots(
+    start_date: date,
+    days: int,
+    interval_minutes: Optional[int] = None,
+    capacity: Optional[int] = None,
+    community: Optional[str] = None
+) -> int:
+    """
+    Create slots for tour hours on tour days; existing slots are left untouched
+
+    Args:
+        start_date: First local date to generate
+        days: Number of calendar days
+        interval_minutes: Minutes between tour starts (defaults to settings.TOUR_SLOT_MINUTES)
+        capacity: Parties per slot (defaults to settings.TOUR_SLOT_CAPACITY)
+        community: Community slug (defaults to settings.COMMUNITY_SLUG)
+
+    Returns:
+        Number of slot times in the range (already existing ones are skipped)
+    """
+    capacity = capacity or settings.TOUR_SLOT_CAPACITY
+    community = community or settings.COMMUNITY_SLUG
+    slots = [
+        TourSlot(community=community, start=start, capacity=capacity)
+        for start in slot_starts(start_date, days, interval_minutes)
+    ]
+    TourSlot.objects.bulk_create(slots, ignore_conflicts=True, batch_size=500)
+    return len(slots)
+
+
+def format_slot_list(starts: List[datetime]) -> str:
+    """Format slot start times as a bulleted list for prompts"""
+    return "\n".join(f"- {tour_time.format_tour_datetime(start)}" for start in starts)
+
+
+def format_slot_choices(slots: List[TourSlot], include_date: bool = True) -> str:
+    """
+    Format slots inline, e.g. "Tuesday, October 20 at 10:00 AM, 11:00 AM or 1:00 PM"
+
+    Args:
+        include_date: Prefix each new day's first time with the date (False for times only)
+    """
+    choices = []
+    previous_date = None
+    for slot in slots:
+        slot_date = tour_time.format_tour_date(slot.start)
+        if slot_date == previous_date or not include_date:
+            choices.append(tour_time.format_tour_time(slot.start))
+        else:
+            choices.append(tour_time.format_tour_datetime(slot.start))
+        previous_date = slot_date
+    if len(choices) <= 1:
+        return "".join(choices)
+    return f"{', '.join(choices[:-1])} or {choices[-1]}"
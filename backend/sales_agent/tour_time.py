@@ -0,0 +1,191 @@
+"""
+Deterministic parsing of tour dates and times in the community's time zone
+
+Patterns are compiled once at import and the time zone comes from the standard
+library (zoneinfo). Parsing understands weekday names
+("Tuesday", "next Friday"), "today"/"tomorrow", month-day dates ("Oct 21",
+"10/21") and clock times ("2pm", "10:30 am", "noon").
+"""
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+
+# Tours run Monday (0) through Friday (4)
+TOUR_WEEKDAYS = (0, 1, 2, 3, 4)
+
+WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6,
+}
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+WEEKDAY_PATTERN = re.compile(
+    r"\b(next\s+)?(monday|tuesday|wednesday|thursday|friday|saturday|sunday)s?\b", re.IGNORECASE
+)
+RELATIVE_DAY_PATTERN = re.compile(r"\b(today|tomorrow)\b", re.IGNORECASE)
+MONTH_DAY_PATTERN = re.compile(
+    r"\b(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|"
+    r"oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?\s+(\d{1,2})(?:st|nd|rd|th)?\b",
+    re.IGNORECASE
+)
+NUMERIC_DATE_PATTERN = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\b")
+CLOCK_PATTERN = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s?m\b\.?", re.IGNORECASE)
+BARE_HOUR_PATTERN = re.compile(r"\b(?:at|around|@)\s*(\d{1,2})(?::(\d{2}))?\b(?!\s*/)", re.IGNORECASE)
+NOON_PATTERN = re.compile(r"\bnoon\b", re.IGNORECASE)
+
+
+def community_timezone() -> ZoneInfo:
+    """The community's local time zone (settings.COMMUNITY_TIME_ZONE)"""
+    return ZoneInfo(settings.COMMUNITY_TIME_ZONE)
+
+
+def local_now() -> datetime:
+    """Current time in the community's time zone"""
+    return timezone.now().astimezone(community_timezone())
+
+
+def tour_hours() -> tuple:
+    """(start, end) times tours may begin between"""
+    return (
+        datetime.strptime(settings.TOUR_HOURS_START, "%H:%M").time(),
+        datetime.strptime(settings.TOUR_HOURS_END, "%H:%M").time(),
+    )
+
+
+def parse_date(text: str, now: Optional[datetime] = None, at: Optional[time] = None) -> Optional[date]:
+    """
+    Parse the tour date mentioned in a message
+
+    Args:
+        text: User message or date string
+        now: Reference time (defaults to the community's current time)
+        at: Tour time of day, if known. Today's weekday name means today only
+            when this is still ahead of now; otherwise it means next week.
+
+    Returns:
+        The next matching date on or after today, or None
+    """
+    now = now or local_now()
+    today = now.date()
+
+    match = RELATIVE_DAY_PATTERN.search(text)
+    if match:
+        return today + timedelta(days=1 if match.group(1).lower() == "tomorrow" else 0)
+
+    match = MONTH_DAY_PATTERN.search(text)
+    if match:
+        return _next_occurrence(today, MONTHS[match.group(1).lower()[:3]], int(match.group(2)))
+
+    match = NUMERIC_DATE_PATTERN.search(text)
+    if match:
+        month, day, year = int(match.group(1)), int(match.group(2)), match.group(3)
+        if year:
+            try:
+                return date(int(year) + (2000 if len(year) == 2 else 0), month, day)
+            except ValueError:
+                return None
+        return _next_occurrence(today, month, day)
+
+    match = WEEKDAY_PATTERN.search(text)
+    if match:
+        weekday = WEEKDAYS[match.group(2).lower()]
+        days_ahead = (weekday - today.weekday()) % 7
+        if match.group(1):
+            # "next Tuesday" means the one after this week's
+            days_ahead += 7
+        elif days_ahead == 0 and (at is None or combine(today, at) <= now):
+            days_ahead = 7
+        return today + timedelta(days=days_ahead)
+
+    return None
+
+
+def _next_occurrence(today: date, month: int, day: int) -> Optional[date]:
+    """The next month/day on or after today"""
+    try:
+        candidate = date(today.year, month, day)
+        if candidate < today:
+            candidate = date(today.year + 1, month, day)
+        return candidate
+    except ValueError:
+        return None
+
+
+def parse_time(text: str) -> Optional[time]:
+    """
+    Parse the tour time mentioned in a message
+
+    "at 2" without am/pm is read as afternoon for 1-6 and morning for 7-11.
+
+    Returns:
+        Local time of day, or None
+    """
+    match = CLOCK_PATTERN.search(text)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        if hour > 12 or minute > 59:
+            return None
+        if match.group(3).lower() == "p" and hour != 12:
+            hour += 12
+        elif match.group(3).lower() == "a" and hour == 12:
+            hour = 0
+        return time(hour, minute)
+
+    if NOON_PATTERN.search(text):
+        return time(12, 0)
+
+    match = BARE_HOUR_PATTERN.search(text)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        if not 1 <= hour <= 12 or minute > 59:
+            return None
+        if hour <= 6:
+            hour += 12
+        return time(hour, minute)
+
+    return None
+
+
+def combine(tour_date: date, tour_time: time) -> datetime:
+    """Timezone-aware datetime for a local date and time"""
+    return datetime.combine(tour_date, tour_time, tzinfo=community_timezone())
+
+
+def parse_tour_datetime(date_str: Optional[str], time_str: Optional[str], now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Parse extracted tour date and time strings into a timezone-aware datetime
+
+    Examples: ("Tuesday", "2 PM"), ("next Monday", "10:30 AM"), ("Oct 21", None).
+    Defaults to 2 PM when only the date is known.
+
+    Returns:
+        Datetime in the community's time zone, or None if no date is recognised
+    """
+    tour_clock = parse_time(time_str or "") or time(14, 0)
+    tour_date = parse_date(date_str or "", now, at=tour_clock)
+    if tour_date is None:
+        return None
+    return combine(tour_date, tour_clock)
+
+
+def format_tour_date(tour_datetime: datetime) -> str:
+    """e.g. "Tuesday, October 21" """
+    local = tour_datetime.astimezone(community_timezone())
+    return f"{local.strftime('%A, %B')} {local.day}"
+
+
+def format_tour_time(tour_datetime: datetime) -> str:
+    """e.g. "2:00 PM" """
+    return tour_datetime.astimezone(community_timezone()).strftime("%I:%M %p").lstrip("0")
+
+
+def format_tour_datetime(tour_datetime: datetime) -> str:
+    """e.g. "Tuesday, October 21 at 2:00 PM" """
+    return f"{format_tour_date(tour_datetime)} at {format_tour_time(tour_datetime)}"
@@ -0,0 +1,164 @@
+"""
+Full-text search over conversation transcripts
+
+Each message in ConversationSession.conversation_history is also stored as a
+TranscriptMessage row. Rows are bulk-inserted without a tsvector and a single
+UPDATE right after (_index_pending) computes it in Postgres for the rows still
+missing one, so the GIN index stays current without re-indexing whole sessions.
+Search ranks matches with ts_rank, highlights snippets with ts_headline and
+pages with a (rank, id) keyset cursor.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from sales_agent.models import ConversationSession, TranscriptMessage
+
+
+def _message_rows(session: ConversationSession, start: int = 0) -> List[TranscriptMessage]:
+    rows = []
+    for position, message in enumerate(session.conversation_history[start:], start=start):
+        timestamp = parse_datetime(message.get("timestamp") or "") or session.updated_at or timezone.now()
+        rows.append(TranscriptMessage(
+            session=session,
+            position=position,
+            role=message.get("role", ""),
+            content=message.get("content") or "",
+            created_at=timestamp,
+        ))
+    return rows
+
+
+def _index_pending(session_ids: Iterable) -> int:
+    """Compute search vectors for newly written messages"""
+    return TranscriptMessage.objects.filter(
+        session_id__in=session_ids,
+        search_vector__isnull=True,
+    ).update(search_vector=SearchVector('content', config=settings.TRANSCRIPT_SEARCH_CONFIG))
+
+
+def record_messages(session: ConversationSession, start: int) -> int:
+    """
+    Store a session's messages from a history position on (the turn just saved)
+
+    Args:
+        session: Saved session
+        start: First conversation_history index to store
+
+    Returns:
+        Number of messages indexed
+    """
+    TranscriptMessage.objects.bulk_create(_message_rows(session, start), ignore_conflicts=True)
+    return _index_pending([session.session_id])
+
+
+def backfill_sessions(sessions: List[ConversationSession]) -> int:
+    """
+    Store and index every message of existing sessions; already stored positions are kept
+
+    Returns:
+        Number of messages indexed
+    """
+    rows = [row for session in sessions for row in _message_rows(session)]
+    TranscriptMessage.objects.bulk_create(rows, ignore_conflicts=True, batch_size=1000)
+    return _index_pending([session.session_id for session in sessions])
+
+
+def encode_cursor(rank: float, message_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, message_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor
+    """
+    try:
+        rank, message_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(message_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _split_page(rows: List[Dict], limit: int) -> tuple:
+    """Trim rows fetched with limit + 1 to a page and its next_cursor (None on the last page)"""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1]['rank'], page[-1]['id'])
+
+
+def search_transcripts(
+    query: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    role: Optional[str] = None,
+    since: Optional[datetime] = None
+) -> Dict:
+    """
+    Ranked transcript search with highlighted snippets
+
+    Args:
+        query: Web-search syntax ("hospital discharge", "medicaid -veterans", '"memory care"')
+        limit: Hits per page (defaults to settings.TRANSCRIPT_SEARCH_PAGE_SIZE)
+        cursor: next_cursor from the previous page
+        role: Only user or assistant messages
+        since: Only messages sent at or after this time
+
+    Returns:
+        {"results": [...], "next_cursor": str or None}
+    """
+    # A negative limit would become an empty or negative slice
+    limit = max(1, min(limit or settings.TRANSCRIPT_SEARCH_PAGE_SIZE, settings.TRANSCRIPT_SEARCH_MAX_PAGE_SIZE))
+    config = settings.TRANSCRIPT_SEARCH_CONFIG
+    search_query = SearchQuery(query, search_type='websearch', config=config)
+
+    # ts_rank is real (float4); as double precision the rank round-trips exactly
+    # through the JSON cursor, so the boundary row compares equal on the next page
+    messages = TranscriptMessage.objects.filter(search_vector=search_query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), search_query), FloatField())
+    )
+    if role:
+        messages = messages.filter(role=role)
+    if since:
+        messages = messages.filter(created_at__gte=since)
+    if cursor:
+        after_rank, after_id = decode_cursor(cursor)
+        messages = messages.filter(Q(rank__lt=after_rank) | Q(rank=after_rank, id__lt=after_id))
+
+    # Headlines are computed only for the page that is returned
+    page = list(messages.annotate(
+        snippet=SearchHeadline(
+            'content', search_query, config=config,
+            start_sel='<mark>', stop_sel='</mark>', min_words=10, max_words=30,
+        )
+    ).order_by('-rank', '-id').values(
+        'id', 'session_id', 'position', 'role', 'snippet', 'rank', 'created_at',
+        prospect_id=F('session__prospect_id'),
+    )[:limit + 1])
+    page, next_cursor = _split_page(page, limit)
+
+    return {
+        "results": [
+            {
+                "message_id": row['id'],
+                "session_id": str(row['session_id']),
+                "prospect_id": str(row['prospect_id']) if row['prospect_id'] else None,
+                "position": row['position'],
+                "role": row['role'],
+                "snippet": row['snippet'],
+                "rank": row['rank'],
+                "created_at": row['created_at'].isoformat(),
+            }
+            for row in page
+        ],
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,312 @@
+"""
+Prospect understanding: the enrichment event reducer and its projection table
+
+`reduce_events` folds enrichment events into the understanding dict shown to the
+user (ConversationSession.current_understanding). The same reducer keeps the
+per-prospect ProspectUnderstanding row current: `record_enrichment_events`
+writes a turn's EnrichmentEvent rows and applies them to the projection in one
+transaction, so admin list filters are indexed column lookups.
+"""
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+
+from sales_agent.models import ConversationSession, EnrichmentEvent, ProspectUnderstanding
+
+
+# Understanding keys stored as projection columns (contact details live on Prospect)
+PROJECTED_FIELDS = (
+    "budget_interest",
+    "care_needs",
+    "timeline",
+    "preferences",
+    "financing_interests",
+    "tour_interest",
+    "tour_scheduled",
+)
+LIST_FIELDS = ("care_needs", "preferences", "financing_interests")
+
+
+def apply_event(understanding: Dict, event: Dict) -> Dict:
+    """
+    Apply one enrichment event to an understanding dict (in place)
+
+    Args:
+        understanding: Current understanding
+        event: {"event_type": ..., "event_data": {...}}
+
+    Returns:
+        The updated understanding
+    """
+    event_type = event.get("event_type")
+    event_data = event.get("event_data") or {}
+
+    if event_type == "budget_inquiry":
+        # Just track that they asked about pricing, don't assume a budget
+        understanding["budget_interest"] = "Inquired about pricing"
+
+    elif event_type == "budget_mentioned":
+        if event_data.get("range"):
+            understanding["budget_interest"] = event_data["range"]
+        elif event_data.get("max"):
+            understanding["budget_interest"] = f"Up to ${event_data['max']}/month"
+
+    elif event_type == "care_need_expressed":
+        care_needs = understanding.get("care_needs", [])
+        if event_data.get("condition"):
+            care_needs.append(event_data["condition"].title())
+        if event_data.get("care_level"):
+            care_needs.append(event_data["care_level"].replace("_", " ").title())
+        understanding["care_needs"] = list(dict.fromkeys(care_needs))  # dedupe, keep order
+
+    elif event_type == "timeline_shared":
+        urgency = event_data.get("urgency") or "Exploring options"
+        understanding["timeline"] = urgency.title()
+
+    elif event_type == "preference_stated":
+        prefs = understanding.get("preferences", [])
+        category = event_data.get("category") or ""
+        detail = event_data.get("detail") or ""
+        if category:
+            prefs.append(f"{category.replace('_', ' ').title()}: {detail}")
+            understanding["preferences"] = prefs
+
+    elif event_type == "tour_requested":
+        understanding["tour_interest"] = "High - wants to visit"
+
+    elif event_type == "tour_scheduled":
+        tour_date = event_data.get("date")
+        tour_time = event_data.get("time")
+        if tour_date and tour_time:
+            understanding["tour_scheduled"] = f"{tour_date} at {tour_time}"
+        elif tour_date or tour_time:
+            understanding["tour_scheduled"] = tour_date or tour_time
+
+    elif event_type == "contact_shared":
+        # Collect contact information
+        if event_data.get("name"):
+            understanding["name"] = event_data["name"]
+        if event_data.get("email"):
+            understanding["email"] = event_data["email"]
+        if event_data.get("phone"):
+            understanding["phone"] = event_data["phone"]
+
+    elif event_type == "financing_inquiry":
+        # Track what financing options they asked about
+        financing_interests = understanding.get("financing_interests", [])
+        financing_type = event_data.get("financing_type", "Payment options")
+        if financing_type not in financing_interests:
+            financing_interests.append(financing_type)
+        understanding["financing_interests"] = financing_interests
+
+    return understanding
+
+
+def reduce_events(understanding: Optional[Dict], events: Iterable[Dict]) -> Dict:
+    """
+    Fold enrichment events, oldest first, into an understanding dict
+
+    Args:
+        understanding: Starting understanding ({} or None to rebuild from scratch)
+        events: Event dicts in creation order
+
+    Returns:
+        The updated understanding
+    """
+    understanding = understanding if understanding is not None else {}
+    for event in events:
+        apply_event(understanding, event)
+    return understanding
+
+
+def tour_status(understanding: Dict) -> str:
+    """Tour status column value for an understanding"""
+    if understanding.get("tour_scheduled"):
+        return ProspectUnderstanding.TOUR_STATUS_SCHEDULED
+    if understanding.get("tour_interest"):
+        return ProspectUnderstanding.TOUR_STATUS_REQUESTED
+    return ProspectUnderstanding.TOUR_STATUS_NONE
+
+
+def projection_to_dict(projection: Optional[ProspectUnderstanding]) -> Dict:
+    """Understanding dict (empty values omitted) from a projection row"""
+    if projection is None:
+        return {}
+    understanding = {}
+    for field in PROJECTED_FIELDS:
+        value = getattr(projection, field)
+        if value:
+            understanding[field] = list(value) if field in LIST_FIELDS else value
+    return understanding
+
+
+def prospect_understanding(prospect, projection: Optional[ProspectUnderstanding]) -> Dict:
+    """
+    Understanding dict for the admin prospect list: the projection plus the
+    contact details (name, email, phone) the chat view copies onto the Prospect
+    """
+    understanding = projection_to_dict(projection)
+    name = " ".join(part for part in (prospect.first_name, prospect.last_name) if part)
+    for key, value in (("name", name), ("email", prospect.email), ("phone", prospect.phone)):
+        if value:
+            understanding[key] = value
+    return understanding
+
+
+def _column_value(model, field: str, value):
+    """Fit an understanding value to its projection column"""
+    column = model._meta.get_field(field)
+    if field in LIST_FIELDS:
+        return [str(item)[:column.base_field.max_length] for item in value or []]
+    return str(value)[:column.max_length] if value else None
+
+
+def apply_to_projection(projection: ProspectUnderstanding, events: List[Dict]) -> ProspectUnderstanding:
+    """
+    Apply events to a projection row in memory (the caller saves it)
+
+    Args:
+        projection: Row to update (a historical model instance works too, for migrations)
+        events: Event dicts in creation order; "created_at" is used when present
+    """
+    understanding = reduce_events(projection_to_dict(projection), events)
+    for field in PROJECTED_FIELDS:
+        setattr(projection, field, _column_value(type(projection), field, understanding.get(field)))
+    projection.tour_status = tour_status(understanding)
+    projection.event_count += len(events)
+
+    timestamps = [event["created_at"] for event in events if event.get("created_at")]
+    if timestamps:
+        latest = max(timestamps)
+        if projection.last_event_at is None or latest > projection.last_event_at:
+            projection.last_event_at = latest
+    return projection
+
+
+def record_enrichment_events(
+    session: ConversationSession,
+    events: List[Dict],
+    extracted_by_agent: str,
+    source_message: str
+) -> List[EnrichmentEvent]:
+    """
+    Save a turn's enrichment events and update the prospect's projection atomically
+
+    Args:
+        session: Session the events were extracted in
+        events: Event dicts from the workflow (event_type, event_data, confidence, source_message)
+        extracted_by_agent: Agent name stored on each event
+        source_message: User message, used when an event doesn't carry its own
+
+    Returns:
+        Created EnrichmentEvent rows
+    """
+    if not events:
+        return []
+
+    rows = [
+        EnrichmentEvent(
+            session=session,
+            event_type=event.get("event_type"),
+            event_data=event.get("event_data", {}),
+            extracted_by_agent=extracted_by_agent,
+            source_message=event.get("source_message", source_message),
+            confidence=event.get("confidence", 1.0)
+        )
+        for event in events
+    ]
+
+    with transaction.atomic():
+        EnrichmentEvent.objects.bulk_create(rows)
+        if session.prospect_id:
+            # Row lock serialises concurrent turns for the same prospect
+            projection, _created = ProspectUnderstanding.objects.select_for_update().get_or_create(
+                prospect_id=session.prospect_id
+            )
+            apply_to_projection(projection, [
+                {"event_type": row.event_type, "event_data": row.event_data, "created_at": row.created_at}
+                for row in rows
+            ])
+            projection.save()
+
+    return rows
+
+
+def replay_sessions(
+    session_ids: List,
+    chunk_size: int = 2000,
+    batch_size: int = 500,
+    projections: bool = True,
+    dry_run: bool = False
+) -> Dict:
+    """
+    Rebuild current_understanding (and projections) for sessions from their events
+
+    Events are streamed with a server-side cursor ordered by prospect, session
+    and creation time, so memory is bounded by one prospect's events. Pass every
+    session of a prospect in the same call when rebuilding projections.
+
+    Args:
+        session_ids: Sessions to rebuild
+        chunk_size: Rows fetched per cursor round trip
+        batch_size: Rows per bulk_update / upsert statement
+        projections: Also rebuild each prospect's ProspectUnderstanding row
+        dry_run: Compute without writing
+
+    Returns:
+        {"sessions": n, "events": n, "projections": n}
+    """
+    rows = EnrichmentEvent.objects.filter(
+        session_id__in=session_ids
+    ).order_by(
+        'session__prospect_id', 'session_id', 'created_at'
+    ).values_list(
+        'session__prospect_id', 'session_id', 'event_type', 'event_data', 'created_at'
+    ).iterator(chunk_size=chunk_size)
+
+    sessions = []
+    projection_rows = []
+    counts = {"sessions": 0, "events": 0, "projections": 0}
+
+    def flush(force=False):
+        if len(sessions) >= batch_size or (force and sessions):
+            if not dry_run:
+                ConversationSession.objects.bulk_update(sessions, ['current_understanding'], batch_size=batch_size)
+            sessions.clear()
+        if len(projection_rows) >= batch_size or (force and projection_rows):
+            if not dry_run:
+                ProspectUnderstanding.objects.bulk_create(
+                    projection_rows,
+                    update_conflicts=True,
+                    unique_fields=['prospect'],
+                    update_fields=[*PROJECTED_FIELDS, 'tour_status', 'event_count', 'last_event_at', 'updated_at'],
+                    batch_size=batch_size
+                )
+            projection_rows.clear()
+
+    for prospect_id, prospect_rows in groupby(rows, key=itemgetter(0)):
+        prospect_events = []
+        for session_id, session_rows in groupby(prospect_rows, key=itemgetter(1)):
+            events = [
+                {"event_type": event_type, "event_data": event_data, "created_at": created_at}
+                for _prospect_id, _session_id, event_type, event_data, created_at in session_rows
+            ]
+            sessions.append(
+                ConversationSession(session_id=session_id, current_understanding=reduce_events({}, events))
+            )
+            counts["sessions"] += 1
+            counts["events"] += len(events)
+            prospect_events.extend(events)
+
+        if projections and prospect_id is not None:
+            # Sessions can overlap in time, so the projection folds the prospect's events chronologically
+            prospect_events.sort(key=itemgetter("created_at"))
+            projection_rows.append(apply_to_projection(ProspectUnderstanding(prospect_id=prospect_id), prospect_events))
+            counts["projections"] += 1
+
+        flush()
+
+    flush(force=True)
+    return counts
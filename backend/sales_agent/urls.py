@@ -10,7 +10,14 @@ urlpatterns = [
 
     # Admin endpoints
     path('admin/prospects', views.list_prospects, name='list_prospects'),
+    path('admin/prospects/search', views.search_prospects, name='search_prospects'),
     path('admin/prospects/<uuid:prospect_id>', views.prospect_detail, name='prospect_detail'),
+    path('admin/knowledge', views.knowledge_list, name='knowledge_list'),
+    path('admin/knowledge/<uuid:knowledge_id>', views.knowledge_detail, name='knowledge_detail'),
+    path('admin/metrics', views.metrics, name='metrics'),
+    path('admin/analytics', views.analytics, name='analytics'),
+    path('admin/search', views.search_transcripts, name='search_transcripts'),
+    path('admin/export/<str:dataset>.<str:export_format>', views.export_data, name='export_data'),
 
     # Test endpoints
     path('test/agent/<str:agent_name>', views.test_agent, name='test_agent'),
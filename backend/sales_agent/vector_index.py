@@ -0,0 +1,334 @@
+"""
+Category-partitioned nearest neighbour search over the knowledge base
+
+A category filter applied to one global vector ordering either bypasses an ANN
+index (exact scan of the whole table) or post-filters its candidates and
+returns fewer than top_k. Instead each category is searched on its own and the
+per-category results are merged by distance:
+
+- small categories (at most RAG_EXACT_SCAN_MAX_ITEMS items) are held as
+  in-memory float32 matrices and scanned exactly with numpy
+- larger categories are queried in Postgres, where the version and category
+  predicates match that (version, category)'s partial HNSW index
+
+Either way every category contributes its own complete top_k.
+
+Searches read the active EmbeddingVersion only, and queries are embedded with
+that version's model and dimensions, so a version being built alongside is
+never seen until it is switched to. The active version is part of the
+knowledge fingerprint, so every worker picks up a switch within
+RAG_KNOWLEDGE_INDEX_TTL.
+
+Embeddings are stored at full precision. The HNSW indexes hold a compact copy
+(halfvec, or binary-quantized bits compared by Hamming distance, per
+settings.RAG_VECTOR_STORAGE) as expression indexes over the embedding column;
+ANN candidates (top_k * RAG_RERANK_FACTOR) are re-ranked by their
+full-precision L2 distance. The indexes depend on each version's size, so they
+are (re)built by ensure_ann_indexes() rather than by a migration.
+
+With settings.RAG_EMBEDDING_SNAPSHOT the in-memory matrices are read-only
+slices of a memory-mapped snapshot file shared by all workers on the host
+(see sales_agent/snapshot.py).
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.db.models.expressions import RawSQL
+from pgvector.django import L2Distance
+
+from sales_agent.knowledge_index import KnowledgeCache
+from sales_agent.models import KNOWLEDGE_CATEGORIES, EmbeddingVersion, KnowledgeEmbedding
+from sales_agent.snapshot import get_snapshot
+
+
+PLAN_EXACT = "exact"  # In-memory scan of the category matrix
+PLAN_ANN = "ann"  # Postgres query served by the category's partial HNSW index
+
+STORAGE_HALFVEC = "halfvec"
+STORAGE_BINARY = "binary"
+VECTOR_STORAGES = (STORAGE_HALFVEC, STORAGE_BINARY)
+
+ANN_INDEX_PREFIX = "knowledge_ann_"
+
+# Indexed expression, its operator class and the matching distance to a query vector (%s)
+ANN_EXPRESSIONS = {
+    STORAGE_HALFVEC: (
+        "(embedding::halfvec({dims}))",
+        "halfvec_l2_ops",
+        "(embedding::halfvec({dims})) <-> (%s::vector({dims})::halfvec({dims}))",
+    ),
+    STORAGE_BINARY: (
+        "(binary_quantize(embedding)::bit({dims}))",
+        "bit_hamming_ops",
+        "(binary_quantize(embedding)::bit({dims})) <~> binary_quantize(%s::vector({dims}))",
+    ),
+}
+
+
+class CategoryVectors:
+    """
+    Category sizes plus in-memory embedding matrices for the categories scanned exactly,
+    all for one embedding version
+    """
+
+    def __init__(
+        self,
+        version: Optional[EmbeddingVersion],
+        sizes: Dict[str, int],
+        items: Dict[str, List[Dict]],
+        matrices: Dict[str, np.ndarray]
+    ):
+        """
+        Args:
+            version: Active embedding version (None before the knowledge base is embedded)
+            sizes: Item count per category (all categories)
+            items: Knowledge items per exactly scanned category, in matrix row order
+            matrices: (n, dimensions) float32 embeddings per exactly scanned category
+        """
+        self.version = version
+        self.sizes = sizes
+        self.items = items
+        self.matrices = matrices
+
+    def plan(self, category: str) -> str:
+        """How a category is searched"""
+        return PLAN_EXACT if category in self.matrices else PLAN_ANN
+
+    def search(self, query_embedding: np.ndarray, category: str, top_k: int) -> List[Tuple[Dict, float]]:
+        """
+        Exact L2 nearest neighbours within an in-memory category
+
+        Returns:
+            List of (item, distance) tuples, nearest first
+        """
+        matrix = self.matrices[category]
+        distances = np.linalg.norm(matrix - query_embedding, axis=1)
+        if top_k < len(distances):
+            nearest = np.argpartition(distances, top_k)[:top_k]
+            nearest = nearest[np.argsort(distances[nearest])]
+        else:
+            nearest = np.argsort(distances)
+        return [(self.items[category][i], float(distances[i])) for i in nearest]
+
+
+def active_version() -> Optional[EmbeddingVersion]:
+    """The embedding version retrieval reads, or None"""
+    return EmbeddingVersion.objects.filter(status=EmbeddingVersion.STATUS_ACTIVE).first()
+
+
+def build_category_vectors() -> CategoryVectors:
+    """
+    Load the active version's embeddings of every category small enough to scan exactly
+
+    Returns:
+        CategoryVectors for the current knowledge base
+    """
+    version = active_version()
+    if version is None:
+        return CategoryVectors(None, {}, {}, {})
+
+    embeddings_qs = KnowledgeEmbedding.objects.filter(version=version)
+    sizes = {
+        row['category']: row['count']
+        for row in embeddings_qs.values('category').annotate(count=Count('id')).order_by()
+    }
+    exact_categories = [category for category, size in sizes.items() if size <= settings.RAG_EXACT_SCAN_MAX_ITEMS]
+
+    # With a matching snapshot the vectors come from its memory map, not the database
+    snapshot = get_snapshot(version)
+    fields = ['knowledge_id', 'category', 'knowledge__content', 'knowledge__metadata']
+    if snapshot is None:
+        fields.append('embedding')
+
+    items: Dict[str, List[Dict]] = {category: [] for category in exact_categories}
+    embeddings: Dict[str, List] = {category: [] for category in exact_categories}
+    rows = embeddings_qs.filter(category__in=exact_categories).values_list(*fields).order_by('knowledge_id')
+    for item_id, category, content, metadata, *embedding in rows.iterator(chunk_size=1000):
+        items[category].append({
+            'id': str(item_id),
+            'category': category,
+            'content': content,
+            'metadata': metadata,
+        })
+        embeddings[category].extend(embedding)
+
+    if snapshot is None:
+        matrices = {
+            category: np.asarray(vectors, dtype=np.float32)
+            for category, vectors in embeddings.items()
+            if vectors
+        }
+    else:
+        def fetch_embeddings(ids):
+            return {
+                str(item_id): embedding
+                for item_id, embedding in embeddings_qs.filter(knowledge_id__in=ids).values_list('knowledge_id', 'embedding')
+            }
+
+        matrices = {
+            category: snapshot.category_matrix(category_items, fetch_embeddings)
+            for category, category_items in items.items()
+            if category_items
+        }
+    return CategoryVectors(version, sizes, items, matrices)
+
+
+def _ann_expression(part: int, dimensions: int) -> str:
+    storage = settings.RAG_VECTOR_STORAGE
+    if storage not in VECTOR_STORAGES:
+        raise ValueError(f"Unknown vector storage: {storage}. Available: {', '.join(VECTOR_STORAGES)}")
+    return ANN_EXPRESSIONS[storage][part].format(dims=int(dimensions))
+
+
+def _vector_literal(embedding: List[float]) -> str:
+    return "[" + ",".join(str(float(value)) for value in embedding) + "]"
+
+
+def ann_search(
+    query_embedding: List[float],
+    version: EmbeddingVersion,
+    category: str,
+    top_k: int
+) -> List[Tuple[Dict, float]]:
+    """
+    Nearest neighbours within one category of a version from Postgres
+
+    The equality predicates on version and category let the planner use that
+    partial HNSW index over the compact vectors; ef_search is raised to at least
+    the candidate count so the index scan can return them all. Candidates are
+    re-ranked by full-precision L2 distance.
+
+    Returns:
+        List of (item, distance) tuples, nearest first
+    """
+    candidate_count = top_k * max(settings.RAG_RERANK_FACTOR, 1)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL hnsw.ef_search = %s", [max(candidate_count, settings.RAG_HNSW_EF_SEARCH)])
+        rows = list(
+            KnowledgeEmbedding.objects.filter(version=version, category=category)
+            .annotate(
+                ann_distance=RawSQL(_ann_expression(2, version.dimensions), [_vector_literal(query_embedding)]),
+                distance=L2Distance('embedding', query_embedding),
+            )
+            .order_by('ann_distance')
+            .values(
+                'knowledge_id', 'category', 'distance',
+                content=F('knowledge__content'), metadata=F('knowledge__metadata'),
+            )[:candidate_count]
+        )
+    rows.sort(key=lambda row: row['distance'])
+    return [
+        (
+            {
+                'id': str(row['knowledge_id']),
+                'category': row['category'],
+                'content': row['content'],
+                'metadata': row['metadata'],
+            },
+            row['distance'],
+        )
+        for row in rows[:top_k]
+    ]
+
+
+def ann_index_name(version: EmbeddingVersion, category: str) -> str:
+    """Index name encoding the version and storage it was built for"""
+    return f"{ANN_INDEX_PREFIX}v{version.id}_{settings.RAG_VECTOR_STORAGE}_{category}"
+
+
+def ensure_ann_indexes() -> Dict[str, List[str]]:
+    """
+    Build the partial HNSW indexes of every embedding version, dropping those of deleted versions
+
+    Retired versions keep their indexes until garbage collection deletes them,
+    since workers that have not noticed a switch yet still read them.
+    Runs CREATE/DROP INDEX CONCURRENTLY, so it must be called outside a transaction.
+
+    Returns:
+        {"created": [...], "dropped": [...]} index names
+    """
+    table = KnowledgeEmbedding._meta.db_table
+    wanted = {
+        ann_index_name(version, category): (version, category)
+        for version in EmbeddingVersion.objects.all()
+        for category in KNOWLEDGE_CATEGORIES
+    }
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = %s AND indexname LIKE %s",
+            [table, ANN_INDEX_PREFIX.replace("_", r"\_") + "%"]
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+
+        dropped = sorted(existing - set(wanted))
+        for name in dropped:
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+        created = []
+        for name, (version, category) in wanted.items():
+            if name in existing:
+                continue
+            cursor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" '
+                f'USING hnsw ({_ann_expression(0, version.dimensions)} {_ann_expression(1, version.dimensions)}) '
+                f'WITH (m = 16, ef_construction = 64) WHERE version_id = %s AND category = %s',
+                [version.id, category]
+            )
+            created.append(name)
+
+    return {"created": created, "dropped": dropped}
+
+
+def partitioned_search(
+    query_embedding: List[float],
+    vectors: CategoryVectors,
+    category_filter: Optional[List[str]] = None,
+    top_k: int = 5
+) -> List[Tuple[Dict, float]]:
+    """
+    Nearest neighbours across categories, each searched with its own plan
+
+    Args:
+        query_embedding: Query vector, embedded with vectors.version
+        vectors: Category vectors the query was embedded for (get_category_vectors())
+        category_filter: Categories to search (all categories when omitted)
+        top_k: Number of results to return
+
+    Returns:
+        List of (item, distance) tuples, nearest first
+    """
+    if vectors.version is None:
+        return []
+
+    categories = [
+        category for category in (category_filter or vectors.sizes)
+        if vectors.sizes.get(category)
+    ]
+
+    query_vector = np.asarray(query_embedding, dtype=np.float32)
+    candidates = []
+    for category in categories:
+        if vectors.plan(category) == PLAN_EXACT:
+            candidates.extend(vectors.search(query_vector, category, top_k))
+        else:
+            candidates.extend(ann_search(query_embedding, vectors.version, category, top_k))
+
+    return sorted(candidates, key=lambda candidate: candidate[1])[:top_k]
+
+
+_vectors_cache = KnowledgeCache(build_category_vectors)
+
+
+def get_category_vectors() -> CategoryVectors:
+    """Get the current process-wide category vectors"""
+    return _vectors_cache.get()
+
+
+def invalidate_category_vectors():
+    """Force the next get_category_vectors() call to reload"""
+    _vectors_cache.invalidate()
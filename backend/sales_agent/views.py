@@ -2,80 +2,25 @@
 API views for sales agent conversation and admin endpoints
 """
 import uuid
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-import re
 
 from sales_agent.models import Prospect, ConversationSession, EnrichmentEvent
-from sales_agent.agents.workflow import compiled_workflow
+from sales_agent.llm_governor import DeadlineExceeded, ProviderUnavailable, get_governor
+from sales_agent.segments import apply_segment_filters
+from sales_agent.tour_time import local_now, parse_tour_datetime
+from sales_agent.transcripts import record_messages
+from sales_agent.understanding import prospect_understanding, record_enrichment_events
+from sales_agent.warmup import warm_up
 
-
-def parse_tour_datetime(date_str, time_str):
-    """
-    Parse relative date and time strings into a timezone-aware datetime object.
-    Examples: "Tuesday", "next Monday", "2 PM", "10:30 AM"
-    """
-    try:
-        from datetime import datetime as dt
-        import pytz
-
-        # Get the timezone from Django settings (default to America/Los_Angeles)
-        tz = pytz.timezone('America/Los_Angeles')
-        now = timezone.now().astimezone(tz)
-
-        # Parse time
-        time_match = re.search(r'(\d{1,2})(?::(\d{2}))?\s*(AM|PM|am|pm)', time_str or "")
-        if time_match:
-            hour = int(time_match.group(1))
-            minute = int(time_match.group(2) or 0)
-            period = time_match.group(3).upper()
-
-            if period == "PM" and hour != 12:
-                hour += 12
-            elif period == "AM" and hour == 12:
-                hour = 0
-        else:
-            hour, minute = 14, 0  # Default to 2 PM
-
-        # Parse date - handle day names
-        days_of_week = {
-            'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-            'friday': 4, 'saturday': 5, 'sunday': 6
-        }
-
-        date_lower = (date_str or "").lower()
-        target_day = None
-
-        for day_name, day_num in days_of_week.items():
-            if day_name in date_lower:
-                target_day = day_num
-                break
-
-        if target_day is not None:
-            current_day = now.weekday()
-            days_ahead = target_day - current_day
-
-            # If "next" is in the string, add 7 days
-            if "next" in date_lower:
-                days_ahead += 7
-            elif days_ahead <= 0:
-                days_ahead += 7  # Move to next week if day has passed
-
-            # Create a naive datetime for the target date/time
-            target_date = now.date() + timedelta(days=days_ahead)
-            naive_datetime = dt.combine(target_date, dt.min.time().replace(hour=hour, minute=minute))
-
-            # Make it timezone-aware in the local timezone
-            tour_datetime = tz.localize(naive_datetime)
-            return tour_datetime
-
-        return None
-    except Exception as e:
-        print(f"Error parsing tour datetime: {e}")
-        return None
+# The agent workflow (LangGraph, LangChain, OpenAI) is imported inside the views
+# that use it, so admin endpoints, migrations and tests don't pay for it
 
 
 @api_view(['POST'])
@@ -89,7 +34,8 @@ def chat(request):
     {
         "session_id": "optional-session-uuid",
         "message": "User's message",
-        "prospect_id": "optional-prospect-uuid"
+        "prospect_id": "optional-prospect-uuid",
+        "workflow_mode": "optional sequential|combined (defaults to settings)"
     }
 
     Response:
@@ -98,14 +44,20 @@ def chat(request):
         "prospect_id": "uuid",
         "response": "Agent's response",
         "intent": "pricing|tour_scheduling|amenities|financing|general_info",
-        "current_understanding": {...}
+        "current_understanding": {...},
+        "workflow_mode": "sequential|combined",
+        "skipped_nodes": ["extract_enrichment"],  // non-essential nodes skipped to meet the deadline
+        "degraded": false  // true when answered from knowledge base templates without the LLM
     }
     """
     try:
+        from sales_agent.agents.workflow import get_workflow, initial_state, WORKFLOW_MODES
+
         # Extract request data
         user_message = request.data.get('message')
         session_id = request.data.get('session_id')
         prospect_id = request.data.get('prospect_id')
+        workflow_mode = request.data.get('workflow_mode') or settings.SALES_AGENT_WORKFLOW_MODE
 
         if not user_message:
             return Response(
@@ -113,6 +65,12 @@ def chat(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        if workflow_mode not in WORKFLOW_MODES:
+            return Response(
+                {"error": f"Invalid workflow mode. Available: {', '.join(WORKFLOW_MODES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         # Get or create prospect
         if prospect_id:
             try:
@@ -143,19 +101,16 @@ def chat(request):
             )
 
         # Prepare workflow state
-        state = {
-            "session_id": str(session.session_id),
-            "user_message": user_message,
-            "conversation_history": session.conversation_history,
-            "intent": "",
-            "agent_response": "",
-            "rag_context": [],
-            "enrichment_events": [],
-            "current_understanding": session.current_understanding
-        }
+        state = initial_state(
+            session_id=str(session.session_id),
+            user_message=user_message,
+            conversation_history=session.conversation_history,
+            current_understanding=session.current_understanding,
+            tour_booking=session.tour_booking,
+        )
 
         # Execute workflow
-        result = compiled_workflow.invoke(state)
+        result = get_workflow(workflow_mode).invoke(state)
 
         # Update conversation history
         session.conversation_history.append({
@@ -167,23 +122,29 @@ def chat(request):
             "role": "assistant",
             "content": result["agent_response"],
             "timestamp": timezone.now().isoformat(),
-            "intent": result["intent"]
+            "intent": result["intent"],
+            "llm_usage": result.get("llm_usage", []),
+            "skipped_nodes": result.get("skipped_nodes", []),
+            "hedged_nodes": result.get("hedged_nodes", []),
+            "model_decisions": result.get("model_decisions", []),
+            "degraded": result.get("degraded", False)
         })
 
-        # Update current understanding
+        # Update current understanding and tour booking progress
         session.current_understanding = result["current_understanding"]
+        session.tour_booking = result.get("tour_booking", {})
         session.save()
 
-        # Save enrichment events to database
-        for event in result.get("enrichment_events", []):
-            EnrichmentEvent.objects.create(
-                session=session,
-                event_type=event.get("event_type"),
-                event_data=event.get("event_data", {}),
-                extracted_by_agent=result["intent"] + "_agent",
-                source_message=event.get("source_message", user_message),
-                confidence=event.get("confidence", 1.0)
-            )
+        # Index the turn's two messages for transcript search
+        record_messages(session, start=len(session.conversation_history) - 2)
+
+        # Save enrichment events and update the prospect's understanding projection
+        record_enrichment_events(
+            session,
+            result.get("enrichment_events", []),
+            extracted_by_agent=result["intent"] + "_agent",
+            source_message=user_message
+        )
 
         # Update prospect with contact information if collected
         understanding = result["current_understanding"]
@@ -201,7 +162,16 @@ def chat(request):
         if understanding.get("phone") and not prospect.phone:
             prospect.phone = understanding["phone"]
             prospect_updated = True
-        if understanding.get("tour_scheduled"):
+        booking = result.get("tour_booking", {})
+        if booking.get("stage") == "confirmed" and booking.get("tour_at"):
+            # Booked through the tour booking state machine, time already resolved
+            booking_datetime = datetime.fromisoformat(booking["tour_at"])
+            if not prospect.tour_scheduled or prospect.tour_datetime != booking_datetime:
+                prospect.tour_scheduled = True
+                prospect.tour_datetime = booking_datetime
+                prospect.tour_slot_id = booking.get("slot_id")
+                prospect_updated = True
+        elif understanding.get("tour_scheduled"):
             # Parse and store the tour datetime
             prospect.tour_scheduled = True
 
@@ -231,9 +201,23 @@ def chat(request):
             "prospect_id": str(prospect.prospect_id),
             "response": result["agent_response"],
             "intent": result["intent"],
-            "current_understanding": result["current_understanding"]
+            "current_understanding": result["current_understanding"],
+            "workflow_mode": workflow_mode,
+            "skipped_nodes": result.get("skipped_nodes", []),
+            "degraded": result.get("degraded", False)
         })
 
+    except DeadlineExceeded as e:
+        return Response(
+            {"error": f"Assistant took too long to respond: {str(e)}"},
+            status=status.HTTP_504_GATEWAY_TIMEOUT
+        )
+    except ProviderUnavailable as e:
+        return Response(
+            {"error": f"Assistant temporarily unavailable: {str(e)}"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
     except Exception as e:
         return Response(
             {"error": f"Internal server error: {str(e)}"},
@@ -248,6 +232,18 @@ def list_prospects(request):
 
     List all prospects with their conversation summaries
 
+    Query parameters (optional, combined with AND; see sales_agent/segments.py):
+        care_need: Prospects with this care need, e.g. "Dementia"
+        financing: Prospects who asked about this financing type, e.g. "Medicaid"
+        tour_status: none|requested|scheduled
+        timeline: Exact timeline, e.g. "Immediate"
+        budget_interest: Exact budget interest, e.g. "$3000-$4000"
+        understanding: JSON a session's understanding contains, e.g. {"care_needs": ["Dementia"]}
+        understanding.<key>: One understanding value, e.g. understanding.timeline=Immediate
+        event_type: Prospects with an event of this type (narrows event_data filters)
+        event_data: JSON one event's data contains, e.g. {"financing_type": "Medicaid"}
+        event_data.<key>: One event data value, e.g. event_data.condition=dementia
+
     Response:
     {
         "prospects": [
@@ -259,6 +255,7 @@ def list_prospects(request):
                 "phone": "string",
                 "tour_scheduled": boolean,
                 "tour_datetime": "iso-datetime",
+                "tour_status": "none|requested|scheduled",
                 "total_sessions": number,
                 "last_interaction": "iso-datetime",
                 "current_understanding": {...}
@@ -267,15 +264,23 @@ def list_prospects(request):
     }
     """
     try:
-        prospects = Prospect.objects.all().order_by('-created_at')
+        # One query: understanding comes from the ProspectUnderstanding projection
+        prospects = Prospect.objects.select_related('understanding').annotate(
+            total_sessions=Count('sessions'),
+            last_interaction=Max('sessions__updated_at')
+        ).order_by('-created_at')
+
+        try:
+            prospects = apply_segment_filters(prospects, request.query_params)
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         prospects_data = []
         for prospect in prospects:
-            # Get latest session for this prospect
-            latest_session = ConversationSession.objects.filter(
-                prospect=prospect
-            ).order_by('-updated_at').first()
-
+            projection = getattr(prospect, 'understanding', None)
             prospects_data.append({
                 "prospect_id": str(prospect.prospect_id),
                 "first_name": prospect.first_name,
@@ -284,9 +289,10 @@ def list_prospects(request):
                 "phone": prospect.phone,
                 "tour_scheduled": prospect.tour_scheduled,
                 "tour_datetime": prospect.tour_datetime.isoformat() if prospect.tour_datetime else None,
-                "total_sessions": ConversationSession.objects.filter(prospect=prospect).count(),
-                "last_interaction": latest_session.updated_at.isoformat() if latest_session else None,
-                "current_understanding": latest_session.current_understanding if latest_session else {}
+                "tour_status": projection.tour_status if projection else "none",
+                "total_sessions": prospect.total_sessions,
+                "last_interaction": prospect.last_interaction.isoformat() if prospect.last_interaction else None,
+                "current_understanding": prospect_understanding(prospect, projection)
             })
 
         return Response({"prospects": prospects_data})
@@ -298,6 +304,58 @@ def list_prospects(request):
         )
 
 
+@api_view(['GET'])
+def search_prospects(request):
+    """
+    GET /api/admin/prospects/search?q=eric+sm
+
+    Typeahead lookup by partial or misspelled name, email or phone
+
+    Query parameters:
+        q: Search text (at least 2 characters)
+        limit: Maximum results (default settings.PROSPECT_SEARCH_LIMIT, clamped to 1..PROSPECT_SEARCH_MAX_LIMIT)
+
+    Response:
+    {
+        "prospects": [
+            {
+                "prospect_id": "uuid",
+                "first_name": "string",
+                "last_name": "string",
+                "email": "string",
+                "phone": "string",
+                "tour_scheduled": boolean,
+                "score": number  // 0-1, higher is a closer match
+            }
+        ]
+    }
+    """
+    from sales_agent.prospect_search import search_prospects as search
+
+    query = (request.query_params.get('q') or '').strip()
+    if len(query) < 2:
+        return Response({"prospects": []})
+
+    try:
+        try:
+            limit = int(request.query_params.get('limit') or 0) or None
+        except ValueError:
+            return Response(
+                {"error": "limit must be a number"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if limit is not None:
+            # A negative limit would become a negative slice, which querysets reject
+            limit = max(1, limit)
+        return Response({"prospects": search(query, limit=limit)})
+
+    except Exception as e:
+        return Response(
+            {"error": f"Internal server error: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 @api_view(['GET'])
 def prospect_detail(request, prospect_id):
     """
@@ -321,6 +379,7 @@ def prospect_detail(request, prospect_id):
                 "session_id": "uuid",
                 "conversation_history": [...],
                 "current_understanding": {...},
+                "tour_booking": {"stage": "awaiting_time|awaiting_name|awaiting_email|awaiting_phone|confirmed", ...},
                 "created_at": "iso-datetime",
                 "last_interaction": "iso-datetime"
             }
@@ -351,6 +410,7 @@ def prospect_detail(request, prospect_id):
                 "session_id": str(session.session_id),
                 "conversation_history": session.conversation_history,
                 "current_understanding": session.current_understanding,
+                "tour_booking": session.tour_booking,
                 "created_at": session.started_at.isoformat(),
                 "last_interaction": session.updated_at.isoformat()
             })
@@ -397,6 +457,292 @@ def prospect_detail(request, prospect_id):
         )
 
 
+@api_view(['GET', 'POST'])
+def knowledge_list(request):
+    """
+    GET /api/admin/knowledge?category=pricing
+    POST /api/admin/knowledge
+
+    List knowledge base items, or add one (embedded on write; every worker's
+    knowledge caches refresh via LISTEN/NOTIFY)
+
+    Request body (POST):
+    {
+        "category": "pricing",
+        "content": "string",
+        "metadata": {...}  // optional
+    }
+
+    Response:
+    {
+        "items": [
+            {
+                "id": "uuid",
+                "category": "string",
+                "content": "string",
+                "metadata": {...},
+                "created_at": "iso-datetime",
+                "updated_at": "iso-datetime"
+            }
+        ]
+    }
+    (POST returns the created item under "item", 201)
+    """
+    from sales_agent.knowledge_base import create_knowledge, knowledge_to_dict
+    from sales_agent.models import CommunityKnowledge
+
+    try:
+        if request.method == 'POST':
+            try:
+                item = create_knowledge(request.data)
+            except ValueError as e:
+                return Response(
+                    {"error": str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response({"item": knowledge_to_dict(item)}, status=status.HTTP_201_CREATED)
+
+        items = CommunityKnowledge.objects.order_by('category', 'created_at')
+        if request.query_params.get('category'):
+            items = items.filter(category=request.query_params['category'])
+        return Response({"items": [knowledge_to_dict(item) for item in items]})
+
+    except Exception as e:
+        return Response(
+            {"error": f"Internal server error: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
+def knowledge_detail(request, knowledge_id):
+    """
+    GET/PUT/PATCH/DELETE /api/admin/knowledge/{knowledge_id}
+
+    Read, replace, partially update or delete a knowledge base item. Only a
+    content change is re-embedded; metadata edits are not.
+
+    Request body (PUT: category and content required; PATCH: any subset):
+    {
+        "category": "pricing",
+        "content": "string",
+        "metadata": {...}
+    }
+
+    Response:
+    {
+        "item": {"id": "uuid", "category": "string", "content": "string", "metadata": {...}, ...}
+    }
+    (DELETE returns 204)
+    """
+    from sales_agent.knowledge_base import delete_knowledge, knowledge_to_dict, update_knowledge
+    from sales_agent.models import CommunityKnowledge
+
+    not_found = Response(
+        {"error": "Knowledge item not found"},
+        status=status.HTTP_404_NOT_FOUND
+    )
+
+    try:
+        if request.method == 'GET':
+            item = CommunityKnowledge.objects.filter(id=knowledge_id).first()
+            return Response({"item": knowledge_to_dict(item)}) if item else not_found
+
+        if request.method == 'DELETE':
+            if not delete_knowledge(knowledge_id):
+                return not_found
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        try:
+            item = update_knowledge(knowledge_id, request.data, partial=request.method == 'PATCH')
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({"item": knowledge_to_dict(item)}) if item else not_found
+
+    except Exception as e:
+        return Response(
+            {"error": f"Internal server error: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+def export_data(request, dataset, export_format):
+    """
+    GET /api/admin/export/{dataset}.{format}
+
+    Stream prospects, sessions, messages or events as NDJSON or CSV
+
+    Path:
+        dataset: prospects|sessions|messages|events
+        format: ndjson|csv
+
+    Query parameters:
+        updated_since: Optional ISO 8601 time; only rows changed at or after it.
+            Use the previous export's X-Export-Started-At header for incremental exports
+            (rows changed while an export runs may appear in both)
+
+    Response: one JSON object per line (ndjson) or a header row then one row per record (csv)
+    """
+    from sales_agent.exports import CONTENT_TYPES, EXPORT_DATASETS, EXPORT_FORMATS, parse_updated_since, stream_export
+
+    if dataset not in EXPORT_DATASETS:
+        return Response(
+            {"error": f"Invalid dataset. Available: {', '.join(EXPORT_DATASETS)}"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {"error": f"Invalid format. Available: {', '.join(EXPORT_FORMATS)}"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    try:
+        updated_since = parse_updated_since(request.query_params.get('updated_since'))
+    except ValueError as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    started_at = timezone.now()
+    response = StreamingHttpResponse(
+        stream_export(dataset, export_format, updated_since),
+        content_type=CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{dataset}-{started_at:%Y%m%dT%H%M%S}.{export_format}"'
+    response['X-Export-Started-At'] = started_at.isoformat()
+    return response
+
+
+@api_view(['GET'])
+def search_transcripts(request):
+    """
+    GET /api/admin/search?q=hospital+discharge
+
+    Full-text search across all conversation transcripts
+
+    Query parameters:
+        q: Search terms (web search syntax: "quoted phrases", -excluded, or)
+        limit: Hits per page (default settings.TRANSCRIPT_SEARCH_PAGE_SIZE)
+        cursor: next_cursor from the previous page
+        role: Optional user|assistant
+        since: Optional ISO 8601 time; only messages sent at or after it
+
+    Response:
+    {
+        "results": [
+            {
+                "message_id": number,
+                "session_id": "uuid",
+                "prospect_id": "uuid",
+                "position": number,
+                "role": "user|assistant",
+                "snippet": "... after her <mark>hospital</mark> <mark>discharge</mark> ...",
+                "rank": number,
+                "created_at": "iso-datetime"
+            }
+        ],
+        "next_cursor": "string or null"
+    }
+    """
+    from sales_agent.exports import parse_updated_since
+    from sales_agent.transcripts import search_transcripts as search
+
+    query = (request.query_params.get('q') or '').strip()
+    if not query:
+        return Response(
+            {"error": "q is required"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        try:
+            limit = int(request.query_params.get('limit') or 0) or None
+            since = parse_updated_since(request.query_params.get('since'))
+            results = search(
+                query,
+                limit=limit,
+                cursor=request.query_params.get('cursor'),
+                role=request.query_params.get('role'),
+                since=since
+            )
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(results)
+
+    except Exception as e:
+        return Response(
+            {"error": f"Internal server error: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+def analytics(request):
+    """
+    GET /api/admin/analytics
+
+    Funnel and enrichment analytics read from daily rollup tables
+
+    Query parameters:
+        days: Trailing local days to include (default settings.ANALYTICS_DEFAULT_DAYS)
+        start, end: Explicit local date range (YYYY-MM-DD, inclusive) instead of days
+
+    Response:
+    {
+        "start": "YYYY-MM-DD",
+        "end": "YYYY-MM-DD",
+        "funnel": [{"stage": "prospects|budget_inquiry|tour_requested|tour_scheduled", "prospects": number, "conversion_from_previous": number}],
+        "funnel_by_day": [{"day": "YYYY-MM-DD", "stage": "string", "prospects": number}],
+        "event_counts": [{"day": "YYYY-MM-DD", "event_type": "string", "events": number, "prospects": number}],
+        "distributions": {
+            "financing_type": [{"value": "Medicaid", "events": number}],
+            "care_need": [...],
+            "care_level": [...]
+        },
+        "refreshed_at": "iso-datetime"
+    }
+    """
+    from sales_agent.analytics import analytics_summary
+
+    try:
+        today = local_now().date()
+        try:
+            if request.query_params.get('start'):
+                start_day = date.fromisoformat(request.query_params['start'])
+                end_day = date.fromisoformat(request.query_params.get('end') or today.isoformat())
+            else:
+                days = int(request.query_params.get('days') or settings.ANALYTICS_DEFAULT_DAYS)
+                if days < 1:
+                    raise ValueError("days must be at least 1")
+                start_day, end_day = today - timedelta(days=days - 1), today
+        except ValueError as e:
+            return Response(
+                {"error": f"Invalid date range: {str(e)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Read-only: rollups are refreshed by refresh_analytics / the background refresher
+        return Response({
+            "start": start_day.isoformat(),
+            "end": end_day.isoformat(),
+            **analytics_summary(start_day, end_day)
+        })
+
+    except Exception as e:
+        return Response(
+            {"error": f"Internal server error: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 @api_view(['POST'])
 def test_agent(request, agent_name):
     """
@@ -430,6 +776,7 @@ def test_agent(request, agent_name):
         # Map agent names to workflow nodes
         agent_map = {
             "intent": "classify_intent",
+            "analyze": "analyze_turn",
             "pricing": "pricing_agent",
             "tour": "tour_scheduling_agent",
             "amenities": "amenities_agent",
@@ -443,21 +790,19 @@ def test_agent(request, agent_name):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        from sales_agent.agents.workflow import initial_state
+
         # Create minimal state for testing
-        state = {
-            "session_id": str(uuid.uuid4()),
-            "user_message": user_message,
-            "conversation_history": [],
-            "intent": agent_name if agent_name != "intent" else "",
-            "agent_response": "",
-            "rag_context": [],
-            "enrichment_events": [],
-            "current_understanding": {}
-        }
+        state = initial_state(
+            session_id=str(uuid.uuid4()),
+            user_message=user_message,
+            intent=agent_name if agent_name not in ("intent", "analyze") else "",
+        )
 
         # Import and call the specific agent function
         from sales_agent.agents.workflow import (
             classify_intent_node,
+            analyze_turn_node,
             pricing_agent_node,
             tour_scheduling_agent_node,
             amenities_agent_node,
@@ -467,6 +812,7 @@ def test_agent(request, agent_name):
 
         agent_functions = {
             "intent": classify_intent_node,
+            "analyze": analyze_turn_node,
             "pricing": pricing_agent_node,
             "tour": tour_scheduling_agent_node,
             "amenities": amenities_agent_node,
@@ -484,7 +830,10 @@ def test_agent(request, agent_name):
             "rag_context": result.get("rag_context", []),
             "metadata": {
                 "intent": result.get("intent"),
-                "enrichment_events": result.get("enrichment_events", [])
+                "enrichment_events": result.get("enrichment_events", []),
+                "llm_usage": result.get("llm_usage", []),
+                "model_decisions": result.get("model_decisions", []),
+                "degraded": result.get("degraded", False)
             }
         })
 
@@ -493,3 +842,69 @@ def test_agent(request, agent_name):
             {"error": f"Internal server error: {str(e)}"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@api_view(['GET'])
+def metrics(request):
+    """
+    GET /api/admin/metrics
+
+    Process-level metrics for this worker
+
+    Response:
+    {
+        "llm_governor": {
+            "queue_depth": number,
+            "in_flight": number,
+            "calls": number,
+            "retries": number,
+            "failures": number,
+            "rejected": number,
+            "circuit_state": "closed|open|half_open",
+            "wait_ms": {"avg": number, "p95": number, "max": number}
+        },
+        "degraded_mode": {
+            "mode": "auto|on|off",
+            "active": boolean,
+            "reason": "circuit_open|error_rate|latency|forced|null",
+            "recent_calls": number,
+            "recent_failures": number
+        },
+        "knowledge_listener": {
+            "running": boolean,
+            "connected": boolean,
+            "notifications": number,
+            "last_notification_at": number,
+            "last_error": "string or null"
+        },
+        "analytics_refresher": {
+            "running": boolean,
+            "refreshes": number,
+            "last_refresh_at": number,
+            "last_error": "string or null"
+        },
+        "prompt_usage": {
+            "pricing_agent": {
+                "calls": number,
+                "input_tokens": number,
+                "cached_tokens": number,
+                "output_tokens": number,
+                "cache_hit_ratio": number,
+                "avg_latency_ms": number
+            }
+        }
+    }
+    """
+    from sales_agent.agents.llm import prompt_usage_stats
+    from sales_agent.agents.degraded import degraded_mode
+    from sales_agent.analytics import analytics_refresher
+    from sales_agent.knowledge_events import knowledge_listener
+
+    return Response({
+        "prompt_usage": prompt_usage_stats.snapshot(),
+        "llm_governor": get_governor().snapshot(),
+        "degraded_mode": degraded_mode.snapshot(),
+        "warmup": warm_up.status(),
+        "knowledge_listener": knowledge_listener.status(),
+        "analytics_refresher": analytics_refresher.status()
+    })
@@ -0,0 +1,138 @@
+"""
+Per-worker warm-up of the components that are constructed lazily
+
+Importing the app is kept cheap (no LangGraph/LangChain/OpenAI at import time),
+so `manage.py migrate`, admin endpoints and tests start fast. Chat workers
+call warm_up.run() right after boot (gunicorn post_worker_init hook) or, with
+SALES_AGENT_WARMUP=True set for other servers, on the first request
+(WarmUpMiddleware) so the first chat turn isn't slow either.
+
+Background threads (knowledge listener, analytics refresher) are started after
+the warm-up steps, not as steps, so benchmark_startup can time warm-up without
+leaving a DB-writing thread behind when it exits.
+"""
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+
+def _warm_workflow():
+    from sales_agent.agents.workflow import get_workflow
+    get_workflow()
+
+
+def _warm_llm_client():
+    from sales_agent.agents.llm import get_llm
+    get_llm()
+
+
+def _warm_embedding_client():
+    from sales_agent.rag import retriever
+    retriever.client
+
+
+def _warm_knowledge_index():
+    from sales_agent.knowledge_index import get_knowledge_index
+    get_knowledge_index()
+
+
+def _warm_category_vectors():
+    from sales_agent.vector_index import get_category_vectors
+    get_category_vectors()
+
+
+def _start_knowledge_listener():
+    from django.conf import settings
+    from sales_agent.knowledge_events import knowledge_listener
+    if settings.KNOWLEDGE_LISTENER_ENABLED:
+        knowledge_listener.start()
+
+
+def _start_analytics_refresher():
+    from django.conf import settings
+    from sales_agent.analytics import analytics_refresher
+    if settings.ANALYTICS_REFRESHER_ENABLED:
+        analytics_refresher.start()
+
+
+def _warm_static_contexts():
+    # Resolving the fixed queries also opens the first HTTPS connection to OpenAI
+    from sales_agent.static_context import warm_static_contexts
+    warm_static_contexts()
+
+
+WARMUP_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("workflow", _warm_workflow),
+    ("llm_client", _warm_llm_client),
+    ("embedding_client", _warm_embedding_client),
+    ("knowledge_index", _warm_knowledge_index),
+    ("category_vectors", _warm_category_vectors),
+    ("static_contexts", _warm_static_contexts),
+]
+
+BACKGROUND_TASKS: List[Tuple[str, Callable[[], None]]] = [
+    ("knowledge_listener", _start_knowledge_listener),
+    ("analytics_refresher", _start_analytics_refresher),
+]
+
+
+class WorkerWarmUp:
+    """
+    Runs each warm-up step once per process and records how long it took
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.done = False
+        self.timings_ms: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    def run(self, force: bool = False, background: bool = True) -> Dict[str, float]:
+        """
+        Run all warm-up steps (no-op if already done unless force=True)
+
+        A failing step is recorded and skipped; the component is then built on first use.
+
+        Args:
+            force: Run the steps again even if warm-up is done
+            background: Also start the background threads (off for benchmarks)
+
+        Returns:
+            Milliseconds spent per step
+        """
+        with self._lock:
+            if self.done and not force:
+                return self.timings_ms
+
+            self.errors = {}
+            for name, step in WARMUP_STEPS:
+                started = time.perf_counter()
+                try:
+                    step()
+                except Exception as e:
+                    self.errors[name] = str(e)
+                    print(f"Warm-up step {name} failed, will build on first use: {e}", file=sys.stderr)
+                self.timings_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+
+            if background:
+                for name, start in BACKGROUND_TASKS:
+                    try:
+                        start()
+                    except Exception as e:
+                        self.errors[name] = str(e)
+                        print(f"Starting {name} failed: {e}", file=sys.stderr)
+
+            self.done = True
+            return self.timings_ms
+
+    def status(self) -> Dict:
+        """Warm-up state for metrics endpoints"""
+        return {
+            "done": self.done,
+            "timings_ms": self.timings_ms,
+            "errors": self.errors,
+        }
+
+
+warm_up = WorkerWarmUp()